@@ -1,25 +1,130 @@
-from fastapi import APIRouter, Depends
-from typing import List
+import asyncio
+import base64
+import json
+import uuid
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from postgrest.types import CountMethod
+from typing import AsyncIterator, List, Optional
 from app.api.deps import get_current_child_query
 from app.models.content import Artifact
 from app.db.supabase import supabase
+from app.core.config import settings
+from app.core.http_cache import cached_response, NO_CACHE
+from app.core.serialization import dumps, trusted_dump
 
 router = APIRouter()
 
+ARTIFACT_FIELDS = set(Artifact.model_fields)
+
+def _encode_cursor(row: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps([row['created_at'], row['id']]).encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    # Both parts end up inside a PostgREST filter string, so re-serialize them from parsed values
+    try:
+        unlocked_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(unlocked_at).isoformat(), str(uuid.UUID(row_id))
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _artifact_columns(fields: Optional[str]) -> str:
+    if not fields:
+        return "*"
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - ARTIFACT_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown artifact fields: {', '.join(sorted(unknown))}")
+    return ",".join(sorted(requested))
+
+async def _fetch_page(child_id: str, columns: str, limit: int, after: Optional[tuple] = None, with_count: bool = False):
+    """
+    One keyset page of a child's gallery, ordered by unlock time.
+    """
+    query = supabase.table("child_artifacts").select(
+        f"id, created_at, artifacts({columns})",
+        count=CountMethod.exact if with_count else None
+    ).eq("child_id", child_id)
+    if after:
+        unlocked_at, row_id = after
+        query = query.or_(f'created_at.gt."{unlocked_at}",and(created_at.eq."{unlocked_at}",id.gt.{row_id})')
+    return await query.order("created_at").order("id").limit(limit).execute()
+
+async def _count_artifacts(child_id: str) -> int:
+    # Later pages carry the cursor filter, so their own count is only what remains
+    res = await supabase.table("child_artifacts").select("id", count=CountMethod.exact, head=True).eq("child_id", child_id).execute()
+    return res.count or 0
+
+def _encode_artifact(data: dict, sparse: bool) -> bytes:
+    # Rows come from our own tables: full records are shaped to the model without
+    # re-validation, sparse projections are passed through as selected
+    return dumps(data if sparse else trusted_dump(Artifact, data))
+
+async def _stream_gallery(child_id: str, columns: str, first_rows: List[dict], page_size: int) -> AsyncIterator[bytes]:
+    """
+    Streams the whole gallery as a JSON array, holding one page in memory at a time.
+    """
+    sparse = columns != "*"
+    separator = b""
+    rows = first_rows
+    yield b"["
+    while True:
+        for row in rows:
+            if row.get('artifacts'):
+                yield separator + _encode_artifact(row['artifacts'], sparse)
+                separator = b","
+        if len(rows) < page_size:
+            break
+        res = await _fetch_page(child_id, columns, page_size, after=(rows[-1]['created_at'], rows[-1]['id']))
+        rows = res.data or []
+    yield b"]"
+
 @router.get("/", response_model=List[Artifact])
-def get_child_artifacts(child: dict = Depends(get_current_child_query)):
+async def get_child_artifacts(
+    request: Request,
+    child: dict = Depends(get_current_child_query),
+    limit: Optional[int] = Query(default=None, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
     """
-    Fetch all artifacts unlocked by the specific child.
+    Fetch the artifacts unlocked by the specific child, oldest unlock first.
+    With `limit`, returns one page and an `X-Next-Cursor` header to continue from;
+    without it, streams the whole gallery. `fields` selects a subset of artifact fields.
+    The total gallery size is returned in `X-Total-Count`.
     """
     child_id = child['id']
-    
-    # Fetch artifacts for the child
-    res = supabase.table("child_artifacts").select("artifacts(*)").eq("child_id", child_id).execute()
-    
-    if not res.data:
-        return []
-        
-    # Extract the nested artifact objects
-    artifacts_data = [item['artifacts'] for item in res.data if item.get('artifacts')]
-    
-    return [Artifact(**a) for a in artifacts_data]
+    columns = _artifact_columns(fields)
+    after = _decode_cursor(cursor) if cursor else None
+    page_size = limit or settings.ARTIFACT_STREAM_PAGE_SIZE
+
+    # Fetch one extra row on explicit pages to know whether another page follows
+    fetch_size = page_size + 1 if limit else page_size
+    if after is None:
+        res = await _fetch_page(child_id, columns, fetch_size, with_count=True)
+        total = res.count or 0
+    else:
+        res, total = await asyncio.gather(
+            _fetch_page(child_id, columns, fetch_size, after=after),
+            _count_artifacts(child_id)
+        )
+    rows = res.data or []
+    headers = {"X-Total-Count": str(total)}
+
+    if limit is None:
+        return StreamingResponse(
+            _stream_gallery(child_id, columns, rows, page_size),
+            media_type="application/json",
+            headers={**headers, "Cache-Control": NO_CACHE}
+        )
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+
+    sparse = columns != "*"
+    body = b"[" + b",".join(_encode_artifact(r['artifacts'], sparse) for r in rows if r.get('artifacts')) + b"]"
+    response = cached_response(request, body, cache_control=NO_CACHE)
+    response.headers.update(headers)
+    return response
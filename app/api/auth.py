@@ -1,26 +1,41 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-import requests
-from app.core.config import settings
+from contextlib import contextmanager
 from app.models.auth import GoogleAuthRequest, Token, Parent, UserLogin, UserSignup
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.security import create_access_token, hash_password, parent_claims, verify_and_update_password, HashingPoolSaturated
 from app.db.supabase import supabase
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from app.api.deps import invalidate_parent
+from app.core.logging import logger
+from app.core.google_auth import google_auth
 
 router = APIRouter()
 
+@contextmanager
+def hashing_backpressure():
+    """
+    Turns a saturated hashing pool into a fast 503 instead of a queued request.
+    """
+    try:
+        yield
+    except HashingPoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in requests. Please try again shortly.",
+            headers={"Retry-After": "1"}
+        )
+
 @router.post("/signup", response_model=Token)
-def signup(user: UserSignup):
+async def signup(user: UserSignup):
     """
     Create a new parent account with Email/Password.
     """
     # 1. Check if email exists
-    res = supabase.table("parents").select("id").eq("email", user.email).execute()
+    res = await supabase.table("parents").select("id").eq("email", user.email).execute()
     if res.data:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # 2. Hash Password
-    hashed_pwd = get_password_hash(user.password)
+    with hashing_backpressure():
+        hashed_pwd = await hash_password(user.password)
     
     # 3. Create Parent
     parent_data = {
@@ -28,23 +43,23 @@ def signup(user: UserSignup):
         "full_name": user.full_name,
         "password_hash": hashed_pwd
     }
-    res = supabase.table("parents").insert(parent_data).execute()
+    res = await supabase.table("parents").insert(parent_data).execute()
     if not res.data:
         raise HTTPException(status_code=500, detail="Failed to create account")
     
-    parent = res.data[0]
+    parent = Parent(**res.data[0])
     
     # 4. Create Token
-    access_token = create_access_token(subject=parent['id'])
+    access_token = create_access_token(subject=parent.id, claims=parent_claims(parent))
     return {"access_token": access_token, "token_type": "bearer", "parent": parent}
 
 @router.post("/login", response_model=Token)
-def login(user: UserLogin):
+async def login(user: UserLogin):
     """
     Login with Email/Password.
     """
     # 1. Fetch Parent
-    res = supabase.table("parents").select("*").eq("email", user.email).execute()
+    res = await supabase.table("parents").select("*").eq("email", user.email).execute()
     if not res.data:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
@@ -54,35 +69,28 @@ def login(user: UserLogin):
     if not parent.get('password_hash'):
         raise HTTPException(status_code=400, detail="Account uses Google Login. Please sign in with Google.")
         
-    if not verify_password(user.password, parent['password_hash']):
+    with hashing_backpressure():
+        is_valid, updated_hash = await verify_and_update_password(user.password, parent['password_hash'])
+    if not is_valid:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
+    # Transparently upgrade hashes made with outdated parameters
+    if updated_hash:
+        try:
+            await supabase.table("parents").update({"password_hash": updated_hash}).eq("id", parent['id']).execute()
+        except Exception as e:
+            logger.error(f"Password rehash failed for parent {parent['id']}: {e}")
+    
     # 3. Create Token
-    access_token = create_access_token(subject=parent['id'])
+    parent = Parent(**parent)
+    access_token = create_access_token(subject=parent.id, claims=parent_claims(parent))
     return {"access_token": access_token, "token_type": "bearer", "parent": parent}
 
 @router.post("/auth/google", response_model=Token)
-def login_google(request: GoogleAuthRequest):
-    token_url = "https://oauth2.googleapis.com/token"
-    data = {
-        "code": request.code,
-        "client_id": settings.GOOGLE_CLIENT_ID,
-        "client_secret": settings.GOOGLE_CLIENT_SECRET,
-        "redirect_uri": "postmessage",
-        "grant_type": "authorization_code"
-    }
-    
+async def login_google(request: GoogleAuthRequest):
     try:
-        response = requests.post(token_url, data=data)
-        response.raise_for_status()
-        tokens = response.json()
-        
-        # Verify ID token
-        id_info = id_token.verify_oauth2_token(
-            tokens['id_token'], 
-            google_requests.Request(), 
-            settings.GOOGLE_CLIENT_ID
-        )
+        # Exchange the code and verify the ID token against cached Google certs
+        id_info = await google_auth.authenticate(request.code)
         
         email = id_info['email']
         name = id_info.get('name')
@@ -95,14 +103,15 @@ def login_google(request: GoogleAuthRequest):
         )
 
     # Check if user exists in Supabase
-    user_query = supabase.table("parents").select("*").eq("email", email).execute()
+    user_query = await supabase.table("parents").select("*").eq("email", email).execute()
     
     if user_query.data:
         parent = Parent(**user_query.data[0])
         # Update google_id if missing (Account Linking)
         if not parent.google_id:
-            supabase.table("parents").update({"google_id": google_id}).eq("id", str(parent.id)).execute()
+            await supabase.table("parents").update({"google_id": google_id}).eq("id", str(parent.id)).execute()
             parent.google_id = google_id
+            invalidate_parent(str(parent.id))
     else:
         # Create new parent
         new_parent_data = {
@@ -110,13 +119,13 @@ def login_google(request: GoogleAuthRequest):
             "full_name": name,
             "google_id": google_id
         }
-        create_response = supabase.table("parents").insert(new_parent_data).execute()
+        create_response = await supabase.table("parents").insert(new_parent_data).execute()
         if not create_response.data:
              raise HTTPException(status_code=500, detail="Failed to create user")
         parent = Parent(**create_response.data[0])
 
     # Generate JWT
-    access_token = create_access_token(subject=parent.id)
+    access_token = create_access_token(subject=parent.id, claims=parent_claims(parent))
     
     return {
         "access_token": access_token,
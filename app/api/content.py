@@ -1,110 +1,174 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Literal, Optional
 from uuid import UUID
-from app.api.deps import get_current_parent, get_current_child_query
+from app.api.deps import get_current_parent, get_current_child_query, require_admin
 from app.models.auth import Parent
-from app.models.content import Module, Level, ScenarioDetail, Scenario, DialogueNode, ModulesResponse
-from app.db.supabase import supabase
+from app.models.content import Level, ScenarioDetail, ModulesResponse
+from app.core.cache import InstrumentedTTLCache
+from app.core.config import settings
+from app.core.http_cache import cached_response, etag_for, not_modified, NO_CACHE, PRIVATE_CONTENT
+from app.core.serialization import dumps
+from app.db.catalog import ContentCatalog, get_catalog, reload_catalog
+from app.db.script_bundles import clear_script_bundles, get_script_bundle, get_level_bundles
+from app.services.grading import clear_answer_keys
+from app.services.progress import fetch_level_progress, is_level_completed
 
 router = APIRouter()
 
-@router.get("/modules", response_model=ModulesResponse)
-def get_modules(child: dict = Depends(get_current_child_query)):
-    """
-    Fetch all modules for a specific child (based on their language).
-    Calculates locked/unlocked status for levels.
-    """
-    language = child['language'].lower()
-    child_id = child['id']
-    
-    # 1. Fetch Modules with Levels and Scenarios (Join)
-    response = supabase.table("modules").select("*, levels(*, scenarios(*))").eq("language", language).order("order_index").execute()
-    if not response.data:
-        return []
+# Encoded module trees keyed by (catalog version, language, completed levels):
+# children at the same point of the curriculum share one payload
+_modules_payloads = InstrumentedTTLCache("modules_payloads", settings.MODULES_PAYLOAD_CACHE_SIZE, settings.CONTENT_CATALOG_TTL_SECONDS)
+
+# Parts a compact view leaves out unless listed in ?include=
+COMPACT_INCLUDES = {"descriptions", "scenarios"}
 
-    # 2. Fetch Child's Completed Scenarios
-    attempts_res = supabase.table("child_scenario_attempts").select("scenario_id").eq("child_id", child_id).eq("passed", True).execute()
-    passed_scenario_ids = {a['scenario_id'] for a in attempts_res.data}
+def _project(item: dict, drop: frozenset) -> dict:
+    return {k: v for k, v in item.items() if k not in drop} if drop else dict(item)
 
+def _encode_modules(catalog: ContentCatalog, language: str, completed: frozenset, include: Optional[frozenset] = None) -> bytes:
+    """
+    include=None encodes the full tree; otherwise a compact tree carrying
+    only the listed optional parts.
+    """
+    drop = frozenset()
+    if include is not None:
+        drop = frozenset(
+            ({"description"} if "descriptions" not in include else set()) |
+            ({"scenarios"} if "scenarios" not in include else set())
+        )
     modules = []
-    
-    for m_data in response.data:
-        # Sort levels by order_index
-        if 'levels' in m_data:
-            m_data['levels'].sort(key=lambda x: x['order_index'])
-        
+    for module in catalog.module_payloads.get(language, []):
         previous_level_completed = True # First level is always available
+        levels = []
         
-        for level in m_data.get('levels', []):
-            if 'scenarios' in level:
-                level['scenarios'].sort(key=lambda x: x.get('order_index', 0))
-            else:
-                level['scenarios'] = []
-                
-            level_scenario_ids = {s['id'] for s in level['scenarios']}
-            
-            is_completed = False
-            if level_scenario_ids:
-                is_completed = level_scenario_ids.issubset(passed_scenario_ids)
-            
-            if is_completed:
-                level['status'] = 'completed'
+        for level in module['levels']:
+            if level['id'] in completed:
+                status = 'completed'
                 previous_level_completed = True
             elif previous_level_completed:
-                level['status'] = 'available'
+                status = 'available'
                 previous_level_completed = False 
             else:
-                level['status'] = 'locked'
+                status = 'locked'
                 previous_level_completed = False
+
+            # Copy so the shared catalog entry is never mutated per child
+            projected = _project(level, drop)
+            projected['status'] = status
+            if 'scenarios' in projected and 'description' in drop:
+                projected['scenarios'] = [_project(s, drop) for s in level['scenarios']]
+            levels.append(projected)
         
-        modules.append(Module(**m_data))
-        
-    return {
-        "child_avatar_url": child.get('avatar_url'),
-        "child_respect_score": child.get('respect_score', 0),
-        "modules": modules
-    }
+        projected = _project(module, drop)
+        projected['levels'] = levels
+        modules.append(projected)
+    return dumps(modules)
+
+@router.get("/modules", response_model=ModulesResponse)
+async def get_modules(
+    request: Request,
+    child: dict = Depends(get_current_child_query),
+    view: Literal["full", "compact"] = "full",
+    include: Optional[str] = Query(None, description="Compact view only: comma-separated extras (descriptions, scenarios)")
+):
+    """
+    Fetch all modules for a specific child (based on their language).
+    Calculates locked/unlocked status for levels.
+    view=compact leaves out descriptions and scenario lists, which the map
+    screen does not need, unless they are listed in include.
+    """
+    includes = None
+    if view == "compact":
+        includes = frozenset(part.strip() for part in (include or "").split(",") if part.strip())
+        unknown = includes - COMPACT_INCLUDES
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+
+    language = child['language'].lower()
+    child_id = child['id']
+    
+    # 1. Modules with Levels and Scenarios come pre-sorted and pre-validated from the catalog
+    catalog = await get_catalog()
+
+    # 2. Fetch Child's passed-scenario counts per level
+    level_progress = await fetch_level_progress(child_id)
+    completed = frozenset(
+        level_id for level_id, passed in level_progress.items()
+        if is_level_completed(catalog, level_id, passed)
+    )
+
+    # 3. Level statuses only depend on which levels are completed
+    cache_key = (catalog.version, language, completed, includes)
+    modules_json = _modules_payloads.get(cache_key)
+    if modules_json is None:
+        modules_json = _encode_modules(catalog, language, completed, includes)
+        _modules_payloads.set(cache_key, modules_json)
+
+    body = b"".join((
+        b'{"child_avatar_url":', dumps(child.get('avatar_url')),
+        b',"child_respect_score":', dumps(child.get('respect_score', 0)),
+        b',"modules":', modules_json, b'}'
+    ))
+    return cached_response(request, body, cache_control=NO_CACHE)
 
 @router.get("/levels/{level_id}", response_model=Level)
-def get_level_details(level_id: UUID, parent: Parent = Depends(get_current_parent)):
+async def get_level_details(request: Request, level_id: UUID, parent: Parent = Depends(get_current_parent)):
     """
     Fetch specific level details including its scenarios.
     """
-    l_res = supabase.table("levels").select("*").eq("id", str(level_id)).execute()
-    if not l_res.data:
+    catalog = await get_catalog()
+    level = catalog.level_payloads.get(str(level_id))
+    if not level:
         raise HTTPException(status_code=404, detail="Level not found")
     
-    level = Level(**l_res.data[0])
-    
-    # Fetch Scenarios
-    s_res = supabase.table("scenarios").select("*").eq("level_id", str(level_id)).order("order_index").execute()
-    level.scenarios = [Scenario(**s) for s in s_res.data]
-    
-    return level
+    # Level content only changes with the catalog, so its version is the ETag.
+    # Private: the route requires a login, so shared caches must not serve it.
+    etag = f'"{catalog.version}-{level_id}"'
+    return not_modified(request, etag, PRIVATE_CONTENT) or cached_response(
+        request, dumps(level), etag=etag, cache_control=PRIVATE_CONTENT
+    )
 
 @router.get("/scenarios/{scenario_id}/play", response_model=ScenarioDetail)
-def get_scenario_play_data(scenario_id: UUID, parent: Parent = Depends(get_current_parent)):
+async def get_scenario_play_data(request: Request, scenario_id: UUID, parent: Parent = Depends(get_current_parent)):
     """
     Fetch the full script (nodes) for a scenario to play it.
+    Served from a precompiled bundle; clients revalidate with If-None-Match.
     """
-    s_res = supabase.table("scenarios").select("*").eq("id", str(scenario_id)).execute()
-    if not s_res.data:
+    bundle = await get_script_bundle(str(scenario_id))
+    if bundle is None:
         raise HTTPException(status_code=404, detail="Scenario not found")
-        
-    scenario = ScenarioDetail(**s_res.data[0])
     
-    # Fetch Dialogue Nodes and join Personas
-    n_res = supabase.table("scenario_nodes").select("*, personas(name, avatar_url)").eq("scenario_id", str(scenario_id)).order("order_index").execute()
-    
-    nodes_data = []
-    for n in n_res.data:
-        # Extract the joined persona data if it exists
-        persona_data = n.pop('personas', None)
-        if persona_data:
-            n['persona_name'] = persona_data.get('name')
-            n['persona_avatar_url'] = persona_data.get('avatar_url')
-        nodes_data.append(DialogueNode(**n))
-        
-    scenario.nodes = nodes_data
+    return cached_response(request, bundle.body, etag=bundle.etag)
+
+@router.get("/levels/{level_id}/bundles", response_model=List[ScenarioDetail])
+async def prefetch_level_bundles(request: Request, level_id: UUID, parent: Parent = Depends(get_current_parent)):
+    """
+    Fetch the scripts of every scenario in a level in one response,
+    so the app can preload a level before the child starts playing.
+    """
+    bundles = await get_level_bundles(str(level_id))
+    if bundles is None:
+        raise HTTPException(status_code=404, detail="Level not found")
     
-    return scenario
+    etag = etag_for("".join(b.etag for b in bundles).encode())
+    return not_modified(request, etag) or cached_response(
+        request, b"[" + b",".join(b.body for b in bundles) + b"]", etag=etag
+    )
+
+@router.post("/admin/catalog/reload", dependencies=[Depends(require_admin)])
+async def reload_content_catalog():
+    """
+    Forces the in-process content catalog to be rebuilt from the database.
+    Compiled scripts and answer keys are dropped too: the catalog version does
+    not cover scenario nodes or personas, so their edits are picked up here.
+    """
+    catalog = await reload_catalog()
+    clear_script_bundles()
+    clear_answer_keys()
+    return {
+        "status": "success",
+        "version": catalog.version,
+        "languages": sorted(catalog.modules_by_language),
+        "levels": len(catalog.levels),
+        "scenarios": len(catalog.scenarios)
+    }
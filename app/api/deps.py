@@ -1,44 +1,150 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic import ValidationError
 from app.core.config import settings
+from app.core.security import decode_access_token, parent_from_claims
 from app.models.auth import Token, Parent
-from app.db.supabase import supabase
+from app.db.loader import get_loader
+from app.core.cache import InstrumentedTTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/google")
 
+# Authenticated principals, keyed by parent_id and (child_id, parent_id)
+parent_cache = InstrumentedTTLCache("parents", settings.PRINCIPAL_CACHE_MAXSIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+child_cache = InstrumentedTTLCache("children", settings.PRINCIPAL_CACHE_MAXSIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+@dataclass(frozen=True)
+class VerifiedToken:
+    parent_id: str
+    issued_at: float
+    expires_at: float
+    parent: Optional[Parent] # Rebuilt from the token's claims; None for tokens without them
+
+# Tokens whose signature has already been checked, keyed by digest; entries are
+# only used until the token's own exp
+token_cache = InstrumentedTTLCache("verified_tokens", settings.TOKEN_CACHE_MAXSIZE, settings.TOKEN_CACHE_TTL_SECONDS)
+class TokenRevocations:
+    """
+    parent_id -> time of the last account change; claims in tokens issued earlier
+    are stale. Unlike a cache, nothing is evicted for space, since a dropped entry
+    would make stale tokens trusted again. An entry goes once no token issued
+    before it is within its claims window any more.
+    """
+
+    def __init__(self, lifetime: float):
+        self.lifetime = lifetime
+        self._revoked: Dict[str, float] = {} # Oldest revocation first
+
+    def revoke(self, parent_id: str) -> None:
+        now = time.time()
+        self._revoked.pop(parent_id, None)
+        self._revoked[parent_id] = now
+        for key, revoked_at in list(self._revoked.items()):
+            if revoked_at + self.lifetime > now:
+                break
+            del self._revoked[key]
+
+    def revoked_at(self, parent_id: str) -> Optional[float]:
+        revoked_at = self._revoked.get(parent_id)
+        if revoked_at is None or revoked_at + self.lifetime <= time.time():
+            return None
+        return revoked_at
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+token_revocations = TokenRevocations(settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+def invalidate_parent(parent_id: str) -> None:
+    """
+    Call when a parent's account changes: drops the cached profile and makes
+    previously issued tokens re-validate against the database.
+    """
+    parent_cache.invalidate(str(parent_id))
+    token_revocations.revoke(str(parent_id))
+
+def invalidate_child(child_id: str) -> None:
+    child_id = str(child_id)
+    child_cache.invalidate_where(lambda key: key[0] == child_id)
+
+def verify_token(token: str) -> Optional[VerifiedToken]:
+    """
+    Returns the token's verified identity, or None if it is invalid or expired.
+    The signature is checked once per token; later calls are a digest lookup.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    verified = token_cache.get(key)
+    if verified is not None and verified.expires_at > time.time():
+        return verified
+
+    try:
+        payload = decode_access_token(token)
+        if payload.get("sub") is None:
+            return None
+        verified = VerifiedToken(
+            parent_id=payload["sub"],
+            issued_at=payload.get("iat", 0),
+            expires_at=payload["exp"],
+            parent=parent_from_claims(payload)
+        )
+    except (JWTError, ValidationError, KeyError):
+        return None
+    token_cache.set(key, verified)
+    return verified
+
 async def get_current_parent(token: str = Depends(oauth2_scheme)) -> Parent:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except (JWTError, ValidationError):
+    verified = verify_token(token)
+    if verified is None:
         raise credentials_exception
+    user_id = verified.parent_id
+
+    # Claims stand in for the lookup only while they are as fresh as a cached
+    # profile would be: revocations are per process, so an old token always re-checks
+    if verified.parent is not None and time.time() - verified.issued_at < settings.PRINCIPAL_CACHE_TTL_SECONDS:
+        revoked_at = token_revocations.revoked_at(user_id)
+        if revoked_at is None or verified.issued_at > revoked_at:
+            return verified.parent
+    
+    parent = parent_cache.get(user_id)
+    if parent is not None:
+        return parent
     
     # Fetch user from Supabase
-    response = supabase.table("parents").select("*").eq("id", user_id).execute()
-    if not response.data:
+    row = await get_loader().load("parents", user_id)
+    if not row:
         raise credentials_exception
     
-    return Parent(**response.data[0])
+    parent = Parent(**row)
+    parent_cache.set(user_id, parent)
+    return parent
 
-def validate_child_access(child_id: str, parent_id: str) -> dict:
+async def validate_child_access(child_id: str, parent_id: str) -> dict:
     """
     Verifies that the child exists and belongs to the parent.
     Returns the child dictionary (including language).
     """
-    # Simple query to check ownership
-    res = supabase.table("children").select("*").eq("id", child_id).eq("parent_id", parent_id).execute()
-    if not res.data:
+    key = (child_id, parent_id)
+    child = child_cache.get(key)
+    if child is not None:
+        return dict(child)
+    
+    # Lookups by id share one query per request, ownership is checked here
+    row = await get_loader().load("children", child_id)
+    if not row or str(row['parent_id']) != parent_id:
         raise HTTPException(status_code=404, detail="Child profile not found or access denied")
-    return res.data[0]
+    child_cache.set(key, row)
+    return dict(row)
 
 async def get_current_child_query(
     child_id: str, 
@@ -47,4 +153,11 @@ async def get_current_child_query(
     """
     Dependency for GET requests where child_id is a query parameter.
     """
-    return validate_child_access(child_id, str(parent.id))
+    return await validate_child_access(child_id, str(parent.id))
+
+async def require_admin(x_admin_key: Optional[str] = Header(default=None)) -> None:
+    """
+    Guards operational endpoints with the shared ADMIN_API_KEY.
+    """
+    if not settings.ADMIN_API_KEY or not x_admin_key or not secrets.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Query
+import asyncio
+import contextlib
+import os
+from collections import defaultdict
+from datetime import datetime
+from postgrest.exceptions import APIError
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
 from uuid import UUID
-from rapidfuzz import fuzz 
 from app.db.supabase import supabase
-from app.api.deps import get_current_parent, validate_child_access
+from app.api.deps import get_current_parent, validate_child_access, invalidate_child, require_admin
+from app.core.logging import logger
 from app.models.auth import Parent
+from app.services.attempts import APPLY_ATTEMPT, apply_attempt, enqueue_apply, mark_apply_failed
+from app.services.grading import AnswerKey, GradeResult, get_answer_key, grade_answer, grade_answers
+from app.services.leaderboard import record_score
+from app.services.jobs import Job, job_queue
+from app.services.speech import AudioTooLarge, SpeechJob, SpeechPoolSaturated, scenario_language, speech_pool, spool_upload
 
 router = APIRouter()
 
@@ -16,6 +27,41 @@ class AttemptResponse(BaseModel):
     match_percentage: int
     transcription: Optional[str] = None
 
+class GradeRequest(BaseModel):
+    scenario_id: UUID
+    node_id: UUID
+    answer: str = Field(max_length=500) # Typed or transcribed
+
+class NodeAnswer(BaseModel):
+    node_id: UUID
+    answer: str = Field(max_length=500)
+
+class BatchGradeRequest(BaseModel):
+    scenario_id: UUID
+    answers: List[NodeAnswer] = Field(max_length=200)
+
+class NodeGradeResponse(AttemptResponse):
+    node_id: UUID
+
+class BatchGradeResponse(BaseModel):
+    results: List[NodeGradeResponse]
+    score_earned: int
+    max_score: int
+
+class SpeechJobResponse(BaseModel):
+    job_id: str
+    status: Literal['queued', 'running', 'completed', 'failed']
+    result: Optional[NodeGradeResponse] = None
+    error: Optional[str] = None
+
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: Literal['queued', 'running', 'completed', 'failed']
+    attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
 class ScenarioCompleteRequest(BaseModel):
     child_id: UUID
     scenario_id: UUID
@@ -23,77 +69,241 @@ class ScenarioCompleteRequest(BaseModel):
     max_score: int
     stars_earned: int 
 
+class SyncAttempt(ScenarioCompleteRequest):
+    idempotency_key: UUID # Generated by the client when the event is queued
+    occurred_at: Optional[datetime] = None # Device time of the event; streaks count its day, not the sync's
+
+class SyncCardCompletion(BaseModel):
+    idempotency_key: UUID
+    child_id: UUID
+    card_id: UUID
+    occurred_at: Optional[datetime] = None
+
+class SyncRequest(BaseModel):
+    attempts: List[SyncAttempt] = Field(default=[], max_length=500)
+    card_completions: List[SyncCardCompletion] = Field(default=[], max_length=500)
+
+class SyncEventResult(BaseModel):
+    idempotency_key: UUID
+    type: Literal['attempt', 'card']
+    status: Literal['created', 'duplicate', 'rejected']
+    saved_id: Optional[UUID] = None
+    passed: Optional[bool] = None
+    unlocked_artifact: Optional[dict] = None
+    detail: Optional[str] = None
+
+class SyncResponse(BaseModel):
+    results: List[SyncEventResult]
+
+def is_passing(score_earned: int, max_score: int) -> bool:
+    # Require at least ~60% to pass (e.g., 2 out of 3 questions correct)
+    return score_earned >= (max_score * 0.6)
+
+async def _answer_key(scenario_id: UUID) -> AnswerKey:
+    key = await get_answer_key(str(scenario_id))
+    if key is None:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    return key
+
+def _graded(result: GradeResult, transcription: Optional[str] = None) -> NodeGradeResponse:
+    return NodeGradeResponse(
+        node_id=result.node_id,
+        correct=result.correct,
+        score=result.score,
+        feedback=result.feedback,
+        match_percentage=result.match_percentage,
+        transcription=transcription
+    )
+
+@router.post("/grade", response_model=NodeGradeResponse)
+async def grade_node_answer(data: GradeRequest, parent: Parent = Depends(get_current_parent)):
+    """
+    Scores a typed or transcribed answer against the node's expected response.
+    Tone marks, underdots and case are ignored; `|` separates accepted variants.
+    """
+    key = await _answer_key(data.scenario_id)
+    try:
+        result = grade_answer(key, str(data.node_id), data.answer)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="No spoken answer expected for this node")
+    return _graded(result)
+
+@router.post("/grade/batch", response_model=BatchGradeResponse)
+async def grade_scenario_answers(data: BatchGradeRequest, parent: Parent = Depends(get_current_parent)):
+    """
+    Scores all of a scenario's answers in one call. The totals can be submitted
+    to /attempt as score_earned / max_score.
+    """
+    key = await _answer_key(data.scenario_id)
+    try:
+        results = grade_answers(key, [(str(a.node_id), a.answer) for a in data.answers])
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"No spoken answer expected for node {e.args[0]}")
+
+    # A node answered more than once counts with its best attempt
+    best: Dict[str, float] = {}
+    for r in results:
+        best[r.node_id] = max(best.get(r.node_id, 0.0), r.score)
+
+    return BatchGradeResponse(
+        results=[_graded(r) for r in results],
+        score_earned=int(sum(best.values())),
+        max_score=sum(key.points.values())
+    )
+
+def _speech_job_response(job: SpeechJob) -> SpeechJobResponse:
+    return SpeechJobResponse(
+        job_id=job.id,
+        status=job.status,
+        result=_graded(job.result, transcription=job.transcription) if job.result else None,
+        error=job.error
+    )
+
+def _require_speech() -> None:
+    if not speech_pool.available:
+        raise HTTPException(status_code=503, detail="Speech recognition is not available")
+
+@router.post("/attempt/audio", response_model=SpeechJobResponse, status_code=202)
+async def submit_audio_answer(
+    scenario_id: UUID = Form(...),
+    node_id: UUID = Form(...),
+    audio: UploadFile = File(...),
+    parent: Parent = Depends(get_current_parent)
+):
+    """
+    Queues a spoken answer for transcription and grading.
+    Poll GET /attempt/audio/{job_id} (optionally with `wait`) for the result.
+    """
+    _require_speech()
+    key = await _answer_key(scenario_id)
+    if str(node_id) not in key.spans:
+        raise HTTPException(status_code=404, detail="No spoken answer expected for this node")
+
+    audio_path, job = None, None
+    try:
+        # Checked before spooling too, so a busy pool does not cost a disk write
+        speech_pool.check_capacity()
+        audio_path = await spool_upload(audio)
+        language = await scenario_language(str(scenario_id))
+        job = speech_pool.submit(str(parent.id), str(scenario_id), str(node_id), audio_path, language)
+    except SpeechPoolSaturated:
+        raise HTTPException(status_code=503, detail="Speech recognition is busy, please retry", headers={"Retry-After": "2"})
+    except AudioTooLarge:
+        raise HTTPException(status_code=413, detail="Audio file is too large")
+    finally:
+        # Once submitted, the pool deletes the file when its worker is done with it
+        if job is None and audio_path:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(audio_path)
+    return _speech_job_response(job)
+
+@router.get("/attempt/audio/{job_id}", response_model=SpeechJobResponse)
+async def get_audio_answer(
+    job_id: str,
+    wait: float = Query(default=0, ge=0, le=30),
+    parent: Parent = Depends(get_current_parent)
+):
+    """
+    Returns the state of an audio answer job. With `wait`, holds the request
+    open for up to that many seconds until the job finishes.
+    """
+    _require_speech()
+    job = speech_pool.get(job_id, str(parent.id))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _speech_job_response(await speech_pool.wait(job, wait))
+
+@job_queue.handler(APPLY_ATTEMPT)
+async def _apply_attempt_job(payload: dict) -> dict:
+    result = await apply_attempt(payload["attempt_id"])
+    # respect_score / current_level may have changed, drop the cached child profile
+    invalidate_child(payload["child_id"])
+    if result.get('respect_score') is not None:
+        record_score(payload["child_id"], result['respect_score'])
+    return result
+
+@job_queue.dead_letter(APPLY_ATTEMPT)
+async def _apply_attempt_dead_letter(payload: dict, error: str) -> None:
+    # Keeps the reconciler from selecting it again; the dead letter stays requeueable
+    await mark_apply_failed(payload["attempt_id"])
+
 @router.post("/attempt")
 async def submit_scenario_attempt(data: ScenarioCompleteRequest, parent: Parent = Depends(get_current_parent)):
+    """
+    Stores the attempt and returns; score, artifact unlock and level bump are
+    applied by a background job. Its outcome (including unlocked_artifact) is
+    available from GET /jobs/{job_id}.
+    """
     # Validate Child Access
-    validate_child_access(str(data.child_id), str(parent.id))
+    await validate_child_access(str(data.child_id), str(parent.id))
 
-    # Save the attempt
-    attempt_data = data.model_dump(mode='json')
-    # Require at least ~60% to pass (e.g., 2 out of 3 questions correct)
-    attempt_data['passed'] = data.score_earned >= (data.max_score * 0.6) 
+    passed = is_passing(data.score_earned, data.max_score)
 
-    res = supabase.table("child_scenario_attempts").insert(attempt_data).execute()
+    # applied_at stays empty until the job has applied the side effects
+    res = await supabase.table("child_scenario_attempts").insert({
+        "child_id": str(data.child_id),
+        "scenario_id": str(data.scenario_id),
+        "score_earned": data.score_earned,
+        "max_score": data.max_score,
+        "stars_earned": data.stars_earned,
+        "passed": passed,
+        "applied_at": None
+    }).execute()
     if not res.data:
         raise HTTPException(status_code=500, detail="Failed to save progress")
-        
-    # Check for level completion and unlock artifacts
-    unlocked_artifact = None
     
-    if attempt_data['passed']:
-        try:
-            # 1. Fetch the child's current stats to update them
-            child_res = supabase.table("children").select("respect_score, current_level").eq("id", str(data.child_id)).execute()
-            if child_res.data:
-                child = child_res.data[0]
-                new_respect = child.get("respect_score", 0) + data.score_earned
-                new_level = child.get("current_level", 1)
-                
-                # Check level progression
-                s_res = supabase.table("scenarios").select("level_id").eq("id", str(data.scenario_id)).execute()
-                if s_res.data:
-                    level_id = s_res.data[0]['level_id']
-                    
-                    all_s_res = supabase.table("scenarios").select("id").eq("level_id", level_id).execute()
-                    level_scenario_ids = {s['id'] for s in all_s_res.data}
-                    
-                    passed_res = supabase.table("child_scenario_attempts").select("scenario_id").eq("child_id", str(data.child_id)).eq("passed", True).execute()
-                    passed_scenario_ids = {p['scenario_id'] for p in passed_res.data}
-                    
-                    if level_scenario_ids and level_scenario_ids.issubset(passed_scenario_ids):
-                        # Level completely passed! Check for artifact details
-                        art_res = supabase.table("artifacts").select("id, name, description, image_url").eq("level_id", level_id).execute()
-                        if art_res.data:
-                            unlocked_artifact = art_res.data[0]
-                            artifact_id = unlocked_artifact['id']
-                            has_art = supabase.table("child_artifacts").select("id").eq("child_id", str(data.child_id)).eq("artifact_id", artifact_id).execute()
-                            
-                            if not has_art.data:
-                                try:
-                                    supabase.table("child_artifacts").insert({
-                                        "child_id": str(data.child_id),
-                                        "artifact_id": artifact_id
-                                    }).execute()
-                                    # Since they just completed this level for the FIRST time and got the artifact, bump their current level
-                                    new_level += 1
-                                except Exception as e:
-                                    print(f"Error unlocking artifact: {e}")
-                
-                # 2. Save the updated stats to the DB
-                supabase.table("children").update({
-                    "respect_score": new_respect,
-                    "current_level": new_level
-                }).eq("id", str(data.child_id)).execute()
-                
-        except Exception as e:
-            print(f"Error updating child stats: {e}")
+    attempt_id = res.data[0]['id']
+    # The streak trigger may have updated the child
+    invalidate_child(str(data.child_id))
+
+    job_id = None
+    try:
+        job = await enqueue_apply(attempt_id, str(data.child_id), owner_id=str(parent.id))
+        job_id = job.id
+    except Exception as e:
+        # The attempt is stored; the reconciler applies it later
+        logger.error(f"Could not enqueue side effects for attempt {attempt_id}: {e!r}")
 
     return {
         "status": "success", 
-        "saved_id": res.data[0]['id'],
-        "passed": attempt_data['passed'],
-        "unlocked_artifact": unlocked_artifact
+        "saved_id": attempt_id,
+        "passed": passed,
+        "unlocked_artifact": None, # Reported by the job
+        "job_id": job_id
     }
+
+def _job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        attempts=job.attempts,
+        result=job.result,
+        error=job.error
+    )
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    wait: float = Query(default=0, ge=0, le=30),
+    parent: Parent = Depends(get_current_parent)
+):
+    """
+    Returns the state of a background job, e.g. the side effects of an attempt.
+    With `wait`, holds the request open for up to that many seconds until it finishes.
+    """
+    job = await job_queue.get(job_id, str(parent.id))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(await job_queue.wait(job, wait))
+
+@router.post("/admin/jobs/requeue", dependencies=[Depends(require_admin)])
+async def requeue_failed_jobs(kind: Optional[str] = None, job_id: Optional[str] = None):
+    """
+    Retries dead-lettered jobs (those that ran out of attempts), optionally only
+    one kind or one job, e.g. after fixing the cause of the failures.
+    """
+    return {"requeued": await job_queue.requeue(kind, job_id)}
     
 @router.post("/cards/complete")
 async def complete_card(data: dict, parent: Parent = Depends(get_current_parent)):
@@ -105,14 +315,103 @@ async def complete_card(data: dict, parent: Parent = Depends(get_current_parent)
         raise HTTPException(status_code=400, detail="Missing child_id or card_id")
     
     # Validate Child Access
-    validate_child_access(str(child_id), str(parent.id))
+    await validate_child_access(str(child_id), str(parent.id))
         
-    res = supabase.table("child_action_card_completions").insert({
+    res = await supabase.table("child_action_card_completions").insert({
         "child_id": child_id,
         "card_id": card_id
     }).execute()
     
     if not res.data:
         raise HTTPException(status_code=500, detail="Failed to save card completion")
-        
+    
+    # The streak trigger may have updated the child
+    invalidate_child(str(child_id))
     return {"status": "success", "saved_id": res.data[0]['id']}
+
+def _reject_all(attempts: List[SyncAttempt], cards: List[SyncCardCompletion], detail: str) -> List[SyncEventResult]:
+    return [
+        SyncEventResult(idempotency_key=event.idempotency_key, type=kind, status='rejected', detail=detail)
+        for kind, events in (('attempt', attempts), ('card', cards)) for event in events
+    ]
+
+def _rejected(r: dict, kind: Literal['attempt', 'card'], child_id: str) -> SyncEventResult:
+    logger.warning(f"Sync {kind} {r['idempotency_key']} for child {child_id} rejected (SQLSTATE {r.get('error')})")
+    return SyncEventResult(idempotency_key=r['idempotency_key'], type=kind, status='rejected', detail="Event could not be saved")
+
+async def _sync_child(child_id: str, parent_id: str, attempts: List[SyncAttempt], cards: List[SyncCardCompletion]) -> List[SyncEventResult]:
+    """
+    Validates ownership once, then commits all of one child's events in a single database call.
+    Events the database refuses come back 'rejected' without failing the rest of the batch.
+    """
+    try:
+        await validate_child_access(child_id, parent_id)
+    except HTTPException as e:
+        return _reject_all(attempts, cards, e.detail)
+
+    try:
+        res = await supabase.rpc("sync_child_events", {
+            "p_child_id": child_id,
+            "p_attempts": [
+                {**a.model_dump(mode='json', exclude={'child_id'}), "passed": is_passing(a.score_earned, a.max_score)}
+                for a in attempts
+            ],
+            "p_cards": [c.model_dump(mode='json', exclude={'child_id'}) for c in cards]
+        }).execute()
+    except APIError as e:
+        # Keep the other children's results; the client retries these events later
+        logger.error(f"Sync for child {child_id} failed: {e!r}")
+        return _reject_all(attempts, cards, "Failed to sync progress")
+    if not res.data:
+        return _reject_all(attempts, cards, "Failed to sync progress")
+
+    results = [
+        _rejected(r, 'attempt', child_id) if r.get('rejected') else SyncEventResult(
+            idempotency_key=r['idempotency_key'],
+            type='attempt',
+            status='duplicate' if r.get('duplicate') else 'created',
+            saved_id=r['attempt_id'],
+            passed=r['passed'],
+            unlocked_artifact=r.get('unlocked_artifact')
+        )
+        for r in res.data['attempts']
+    ]
+    results += [
+        _rejected(r, 'card', child_id) if r.get('rejected') else SyncEventResult(
+            idempotency_key=r['idempotency_key'],
+            type='card',
+            status='duplicate' if r['duplicate'] else 'created',
+            saved_id=r['saved_id']
+        )
+        for r in res.data['cards']
+    ]
+
+    if any(r.status == 'created' for r in results):
+        invalidate_child(child_id)
+    # Attempts are applied in order, so the last reported score is the current one
+    scores = [r['respect_score'] for r in res.data['attempts'] if r.get('respect_score') is not None]
+    if scores:
+        record_score(child_id, scores[-1])
+    return results
+
+@router.post("/sync", response_model=SyncResponse)
+async def sync_events(data: SyncRequest, parent: Parent = Depends(get_current_parent)):
+    """
+    Uploads gameplay events queued while offline, for one or more children.
+    Every event carries a client-generated idempotency key, so a batch can be
+    retried safely: events already stored come back as 'duplicate'.
+    """
+    attempts_by_child: Dict[str, List[SyncAttempt]] = defaultdict(list)
+    cards_by_child: Dict[str, List[SyncCardCompletion]] = defaultdict(list)
+    for a in data.attempts:
+        attempts_by_child[str(a.child_id)].append(a)
+    for c in data.card_completions:
+        cards_by_child[str(c.child_id)].append(c)
+
+    child_ids = list(dict.fromkeys([*attempts_by_child, *cards_by_child]))
+    per_child = await asyncio.gather(*(
+        _sync_child(child_id, str(parent.id), attempts_by_child[child_id], cards_by_child[child_id])
+        for child_id in child_ids
+    ))
+
+    return SyncResponse(results=[r for results in per_child for r in results])
@@ -0,0 +1,62 @@
+import re
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.api.deps import get_current_parent, get_current_child_query, require_admin
+from app.models.auth import Parent
+from app.models.leaderboard import BoardRank, ChildRanksResponse, LeaderboardEntry, LeaderboardPage
+from app.services.leaderboard import get_leaderboards, rebuild_leaderboards, record_child
+
+router = APIRouter()
+
+BOARD_PATTERN = re.compile(r"^(global|language:[a-z_-]+|age:\d+(-\d+|\+))$")
+
+@router.get("/", response_model=LeaderboardPage)
+async def get_leaderboard(
+    board: str = "global",
+    limit: int = Query(default=10, ge=1, le=100),
+    offset: int = Query(default=0, ge=0, le=10_000),
+    parent: Parent = Depends(get_current_parent)
+):
+    """
+    Top children by respect score. `board` is "global", "language:<language>"
+    or "age:<bracket>" (e.g. "age:6-8", "age:12+").
+    """
+    board = board.lower()
+    if not BOARD_PATTERN.match(board):
+        raise HTTPException(status_code=400, detail="Unknown leaderboard")
+
+    total, page = get_leaderboards().page(board, limit, offset)
+    return LeaderboardPage(
+        board=board,
+        total=total,
+        entries=[
+            LeaderboardEntry(rank=rank, display_name=c.display_name, avatar_url=c.avatar_url, respect_score=c.score)
+            for rank, c in page
+        ]
+    )
+
+@router.get("/me", response_model=ChildRanksResponse)
+async def get_child_ranks(child: dict = Depends(get_current_child_query)):
+    """
+    The child's rank on each board it belongs to (global, its language, its age bracket).
+    """
+    leaderboards = get_leaderboards()
+    child_id = str(child['id'])
+    if child_id not in leaderboards.children:
+        # Created since the last rebuild on this worker
+        record_child(child)
+
+    return ChildRanksResponse(
+        child_id=child_id,
+        ranks=[
+            BoardRank(board=board, rank=rank, total=total, respect_score=score)
+            for board, rank, total, score in leaderboards.ranks(child_id)
+        ]
+    )
+
+@router.post("/admin/rebuild", dependencies=[Depends(require_admin)])
+async def rebuild_leaderboard_index():
+    """
+    Rebuilds every board from the database immediately.
+    """
+    index = await rebuild_leaderboards()
+    return {"status": "success", "children": len(index.children), "boards": sorted(index.boards)}
@@ -1,84 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict
-from collections import defaultdict
-from app.api.deps import get_current_parent
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse
+from typing import List, Dict, Optional
+from app.api.deps import get_current_parent, require_admin
 from app.models.auth import Parent
-from app.models.profile import ChildCreate, ChildResponse, Child, ParentDashboardResponse, ChildDashboard, ChildProgress
+from app.models.profile import ChildCreate, ChildResponse, Child, ParentDashboardResponse
 from app.db.supabase import supabase
+from app.db.avatars import get_avatar_index, refresh_avatar_index
+from app.services.leaderboard import record_child
+from app.services.streaks import reset_lapsed_streaks
+from app.core.http_cache import cached_response, PUBLIC_CONTENT
+from app.core.serialization import trusted_dump
 
 router = APIRouter()
 
 @router.get("/avatars", response_model=Dict[str, Dict[str, List[str]]])
-def get_avatar_dictionary():
+async def get_avatar_dictionary(request: Request, language: Optional[str] = None, gender: Optional[str] = None):
     """
-    Returns a highly efficient nested dictionary of all avatars for O(1) frontend lookup.
+    Returns a nested dictionary of all avatars for O(1) frontend lookup,
+    optionally filtered by language and/or gender.
     Format: { "yoruba": { "boy": ["url1", "url2"], "girl": ["url3"] }, "twi": ... }
+    Served from an index prebuilt at startup and refreshed in the background.
     """
-    response = supabase.table("avatars").select("*").execute()
-    
-    # Build dictionary
-    avatar_dict = defaultdict(lambda: defaultdict(list))
-    
-    for av in response.data:
-        lang = av.get("language", "").lower()
-        gen = av.get("gender", "").lower()
-        url = av.get("image_url")
-        if lang and gen and url:
-            avatar_dict[lang][gen].append(url)
-            
-    return dict(avatar_dict)
+    payload = (await get_avatar_index()).payload_for(language, gender)
+    return cached_response(request, payload.body, etag=payload.etag, cache_control=PUBLIC_CONTENT)
+
+@router.post("/admin/avatars/reload", dependencies=[Depends(require_admin)])
+async def reload_avatar_index():
+    """
+    Rebuilds the avatar index immediately, e.g. after new avatars are uploaded.
+    """
+    index = await refresh_avatar_index()
+    return {"status": "success", "etag": index.payload_for().etag}
+
+@router.post("/admin/streaks/reset", dependencies=[Depends(require_admin)])
+async def reset_streaks():
+    """
+    Runs the lapsed-streak reset immediately instead of waiting for the hourly job.
+    """
+    return {"status": "success", "reset": await reset_lapsed_streaks()}
 
 @router.post("/kids", response_model=dict)
-def create_child(child: ChildCreate, parent: Parent = Depends(get_current_parent)):
+async def create_child(child: ChildCreate, parent: Parent = Depends(get_current_parent)):
     child_data = child.model_dump()
     child_data["parent_id"] = str(parent.id)
     
     # We no longer auto-assign; we expect child.avatar_url to be provided
-    response = supabase.table("children").insert(child_data).execute()
+    response = await supabase.table("children").insert(child_data).execute()
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create child profile")
     
+    record_child(response.data[0])
     return {"status": "success", "data": response.data[0]}
 
 @router.get("/kids", response_model=List[Child])
-def get_child_profiles(parent: Parent = Depends(get_current_parent)):
-    response = supabase.table("children").select("*").eq("parent_id", str(parent.id)).execute()
+async def get_child_profiles(parent: Parent = Depends(get_current_parent)):
+    response = await supabase.table("children").select("*").eq("parent_id", str(parent.id)).execute()
     
-    if not response.data:
-        return []
-        
-    return [Child(**item) for item in response.data]
+    # Rows come straight from our own table: shape them, skip re-validation
+    return ORJSONResponse([trusted_dump(Child, item) for item in response.data or []])
 
 @router.get("/parent/dashboard", response_model=ParentDashboardResponse)
-def get_parent_dashboard(parent: Parent = Depends(get_current_parent)):
+async def get_parent_dashboard(parent: Parent = Depends(get_current_parent)):
     """
     Returns an aggregated view for the parent, including their account info,
     and a list of all their children along with their gameplay progression stats.
     """
-    children_res = supabase.table("children").select("*").eq("parent_id", str(parent.id)).execute()
+    children_res = await supabase.table("children").select("*").eq("parent_id", str(parent.id)).execute()
     children_data = children_res.data or []
     
+    # Passed scenarios and unlocked artifacts for every child, counted server-side in one call
+    progress_by_child = {}
+    if children_data:
+        progress_res = await supabase.rpc("get_children_progress", {"p_child_ids": [str(c['id']) for c in children_data]}).execute()
+        progress_by_child = {str(p['child_id']): p for p in progress_res.data or []}
+    
     dashboard_children = []
     
     for c in children_data:
-        # Calculate scenarios passed
-        scenarios_res = supabase.table("child_scenario_attempts").select("id").eq("child_id", str(c['id'])).eq("passed", True).execute()
-        scenarios_passed = len(scenarios_res.data) if scenarios_res.data else 0
-        
-        # Calculate artifacts unlocked
-        artifacts_res = supabase.table("child_artifacts").select("id").eq("child_id", str(c['id'])).execute()
-        artifacts_unlocked = len(artifacts_res.data) if artifacts_res.data else 0
-        
-        child_obj = Child(**c)
-        progress = ChildProgress(scenarios_passed=scenarios_passed, artifacts_unlocked=artifacts_unlocked)
+        counts = progress_by_child.get(str(c['id']), {})
         
-        dashboard_children.append(
-            ChildDashboard(**child_obj.model_dump(), progress=progress)
-        )
+        dashboard_children.append({
+            **trusted_dump(Child, c),
+            "progress": {
+                "scenarios_passed": counts.get('scenarios_passed', 0),
+                "artifacts_unlocked": counts.get('artifacts_unlocked', 0)
+            }
+        })
         
-    return ParentDashboardResponse(
-        parent_name=parent.full_name,
-        parent_email=parent.email,
-        subscription_status="Active (Free Trial (Expires in 7 days))",
-        children=dashboard_children
-    )
+    return ORJSONResponse({
+        "parent_name": parent.full_name,
+        "parent_email": parent.email,
+        "subscription_status": "Active (Free Trial (Expires in 7 days))",
+        "children": dashboard_children
+    })
@@ -0,0 +1,54 @@
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+from cachetools import TTLCache
+
+# Every named cache registers itself here so its stats can be reported
+caches: Dict[str, "InstrumentedTTLCache"] = {}
+
+
+class InstrumentedTTLCache:
+    """
+    Bounded LRU cache whose entries also expire after a fixed TTL.
+    Keeps hit/miss/eviction counters for reporting.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, timer=time.monotonic)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        caches[name] = self
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._cache.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._cache[key] = value
+
+    def invalidate(self, key: Hashable) -> None:
+        if self._cache.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        for key in [k for k in list(self._cache.keys()) if predicate(k)]:
+            self.invalidate(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,131 @@
+import gzip
+from typing import List, Optional
+from app.core.cache import InstrumentedTTLCache
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError: # Optional: without it only gzip is offered
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+# Compressed bodies keyed by (ETag, encoding): an ETag names exactly one body,
+# so catalog content and script bundles are compressed once, not per request
+_compressed_payloads = InstrumentedTTLCache(
+    "compressed_payloads", settings.COMPRESSION_CACHE_SIZE, settings.COMPRESSION_CACHE_TTL_SECONDS
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Picks br over gzip from an Accept-Encoding header, honouring q=0.
+    """
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[coding.strip()] = q
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if offered.get(coding, offered.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing JSON and text responses for clients that
+    accept br or gzip. Bodies under COMPRESSION_MINIMUM_SIZE and streamed
+    responses pass through untouched. Compressed bodies of responses with an
+    ETag are cached, and their ETag is weakened since the bytes differ.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether it is worth compressing
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                return await send(message)
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = start["headers"]
+            if message.get("more_body") or not _compressible(headers, len(body)):
+                await send(start)
+                return await send(message)
+
+            etag = next((v for k, v in headers if k == b"etag"), None)
+            key = (etag, encoding)
+            compressed = _compressed_payloads.get(key) if etag else None
+            if compressed is None:
+                compressed = compress(body, encoding)
+                if etag:
+                    _compressed_payloads.set(key, compressed)
+
+            start["headers"] = _compressed_headers(headers, encoding, len(compressed))
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _compressible(headers: List[tuple], size: int) -> bool:
+    if size < settings.COMPRESSION_MINIMUM_SIZE:
+        return False
+    content_type = b""
+    for key, value in headers:
+        if key == b"content-encoding":
+            return False
+        if key == b"content-type":
+            content_type = value
+    return content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES)
+
+
+def _compressed_headers(headers: List[tuple], encoding: str, size: int) -> List[tuple]:
+    out = []
+    vary = []
+    for key, value in headers:
+        if key == b"content-length":
+            continue
+        if key == b"vary":
+            # Merged into one header below, e.g. "Authorization, Accept-Encoding"
+            vary += [v.strip() for v in value.split(b",") if v.strip()]
+            continue
+        if key == b"etag" and not value.startswith(b"W/"):
+            value = b"W/" + value
+        out.append((key, value))
+    if b"accept-encoding" not in {v.lower() for v in vary} and b"*" not in vary:
+        vary.append(b"Accept-Encoding")
+    out.append((b"content-encoding", encoding.encode()))
+    out.append((b"content-length", str(size).encode()))
+    out.append((b"vary", b", ".join(vary)))
+    return out
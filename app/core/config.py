@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -7,15 +8,76 @@ class Settings(BaseSettings):
     # Supabase
     SUPABASE_URL: str
     SUPABASE_KEY: str
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_TIMEOUT_SECONDS: float = 10.0
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 100
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 20
+    SUPABASE_POOL_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
     
     # Google Auth
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
+    GOOGLE_TOKEN_URL: str = "https://oauth2.googleapis.com/token"
+    GOOGLE_CERTS_URL: str = "https://www.googleapis.com/oauth2/v1/certs"
+    GOOGLE_CERTS_MIN_REFRESH_SECONDS: float = 60.0 # Unknown key ids refetch the certs at most this often
     
     # Security
     SECRET_KEY: str # For local JWT signing
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7 # 1 week
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32 # Beyond this, logins get a fast 503
+    ADMIN_API_KEY: Optional[str] = None # Enables the /admin endpoints when set
+    PRINCIPAL_CACHE_MAXSIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    TOKEN_CACHE_MAXSIZE: int = 10_000
+    TOKEN_CACHE_TTL_SECONDS: int = 60 * 60
+
+    # Content Catalog
+    CONTENT_CATALOG_TTL_SECONDS: int = 300
+    MODULES_PAYLOAD_CACHE_SIZE: int = 4096
+    COMPRESSION_MINIMUM_SIZE: int = 1024 # Smaller bodies are sent as is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5
+    COMPRESSION_CACHE_SIZE: int = 2048
+    COMPRESSION_CACHE_TTL_SECONDS: int = 60 * 60
+    JOB_QUEUE_PATH: str = "kulture_jobs.sqlite3" # Local SQLite outbox; processes on one host may share it
+    JOB_WORKERS: int = 4
+    JOB_MAX_ATTEMPTS: int = 6
+    JOB_RETRY_BASE_SECONDS: float = 1.0 # Doubles per attempt
+    JOB_RETRY_MAX_SECONDS: float = 5 * 60
+    JOB_LEASE_SECONDS: int = 60 # A running job not finished by then is claimed again
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_RESULT_TTL_SECONDS: int = 24 * 60 * 60
+    JOB_PURGE_INTERVAL_SECONDS: int = 10 * 60
+    ATTEMPT_RECONCILE_INTERVAL_SECONDS: int = 5 * 60
+    ATTEMPT_RECONCILE_GRACE_SECONDS: int = 2 * 60 # Unapplied attempts younger than this are left to the queue
+    SCRIPT_BUNDLE_CACHE_SIZE: int = 1024
+    SCRIPT_BUNDLE_TTL_SECONDS: int = 60 * 60 * 24
+    AVATAR_REFRESH_INTERVAL_SECONDS: int = 600
+    ARTIFACT_STREAM_PAGE_SIZE: int = 200
+    LEADERBOARD_REBUILD_INTERVAL_SECONDS: int = 60 * 60
+    LEADERBOARD_REBUILD_CHUNK_SIZE: int = 1000
+    STREAK_RESET_INTERVAL_SECONDS: int = 60 * 60
+    STREAK_RESET_BATCH_SIZE: int = 5000
+
+    # Answer grading
+    GRADING_PASS_PERCENTAGE: int = 80 # Minimum similarity (0-100) for an answer to count as correct
+    GRADING_CDIST_WORKERS: int = 1
+
+    # Speech-to-text for audio answers
+    SPEECH_ENGINE: Optional[str] = None # "module:Class" implementing SpeechEngine; audio answers return 503 while unset
+    SPEECH_WORKERS: int = 2
+    SPEECH_MAX_PENDING: int = 16 # Beyond this, audio uploads get a fast 503
+    SPEECH_JOB_TIMEOUT_SECONDS: float = 30.0
+    SPEECH_JOB_TTL_SECONDS: int = 600 # How long finished jobs stay pollable
+    SPEECH_MAX_UPLOAD_BYTES: int = 5 * 1024 * 1024
+
+    # Observability
+    LOG_LEVEL: str = "INFO"
+    LOG_SUCCESS_SAMPLE_RATE: float = 1.0 # Share of non-error requests logged; errors are always logged
+    METRICS_SLOW_REQUEST_SECONDS: float = 1.0
+    METRICS_SLOW_REQUEST_SAMPLE_RATE: float = 1.0 # Share of slow requests logged with their query breakdown
 
     model_config = SettingsConfigDict(env_file=".env")
 
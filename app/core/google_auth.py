@@ -0,0 +1,135 @@
+import asyncio
+import re
+import time
+from typing import Dict, Optional
+import httpx
+from google.auth import jwt as google_jwt
+from app.core.config import settings
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+DEFAULT_CERTS_MAX_AGE_SECONDS = 3600
+
+
+class GoogleAuthError(Exception):
+    """
+    Raised when the code exchange or ID token verification fails.
+    """
+
+
+def _max_age(cache_control: Optional[str]) -> int:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE_SECONDS
+
+
+class GoogleAuthClient:
+    """
+    Exchanges Google authorization codes and verifies ID tokens locally.
+    Uses one pooled HTTP client for all calls, and caches Google's signing
+    certificates until their Cache-Control max-age expires. A token signed
+    with a key id missing from the cached set (a rotation) triggers an early
+    refetch, at most once per min_refresh_interval.
+    The transport is pluggable so tests can point it at a fake OAuth server.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        token_url: str,
+        certs_url: str,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        timeout: float = 10.0,
+        min_refresh_interval: float = 60.0,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_url = token_url
+        self.certs_url = certs_url
+        self._http = httpx.AsyncClient(
+            transport=transport,
+            timeout=timeout,
+            http2=transport is None,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+        self._certs: Dict[str, str] = {}
+        self._certs_expire_at = 0.0
+        self._certs_fetched_at = float("-inf")
+        self.min_refresh_interval = min_refresh_interval
+        self._certs_lock = asyncio.Lock()
+
+    async def exchange_code(self, code: str, redirect_uri: str = "postmessage") -> dict:
+        response = await self._http.post(self.token_url, data={
+            "code": code,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "redirect_uri": redirect_uri,
+            "grant_type": "authorization_code"
+        })
+        if response.is_error:
+            raise GoogleAuthError(f"Token exchange failed with status {response.status_code}")
+        return response.json()
+
+    def _certs_usable(self, kid: Optional[str]) -> bool:
+        if not self._certs or time.monotonic() >= self._certs_expire_at:
+            return False
+        if kid is None or kid in self._certs:
+            return True
+        # Unknown key id: only refetch if the last fetch is old enough, so a
+        # stream of forged or garbage tokens cannot hammer Google's endpoint
+        return time.monotonic() - self._certs_fetched_at < self.min_refresh_interval
+
+    async def get_certs(self, kid: Optional[str] = None) -> Dict[str, str]:
+        """
+        Cached signing certificates; refetched when expired, or early when kid
+        is not among them (the signing key may have rotated).
+        """
+        if self._certs_usable(kid):
+            return self._certs
+
+        async with self._certs_lock:
+            # Another request may have refreshed them while we waited
+            if self._certs_usable(kid):
+                return self._certs
+            response = await self._http.get(self.certs_url)
+            if response.is_error:
+                raise GoogleAuthError(f"Fetching Google certificates failed with status {response.status_code}")
+            self._certs = response.json()
+            self._certs_fetched_at = time.monotonic()
+            self._certs_expire_at = self._certs_fetched_at + _max_age(response.headers.get("cache-control"))
+            return self._certs
+
+    async def verify_id_token(self, token: str) -> dict:
+        try:
+            kid = google_jwt.decode_header(token).get("kid")
+        except (ValueError, TypeError) as e:
+            raise GoogleAuthError(f"Malformed ID token: {e}")
+        certs = await self.get_certs(kid)
+        try:
+            id_info = google_jwt.decode(token, certs=certs, audience=self.client_id)
+        except ValueError as e:
+            raise GoogleAuthError(str(e))
+
+        if id_info.get("iss") not in GOOGLE_ISSUERS:
+            raise GoogleAuthError(f"Wrong issuer: {id_info.get('iss')}")
+        return id_info
+
+    async def authenticate(self, code: str) -> dict:
+        """
+        Exchanges the authorization code and returns the verified ID token claims.
+        """
+        tokens = await self.exchange_code(code)
+        if "id_token" not in tokens:
+            raise GoogleAuthError("No id_token in token response")
+        return await self.verify_id_token(tokens["id_token"])
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+
+google_auth = GoogleAuthClient(
+    client_id=settings.GOOGLE_CLIENT_ID,
+    client_secret=settings.GOOGLE_CLIENT_SECRET,
+    token_url=settings.GOOGLE_TOKEN_URL,
+    certs_url=settings.GOOGLE_CERTS_URL,
+    min_refresh_interval=settings.GOOGLE_CERTS_MIN_REFRESH_SECONDS,
+)
@@ -0,0 +1,50 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+# Cache-Control policies shared by the read-mostly routes
+NO_CACHE = "private, no-cache" # Per-user data: always revalidate, 304 when unchanged
+PRIVATE_SHORT = "private, max-age=60"
+PUBLIC_CONTENT = "public, max-age=300, stale-while-revalidate=3600" # Unauthenticated routes only
+PRIVATE_CONTENT = "private, max-age=300, stale-while-revalidate=3600" # Catalog content behind auth: browser cache only
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(request: Request, etag: str, cache_control: str = NO_CACHE) -> Optional[Response]:
+    """
+    Returns a 304 when the client already holds this version, otherwise None.
+    Routes that know their version up front call this before doing any work.
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    return None
+
+
+def cached_response(
+    request: Request,
+    body: bytes,
+    etag: Optional[str] = None,
+    cache_control: str = NO_CACHE,
+    media_type: str = "application/json",
+) -> Response:
+    """
+    Sends an already serialized body with ETag and Cache-Control headers,
+    or a bodiless 304 when If-None-Match matches.
+    The ETag is the content hash unless the caller supplies a version.
+    """
+    etag = etag or etag_for(body)
+    return not_modified(request, etag, cache_control) or Response(
+        content=body,
+        media_type=media_type,
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
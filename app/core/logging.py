@@ -1,32 +1,172 @@
-import time
+import json
 import logging
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Optional
 from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+from app.core.config import settings
 
 # Setup Logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("kulture_api")
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        # Log Request
-        logger.info(f"Incoming Request: {request.method} {request.url}")
-        
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=` and is emitted as a field
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, message, request id and any `extra=` fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = _request_id.get()
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # Hand the record over as-is; JSON formatting happens on the listener thread
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_log_queue: SimpleQueue = SimpleQueue()
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(JsonFormatter())
+_listener = QueueListener(_log_queue, _stream_handler, respect_handler_level=True)
+
+_queue_handler = _DeferredQueueHandler(_log_queue)
+_queue_handler.addFilter(RequestIdFilter())
+logger.addHandler(_queue_handler)
+logger.setLevel(settings.LOG_LEVEL)
+logger.propagate = False
+
+
+def start_log_listener() -> None:
+    """
+    Starts the background thread that writes queued records.
+    Runs at import so start-up logs are written; the app lifespan restarts it after a stop.
+    """
+    if _listener._thread is None:
+        _listener.start()
+
+
+def stop_log_listener() -> None:
+    """
+    Flushes pending records and stops the writer thread.
+    """
+    if _listener._thread is not None:
+        _listener.stop()
+
+
+start_log_listener()
+
+
+class LoggingMiddleware:
+    """
+    Pure ASGI middleware assigning each request an id (X-Request-ID, taken from the
+    caller when supplied) and emitting one structured record per request.
+    Successful requests are sampled at LOG_SUCCESS_SAMPLE_RATE; errors are always logged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = _incoming_request_id(scope) or uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = _request_id.set(request_id)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode())]
+            await send(message)
+
         try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            logger.info(f"Response: {response.status_code} | Time: {process_time:.4f}s")
-            return response
+            await self.app(scope, receive, send_with_request_id)
         except Exception as e:
-            process_time = time.time() - start_time
-            logger.error(f"Request Failed: {e} | Time: {process_time:.4f}s")
-            raise e # Re-raise for exception handler
+            logger.error(
+                "Request failed",
+                extra=_request_fields(scope, 500, start, error=repr(e))
+            )
+            raise
+        else:
+            if status_code >= 400 or random.random() < settings.LOG_SUCCESS_SAMPLE_RATE:
+                logger.log(
+                    logging.WARNING if status_code >= 500 else logging.INFO,
+                    "Request handled",
+                    extra=_request_fields(scope, status_code, start)
+                )
+        finally:
+            _request_id.reset(token)
+
+
+def _incoming_request_id(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            value = value.decode("latin-1")
+            return value if 0 < len(value) <= 64 else None
+    return None
+
+
+def _request_fields(scope, status_code: int, start: float, **fields) -> dict:
+    return {
+        "method": scope["method"],
+        "path": scope["path"],
+        "route": getattr(scope.get("route"), "path", None),
+        "status": status_code,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+        **fields,
+    }
+
 
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Global Exception: {exc}")
+    logger.error(
+        f"Global Exception: {exc}",
+        exc_info=exc,
+        extra={"request_id": getattr(request.state, "request_id", None)}
+    )
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal Server Error. Our team has been notified."},
@@ -0,0 +1,185 @@
+import random
+import re
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+import httpx
+from app.core.config import settings
+from app.core.logging import logger
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+_REST_PATH = re.compile(r"/rest/v1/(rpc/)?([^/?]+)")
+_OPERATIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "PUT": "upsert", "DELETE": "delete"}
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram, exported in Prometheus cumulative form.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        running, out = 0, []
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            out.append((repr(bound), running))
+        out.append(("+Inf", self.count))
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, str], int] = {} # (method, route, status) -> count
+        self.request_latency: Dict[Tuple[str, str], Histogram] = {} # (method, route)
+        self.queries: Dict[Tuple[str, str, str], int] = {} # (table, operation, outcome) -> count
+        self.query_latency: Dict[Tuple[str, str], Histogram] = {} # (table, operation)
+        self.queries_per_request: Dict[Tuple[str, str], Histogram] = {}
+        self.job_latency: Dict[Tuple[str, str], Histogram] = {} # (pool, phase) for background jobs
+
+    def observe_request(self, method: str, route: str, status: int, duration: float, query_count: int) -> None:
+        key = (method, route, str(status))
+        self.requests[key] = self.requests.get(key, 0) + 1
+        self.request_latency.setdefault((method, route), Histogram()).observe(duration)
+        self.queries_per_request.setdefault((method, route), Histogram(QUERY_COUNT_BUCKETS)).observe(query_count)
+
+    def observe_query(self, table: str, operation: str, outcome: str, duration: float) -> None:
+        key = (table, operation, outcome)
+        self.queries[key] = self.queries.get(key, 0) + 1
+        self.query_latency.setdefault((table, operation), Histogram()).observe(duration)
+
+    def observe_job(self, pool: str, phase: str, duration: float) -> None:
+        self.job_latency.setdefault((pool, phase), Histogram()).observe(duration)
+
+
+registry = MetricsRegistry()
+
+# Queries issued while serving the current request: (table, operation, seconds)
+_request_queries: ContextVar[Optional[List[Tuple[str, str, float]]]] = ContextVar("request_queries", default=None)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps the Supabase HTTP transport to time every PostgREST call,
+    labelled by table (or RPC name) and operation.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        match = _REST_PATH.search(request.url.path)
+        if match:
+            table = match.group(2)
+            operation = "rpc" if match.group(1) else _OPERATIONS.get(request.method, request.method.lower())
+        else:
+            table, operation = "auth", request.method.lower()
+
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await self.inner.handle_async_request(request)
+            outcome = "ok" if response.status_code < 400 else "error"
+            return response
+        finally:
+            duration = time.perf_counter() - start
+            registry.observe_query(table, operation, outcome, duration)
+            queries = _request_queries.get()
+            if queries is not None:
+                queries.append((table, operation, duration))
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency (monotonic clock) and
+    database calls per request. Slow requests are sampled to the log
+    together with their query breakdown.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        queries: List[Tuple[str, str, float]] = []
+        token = _request_queries.set(queries)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            _request_queries.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            registry.observe_request(scope["method"], route, status_code, duration, len(queries))
+
+            if duration >= settings.METRICS_SLOW_REQUEST_SECONDS and random.random() < settings.METRICS_SLOW_REQUEST_SAMPLE_RATE:
+                breakdown = ", ".join(f"{op} {table} {q * 1000:.1f}ms" for table, op, q in queries)
+                logger.warning(
+                    f"Slow request: {scope['method']} {route} {status_code} {duration * 1000:.1f}ms "
+                    f"| {len(queries)} queries: {breakdown}"
+                )
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, histograms: Dict[tuple, Histogram], label_names: Tuple[str, ...]) -> List[str]:
+    lines = [f"# TYPE {name} histogram"]
+    for key, hist in sorted(histograms.items()):
+        labels = dict(zip(label_names, key))
+        for bound, count in hist.cumulative():
+            lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+        lines.append(f"{name}_sum{_labels(**labels)} {hist.total}")
+        lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+    return lines
+
+
+def render_prometheus(extra_gauges: Optional[Dict[str, Dict[tuple, float]]] = None) -> str:
+    """
+    Renders all metrics in the Prometheus text exposition format.
+    extra_gauges maps a metric name to {((label, value), ...): number}.
+    """
+    lines = ["# TYPE kulture_http_requests_total counter"]
+    for (method, route, status), count in sorted(registry.requests.items()):
+        lines.append(f"kulture_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+    lines += _histogram_lines("kulture_http_request_duration_seconds", registry.request_latency, ("method", "route"))
+    lines += _histogram_lines("kulture_db_queries_per_request", registry.queries_per_request, ("method", "route"))
+
+    lines.append("# TYPE kulture_db_queries_total counter")
+    for (table, operation, outcome), count in sorted(registry.queries.items()):
+        lines.append(f"kulture_db_queries_total{_labels(table=table, operation=operation, outcome=outcome)} {count}")
+    lines += _histogram_lines("kulture_db_query_duration_seconds", registry.query_latency, ("table", "operation"))
+    lines += _histogram_lines("kulture_job_duration_seconds", registry.job_latency, ("pool", "phase"))
+
+    for name, series in (extra_gauges or {}).items():
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in series.items():
+            lines.append(f"{name}{_labels(**dict(labels)) if labels else ''} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -1,7 +1,11 @@
-from datetime import datetime, timedelta
-from typing import Optional, Any
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Any, Callable, Tuple
 from jose import jwt
 from app.core.config import settings
+from app.models.auth import Parent
 from pwdlib import PasswordHash
 
 password_hash = PasswordHash.recommended()
@@ -12,12 +16,104 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return password_hash.verify(plain_password, hashed_password)
 
-def create_access_token(subject: str | Any, expires_delta: timedelta = None) -> str:
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+class HashingPoolSaturated(Exception):
+    """
+    Raised when the hashing pool already has its maximum of pending jobs.
+    """
+
+class PasswordHashingPool:
+    """
+    Bounded executor for Argon2 work, kept off the event loop.
+    argon2-cffi releases the GIL, so a small thread pool gets real parallelism.
+    Requests beyond max_pending are rejected immediately instead of queueing.
+    A job holds its slot until its thread finishes, even if the request that
+    started it was cancelled meanwhile.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock() # Counters are updated from the pool's threads
+        self.pending = 0 # queued + running
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingPoolSaturated()
+            self.pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._finished(None)
+            raise
+        future.add_done_callback(self._finished)
+        return await asyncio.wrap_future(future)
+
+    def _finished(self, future: Optional[Future]) -> None:
+        with self._lock:
+            self.pending -= 1
+            if future is None or future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "queue_depth": max(self.pending - self.workers, 0),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+hashing_pool = PasswordHashingPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
+async def hash_password(password: str) -> str:
+    return await hashing_pool.run(password_hash.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies the password and, when the stored hash uses outdated parameters,
+    also returns a fresh hash to persist (None otherwise).
+    """
+    return await hashing_pool.run(password_hash.verify_and_update, plain_password, hashed_password)
+
+# Layout of the profile claims below; tokens carrying another version are
+# resolved through the database instead of being trusted
+TOKEN_CLAIMS_VERSION = 1
+
+def parent_claims(parent: Parent) -> dict:
+    """
+    Compact profile claims that let Parent be rebuilt from the token alone.
+    """
+    return {"email": parent.email, "name": parent.full_name, "gid": parent.google_id, "ver": TOKEN_CLAIMS_VERSION}
+
+def parent_from_claims(payload: dict) -> Optional[Parent]:
+    if payload.get("ver") != TOKEN_CLAIMS_VERSION:
+        return None
+    return Parent(id=payload["sub"], email=payload["email"], full_name=payload.get("name"), google_id=payload.get("gid"))
+
+def create_access_token(subject: str | Any, expires_delta: timedelta = None, claims: Optional[dict] = None) -> str:
+    now = datetime.now(timezone.utc)
+    expire = now + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    # Sub-second iat so a token issued right after a revocation is not mistaken for an older one
+    to_encode = {**(claims or {}), "exp": expire, "iat": now.timestamp(), "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verifies signature and expiry. Raises JWTError when the token is invalid.
+    """
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -0,0 +1,20 @@
+from typing import Any, Type
+import orjson
+from pydantic import BaseModel
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def trusted_dump(model: Type[BaseModel], row: dict) -> dict:
+    """
+    Shapes a row we wrote ourselves like `model(**row).model_dump(mode="json")`,
+    without validating it: keeps only the model's fields and fills in defaults.
+    Only for flat models whose field values are already JSON types, as
+    Supabase returns them.
+    """
+    return {
+        name: row[name] if name in row else field.get_default(call_default_factory=True)
+        for name, field in model.model_fields.items()
+    }
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.http_cache import etag_for
+from app.core.logging import logger
+from app.db.supabase import supabase
+
+FilterKey = Tuple[Optional[str], Optional[str]] # (language, gender), None = any
+
+
+@dataclass(frozen=True)
+class AvatarPayload:
+    body: bytes
+    etag: str
+
+
+@dataclass(frozen=True)
+class AvatarIndex:
+    """
+    The avatar dictionary, pre-serialized for every language/gender filter.
+    Format: { "yoruba": { "boy": ["url1", "url2"], "girl": ["url3"] }, "twi": ... }
+    """
+    payloads: Dict[FilterKey, AvatarPayload]
+
+    def payload_for(self, language: Optional[str] = None, gender: Optional[str] = None) -> AvatarPayload:
+        key = (language.lower() if language else None, gender.lower() if gender else None)
+        return self.payloads.get(key) or EMPTY_PAYLOAD
+
+
+def _serialize(avatar_dict: Dict[str, Dict[str, List[str]]]) -> AvatarPayload:
+    body = json.dumps(avatar_dict, separators=(",", ":")).encode()
+    return AvatarPayload(body=body, etag=etag_for(body))
+
+
+EMPTY_PAYLOAD = _serialize({})
+_index: Optional[AvatarIndex] = None
+
+
+def build_avatar_index(rows: List[dict]) -> AvatarIndex:
+    avatar_dict = defaultdict(lambda: defaultdict(list))
+
+    for av in rows:
+        lang = (av.get("language") or "").lower()
+        gen = (av.get("gender") or "").lower()
+        url = av.get("image_url")
+        if lang and gen and url:
+            avatar_dict[lang][gen].append(url)
+
+    payloads = {(None, None): _serialize(avatar_dict)}
+    genders = {gen for by_gender in avatar_dict.values() for gen in by_gender}
+    for lang, by_gender in avatar_dict.items():
+        payloads[(lang, None)] = _serialize({lang: by_gender})
+        for gen, urls in by_gender.items():
+            payloads[(lang, gen)] = _serialize({lang: {gen: urls}})
+    for gen in genders:
+        payloads[(None, gen)] = _serialize({
+            lang: {gen: by_gender[gen]} for lang, by_gender in avatar_dict.items() if gen in by_gender
+        })
+
+    return AvatarIndex(payloads=payloads)
+
+
+async def refresh_avatar_index() -> AvatarIndex:
+    global _index
+    response = await supabase.table("avatars").select("language, gender, image_url").execute()
+    _index = build_avatar_index(response.data or [])
+    return _index
+
+
+async def get_avatar_index() -> AvatarIndex:
+    """
+    Returns the prebuilt index; only builds it inline if startup warm-up failed.
+    """
+    return _index or await refresh_avatar_index()
+
+
+async def run_avatar_refresher() -> None:
+    """
+    Background task that keeps the index fresh. Started from the app lifespan.
+    """
+    while True:
+        await asyncio.sleep(settings.AVATAR_REFRESH_INTERVAL_SECONDS)
+        try:
+            await refresh_avatar_index()
+        except Exception as e:
+            logger.error(f"Avatar index refresh failed: {e}")
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import asyncio
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, FrozenSet, List, Optional
+from pydantic import TypeAdapter
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.supabase import supabase
+from app.models.content import Module
+
+_modules_adapter = TypeAdapter(List[Module])
+
+
+@dataclass(frozen=True)
+class ContentCatalog:
+    """
+    Immutable snapshot of the curriculum (modules -> levels -> scenarios).
+    Levels and scenarios are pre-sorted by order_index so readers never sort.
+    module_payloads / level_payloads hold the same tree validated against the
+    response models once, as JSON-ready dicts, so hot routes skip Pydantic.
+    """
+    version: str
+    loaded_at: float
+    modules_by_language: Dict[str, List[dict]]
+    levels: Dict[str, dict]
+    scenarios: Dict[str, dict]
+    level_scenario_ids: Dict[str, FrozenSet[str]]
+    module_payloads: Dict[str, List[dict]]
+    level_payloads: Dict[str, dict]
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.loaded_at >= settings.CONTENT_CATALOG_TTL_SECONDS
+
+
+_lock = asyncio.Lock()
+_catalog: Optional[ContentCatalog] = None
+
+
+async def _fetch_content_tree() -> List[dict]:
+    response = await supabase.table("modules").select("*, levels(*, scenarios(*))").order("order_index").execute()
+    return response.data or []
+
+
+def build_catalog(rows: List[dict]) -> ContentCatalog:
+    """
+    Builds the catalog from the raw modules tree returned by Supabase.
+    The version is a fingerprint of the content, so every worker agrees on it.
+    """
+    version = hashlib.sha256(json.dumps(rows, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    modules_by_language: Dict[str, List[dict]] = {}
+    levels: Dict[str, dict] = {}
+    scenarios: Dict[str, dict] = {}
+    level_scenario_ids: Dict[str, FrozenSet[str]] = {}
+
+    for m_data in sorted(rows, key=lambda x: x['order_index']):
+        module_levels = sorted(m_data.get('levels') or [], key=lambda x: x['order_index'])
+
+        for level in module_levels:
+            level['scenarios'] = sorted(level.get('scenarios') or [], key=lambda x: x.get('order_index', 0))
+            for s in level['scenarios']:
+                scenarios[s['id']] = s
+            levels[level['id']] = level
+            level_scenario_ids[level['id']] = frozenset(s['id'] for s in level['scenarios'])
+
+        m_data['levels'] = module_levels
+        modules_by_language.setdefault(m_data['language'].lower(), []).append(m_data)
+
+    module_payloads = {
+        language: _modules_adapter.dump_python(_modules_adapter.validate_python(modules), mode="json")
+        for language, modules in modules_by_language.items()
+    }
+    level_payloads = {
+        level['id']: level
+        for modules in module_payloads.values() for module in modules for level in module['levels']
+    }
+
+    return ContentCatalog(
+        version=version,
+        loaded_at=time.monotonic(),
+        modules_by_language=modules_by_language,
+        levels=levels,
+        scenarios=scenarios,
+        level_scenario_ids=level_scenario_ids,
+        module_payloads=module_payloads,
+        level_payloads=level_payloads,
+    )
+
+
+async def reload_catalog() -> ContentCatalog:
+    """
+    Forces a rebuild of the catalog from the database.
+    """
+    global _catalog
+    async with _lock:
+        _catalog = build_catalog(await _fetch_content_tree())
+        logger.info(f"Content catalog loaded (version {_catalog.version})")
+        return _catalog
+
+
+async def get_catalog() -> ContentCatalog:
+    """
+    Returns the in-process catalog, rebuilding it once the TTL has expired.
+    If a refresh fails, the previous snapshot keeps being served.
+    """
+    global _catalog
+    catalog = _catalog
+    if catalog is not None and not catalog.is_stale():
+        return catalog
+
+    async with _lock:
+        # Another request may have refreshed it while we waited
+        if _catalog is not None and not _catalog.is_stale():
+            return _catalog
+        try:
+            _catalog = build_catalog(await _fetch_content_tree())
+        except Exception as e:
+            if _catalog is None:
+                raise
+            logger.error(f"Content catalog refresh failed, serving version {_catalog.version}: {e}")
+            _catalog = replace(_catalog, loaded_at=time.monotonic())
+        return _catalog
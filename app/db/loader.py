@@ -0,0 +1,151 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+from app.db.supabase import supabase
+
+# (table, column, columns) identifies a family of key lookups that can share one in_() query
+BatchKey = Tuple[str, str, str]
+LoadKey = Tuple[str, str, str, str]
+
+# Lookups currently on the wire in any request, for single-flight across callers
+_inflight: Dict[LoadKey, asyncio.Future] = {}
+
+# Running batch queries; the event loop keeps only weak references to tasks
+_dispatches: Set[asyncio.Task] = set()
+
+
+class RequestLoader:
+    """
+    Per-request data loader for row lookups by key.
+    - Identical lookups within a request are memoized.
+    - Keys requested in the same event loop tick against the same table are
+      batched into a single in_() query.
+    - A lookup already in flight (from this or any other request) is awaited
+      instead of being sent again.
+    """
+
+    def __init__(self):
+        self._results: Dict[LoadKey, Optional[dict]] = {}
+        self._pending: Dict[BatchKey, Dict[str, asyncio.Future]] = {}
+        self.queries = 0
+        self.saved = 0
+
+    async def load(self, table: str, value: Hashable, column: str = "id", columns: str = "*") -> Optional[dict]:
+        """
+        Returns the row of `table` whose `column` equals `value`, or None.
+        """
+        value = str(value)
+        key = (table, column, columns, value)
+        if key in self._results:
+            self.saved += 1
+            return self._results[key]
+
+        future = _inflight.get(key)
+        if future is not None:
+            self.saved += 1
+        else:
+            future = self._enqueue((table, column, columns), value)
+
+        row = await asyncio.shield(future)
+        self._results[key] = row
+        return row
+
+    async def load_many(self, table: str, values: List[Hashable], column: str = "id", columns: str = "*") -> List[Optional[dict]]:
+        return list(await asyncio.gather(*(self.load(table, v, column, columns) for v in values)))
+
+    def prime(self, table: str, row: dict, column: str = "id", columns: str = "*") -> None:
+        """
+        Seeds the memo with a row the request already has, e.g. after a write.
+        """
+        self._results[(table, column, columns, str(row[column]))] = row
+
+    def _enqueue(self, batch_key: BatchKey, value: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(batch_key)
+        if batch is None:
+            batch = self._pending[batch_key] = {}
+            # Dispatch once every caller scheduled in this tick has added its key
+            loop.call_soon(self._start_dispatch, batch_key)
+        elif value in batch:
+            self.saved += 1
+            return batch[value]
+        elif batch:
+            self.saved += 1 # Folded into a query that is going out anyway
+
+        future = batch[value] = loop.create_future()
+        _inflight[(*batch_key, value)] = future
+        return future
+
+    def _start_dispatch(self, batch_key: BatchKey) -> None:
+        task = asyncio.ensure_future(self._dispatch(batch_key))
+        _dispatches.add(task)
+        task.add_done_callback(_dispatches.discard)
+
+    async def _dispatch(self, batch_key: BatchKey) -> None:
+        batch = self._pending.pop(batch_key)
+        table, column, columns = batch_key
+        values = list(batch)
+        self.queries += 1
+        try:
+            query = supabase.table(table).select(columns)
+            if len(values) == 1:
+                query = query.eq(column, values[0])
+            else:
+                query = query.in_(column, values)
+            res = await query.execute()
+            rows = {str(r[column]): r for r in res.data or []}
+            for value, future in batch.items():
+                future.set_result(rows.get(value))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for value, future in batch.items():
+                if _inflight.get((*batch_key, value)) is future:
+                    del _inflight[(*batch_key, value)]
+                # Nobody may be waiting if the callers were cancelled
+                if future.done() and not future.cancelled():
+                    future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queries": self.queries, "saved": self.saved}
+
+
+_current_loader: ContextVar[Optional[RequestLoader]] = ContextVar("request_loader", default=None)
+
+
+def get_loader() -> RequestLoader:
+    """
+    Returns the loader bound to the current request.
+    Outside a request (background jobs) a fresh, unshared loader is returned.
+    """
+    return _current_loader.get() or RequestLoader()
+
+
+class RequestLoaderMiddleware:
+    """
+    Pure ASGI middleware that binds a RequestLoader to each HTTP request
+    and reports its savings in the X-Queries-Saved response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        loader = RequestLoader()
+        token = _current_loader.set(loader)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-queries-saved", str(loader.saved).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_loader.reset(token)
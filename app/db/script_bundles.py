@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from app.core.cache import InstrumentedTTLCache
+from app.core.config import settings
+from app.core.http_cache import etag_for
+from app.db.catalog import ContentCatalog, get_catalog
+from app.db.supabase import supabase
+from app.models.content import DialogueNode, ScenarioDetail
+
+
+@dataclass(frozen=True)
+class ScriptBundle:
+    """
+    A scenario with its full dialogue script, validated once and pre-serialized.
+    """
+    scenario: ScenarioDetail
+    body: bytes
+    etag: str
+
+
+# Keyed by (catalog version, scenario_id) so a content release never serves an old script.
+# The version covers modules, levels and scenarios only; node and persona edits
+# show up once the bundles are cleared by a catalog reload.
+_bundles = InstrumentedTTLCache("script_bundles", settings.SCRIPT_BUNDLE_CACHE_SIZE, settings.SCRIPT_BUNDLE_TTL_SECONDS)
+
+
+def compile_bundle(scenario_data: dict, node_rows: List[dict]) -> ScriptBundle:
+    nodes_data = []
+    for n in node_rows:
+        n = dict(n)
+        # Inline the joined persona data if it exists
+        persona_data = n.pop('personas', None)
+        if persona_data:
+            n['persona_name'] = persona_data.get('name')
+            n['persona_avatar_url'] = persona_data.get('avatar_url')
+        nodes_data.append(DialogueNode(**n))
+
+    scenario = ScenarioDetail(**scenario_data)
+    scenario.nodes = nodes_data
+    body = scenario.model_dump_json().encode()
+    return ScriptBundle(scenario=scenario, body=body, etag=etag_for(body))
+
+
+async def _compile_bundles(catalog: ContentCatalog, scenario_ids: List[str]) -> Dict[str, ScriptBundle]:
+    # One query for the nodes of every requested scenario
+    n_res = await supabase.table("scenario_nodes").select("*, personas(name, avatar_url)").in_("scenario_id", scenario_ids).order("order_index").execute()
+
+    nodes_by_scenario: Dict[str, List[dict]] = {s_id: [] for s_id in scenario_ids}
+    for n in n_res.data or []:
+        nodes_by_scenario[n['scenario_id']].append(n)
+
+    compiled = {}
+    for s_id in scenario_ids:
+        bundle = compile_bundle(catalog.scenarios[s_id], nodes_by_scenario[s_id])
+        _bundles.set((catalog.version, s_id), bundle)
+        compiled[s_id] = bundle
+    return compiled
+
+
+def clear_script_bundles() -> None:
+    """
+    Drops every compiled bundle, so the next request recompiles from the database.
+    """
+    _bundles.clear()
+
+
+async def get_script_bundle(scenario_id: str) -> Optional[ScriptBundle]:
+    """
+    Returns the compiled bundle for a scenario, or None if it does not exist.
+    """
+    catalog = await get_catalog()
+    if scenario_id not in catalog.scenarios:
+        return None
+
+    bundle = _bundles.get((catalog.version, scenario_id))
+    if bundle is None:
+        bundle = (await _compile_bundles(catalog, [scenario_id]))[scenario_id]
+    return bundle
+
+
+async def get_level_bundles(level_id: str) -> Optional[List[ScriptBundle]]:
+    """
+    Returns the bundles of every scenario in a level, in play order.
+    Missing bundles are compiled together in a single query.
+    """
+    catalog = await get_catalog()
+    level = catalog.levels.get(level_id)
+    if level is None:
+        return None
+
+    scenario_ids = [s['id'] for s in level['scenarios']]
+    bundles = {s_id: _bundles.get((catalog.version, s_id)) for s_id in scenario_ids}
+    missing = [s_id for s_id, bundle in bundles.items() if bundle is None]
+    if missing:
+        bundles.update(await _compile_bundles(catalog, missing))
+
+    return [bundles[s_id] for s_id in scenario_ids]
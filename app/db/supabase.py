@@ -1,4 +1,41 @@
-from supabase import create_client, Client
+import httpx
+from supabase import AsyncClient, AsyncClientOptions
 from app.core.config import settings
+from app.core.metrics import InstrumentedTransport
 
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+# One pooled HTTP/2 connection pool shared by every PostgREST/Auth call,
+# wrapped so each query is counted and timed per table and operation
+transport = InstrumentedTransport(httpx.AsyncHTTPTransport(
+    http2=settings.SUPABASE_HTTP2,
+    limits=httpx.Limits(
+        max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_EXPIRY_SECONDS,
+    ),
+))
+
+http_client = httpx.AsyncClient(
+    transport=transport,
+    timeout=httpx.Timeout(settings.SUPABASE_TIMEOUT_SECONDS),
+    follow_redirects=True,
+)
+
+supabase: AsyncClient = AsyncClient(
+    settings.SUPABASE_URL,
+    settings.SUPABASE_KEY,
+    options=AsyncClientOptions(httpx_client=http_client),
+)
+
+def use_transport(inner: httpx.AsyncBaseTransport) -> None:
+    """
+    Sends every Supabase call through `inner` instead of the network, keeping
+    the metrics wrapper. Must be called before the first request; used by the
+    benchmarks to run the app against an in-memory PostgREST stand-in.
+    """
+    transport.inner = inner
+
+async def close_supabase() -> None:
+    """
+    Releases the pooled connections. Called from the app lifespan on shutdown.
+    """
+    await http_client.aclose()
@@ -1,16 +1,72 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.auth import router as auth_router
 from app.api.profiles import router as profiles_router
 from app.api.content import router as content_router
 from app.api.game import router as game_router
 from app.api.artifacts import router as artifacts_router
+from app.api.leaderboard import router as leaderboard_router
 from app.core.config import settings
-from app.core.logging import LoggingMiddleware, global_exception_handler
+from app.core.cache import caches
+from app.core.security import hashing_pool
+from app.core.google_auth import google_auth
+from app.services.speech import speech_pool
+from app.services.jobs import job_queue
+from app.services.attempts import run_attempt_reconciler
+from app.services.leaderboard import run_leaderboard_refresher
+from app.services.streaks import run_streak_resetter
+from app.api.deps import require_admin
+from app.core.logging import LoggingMiddleware, global_exception_handler, logger, start_log_listener, stop_log_listener
+from app.core.metrics import MetricsMiddleware, render_prometheus
+from app.core.compression import CompressionMiddleware
+from app.db.catalog import get_catalog
+from app.db.avatars import refresh_avatar_index, run_avatar_refresher
+from app.db.supabase import close_supabase
+from app.db.loader import RequestLoaderMiddleware
 
-app = FastAPI(title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_log_listener()
+    # Warm the connection pool, the content catalog and the avatar index before taking traffic
+    try:
+        await get_catalog()
+    except Exception as e:
+        logger.error(f"Content catalog warm-up failed: {e}")
+    try:
+        await refresh_avatar_index()
+    except Exception as e:
+        logger.error(f"Avatar index warm-up failed: {e}")
+    avatar_refresher = asyncio.create_task(run_avatar_refresher())
+    leaderboard_refresher = asyncio.create_task(run_leaderboard_refresher())
+    streak_resetter = asyncio.create_task(run_streak_resetter())
+    job_queue.start()
+    attempt_reconciler = asyncio.create_task(run_attempt_reconciler())
+    yield
+    attempt_reconciler.cancel()
+    await job_queue.shutdown()
+    avatar_refresher.cancel()
+    leaderboard_refresher.cancel()
+    streak_resetter.cancel()
+    hashing_pool.shutdown()
+    speech_pool.shutdown()
+    await google_auth.aclose()
+    await close_supabase()
+    stop_log_listener()
 
+app = FastAPI(
+    title=settings.PROJECT_NAME,
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+
+app.add_middleware(RequestLoaderMiddleware)
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(CompressionMiddleware)
 app.add_exception_handler(Exception, global_exception_handler)
 
 app.add_middleware(
@@ -26,7 +82,39 @@ app.include_router(profiles_router, prefix="/profiles", tags=["Profiles"])
 app.include_router(content_router, prefix="/content", tags=["Content"])
 app.include_router(game_router, prefix="/game", tags=["Gameplay"])
 app.include_router(artifacts_router, prefix="/artifacts", tags=["Artifacts"])
+app.include_router(leaderboard_router, prefix="/leaderboard", tags=["Leaderboard"])
 
 @app.get("/")
 def root():
     return {"message": "Welcome to KULTURE API"}
+
+@app.get("/admin/stats", dependencies=[Depends(require_admin)])
+async def runtime_stats():
+    """
+    Hit/miss counters for the in-process caches and password hashing pool load.
+    """
+    return {
+        "caches": {name: cache.stats() for name, cache in caches.items()},
+        "password_hashing": hashing_pool.stats(),
+        "speech": speech_pool.stats(),
+        "jobs": await job_queue.stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """
+    Prometheus scrape endpoint: request latency per route, Supabase queries
+    per table/operation, cache hit rates and worker pool load.
+    """
+    gauges = {
+        f"kulture_cache_{field}": {(("cache", name),): cache.stats()[field] for name, cache in caches.items()}
+        for field in ("hits", "misses", "size")
+    }
+    for key, value in hashing_pool.stats().items():
+        gauges[f"kulture_password_hashing_{key}"] = {(): value}
+    for key, value in speech_pool.stats().items():
+        gauges[f"kulture_speech_{key}"] = {(): value}
+    for key, value in (await job_queue.stats()).items():
+        gauges[f"kulture_jobs_{key}"] = {(): value}
+    return PlainTextResponse(render_prometheus(gauges), media_type="text/plain; version=0.0.4")
+
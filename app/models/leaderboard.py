@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from uuid import UUID
+from typing import List, Optional
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    display_name: str
+    avatar_url: Optional[str] = None
+    respect_score: int
+
+class LeaderboardPage(BaseModel):
+    board: str
+    total: int
+    entries: List[LeaderboardEntry]
+
+class BoardRank(BaseModel):
+    board: str
+    rank: int
+    total: int
+    respect_score: int
+
+class ChildRanksResponse(BaseModel):
+    child_id: UUID
+    ranks: List[BoardRank]
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, field_validator
 from uuid import UUID
+from datetime import date
 from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 class ChildBase(BaseModel):
     display_name: str
@@ -10,6 +12,16 @@ class ChildBase(BaseModel):
 
 class ChildCreate(ChildBase):
     avatar_url: str
+    timezone: str = "UTC" # IANA name; decides when the child's day (and streak) rolls over
+
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, value: str) -> str:
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError("Unknown timezone")
+        return value
 
 class Child(ChildBase):
     id: UUID
@@ -17,6 +29,9 @@ class Child(ChildBase):
     current_level: int
     respect_score: int
     streak: int = 0
+    longest_streak: int = 0
+    last_active_date: Optional[date] = None
+    timezone: str = "UTC"
     avatar_url: Optional[str] = None
     
     model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.supabase import supabase
+from app.services.jobs import Job, job_queue
+
+APPLY_ATTEMPT = "scenario_attempt.apply"
+RECONCILE_BATCH_SIZE = 1000
+
+
+async def apply_attempt(attempt_id: str) -> dict:
+    """
+    Applies an inserted attempt's score, artifact unlock and level bump.
+    Idempotent: an attempt that was already applied returns its stored outcome.
+    """
+    res = await supabase.rpc("apply_scenario_attempt", {"p_attempt_id": attempt_id}).execute()
+    if not res.data:
+        raise LookupError(f"Attempt {attempt_id} not found")
+    return res.data
+
+
+async def enqueue_apply(attempt_id: str, child_id: str, owner_id: Optional[str] = None) -> Job:
+    return await job_queue.enqueue(
+        APPLY_ATTEMPT,
+        {"attempt_id": attempt_id, "child_id": child_id},
+        idempotency_key=f"{APPLY_ATTEMPT}:{attempt_id}",
+        owner_id=owner_id
+    )
+
+
+async def mark_apply_failed(attempt_id: str) -> None:
+    """
+    Records that an attempt's apply job ran out of retries, so the reconciler
+    stops selecting it. Applying the attempt later still sets applied_at.
+    """
+    await supabase.table("child_scenario_attempts").update({
+        "apply_failed_at": datetime.now(timezone.utc).isoformat()
+    }).eq("id", attempt_id).execute()
+
+
+async def requeue_unapplied_attempts() -> int:
+    """
+    Enqueues attempts stored without their side effects applied, e.g. when the
+    process died between the insert and the enqueue, or the local outbox was lost.
+    Keys are per attempt, so attempts still queued are not enqueued twice.
+    Attempts whose job was dead-lettered carry apply_failed_at and are skipped,
+    so they cannot crowd newer attempts out of the batch;
+    POST /game/admin/jobs/requeue revives those.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=settings.ATTEMPT_RECONCILE_GRACE_SECONDS)).isoformat()
+    query = supabase.table("child_scenario_attempts").select("id, child_id")
+    query = query.is_("applied_at", "null").is_("apply_failed_at", "null").lt("created_at", cutoff)
+    res = await query.order("created_at").limit(RECONCILE_BATCH_SIZE).execute()
+    for row in res.data or []:
+        await enqueue_apply(row["id"], row["child_id"])
+    return len(res.data or [])
+
+
+async def run_attempt_reconciler() -> None:
+    """
+    Background task for requeue_unapplied_attempts. Started from the app lifespan.
+    """
+    while True:
+        try:
+            requeued = await requeue_unapplied_attempts()
+            if requeued:
+                logger.warning(f"Requeued {requeued} attempts with unapplied side effects")
+        except Exception as e:
+            logger.error(f"Attempt reconciliation failed: {e}")
+        await asyncio.sleep(settings.ATTEMPT_RECONCILE_INTERVAL_SECONDS)
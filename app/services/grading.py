@@ -0,0 +1,140 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from rapidfuzz import fuzz, process
+from app.core.cache import InstrumentedTTLCache
+from app.core.config import settings
+from app.db.script_bundles import ScriptBundle, get_script_bundle
+
+# Open vowels of Twi/Ewe that do not decompose under NFD
+_LETTER_FOLDS = str.maketrans({"ɛ": "e", "Ɛ": "e", "ɔ": "o", "Ɔ": "o", "ŋ": "n", "Ŋ": "n"})
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+VARIANT_SEPARATOR = "|"
+
+
+def normalize_answer(text: str) -> str:
+    """
+    Folds an answer to a comparable form: tone marks and underdots removed
+    (Yoruba ẹ/ọ/ṣ, tonal accents), Twi ɛ/ɔ mapped to e/o, case and punctuation dropped.
+    """
+    decomposed = unicodedata.normalize("NFD", text.translate(_LETTER_FOLDS))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", stripped.casefold())).strip()
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """
+    Normalized accepted answers of a scenario's spoken nodes.
+    `choices` holds every variant back to back; `spans[node_id]` is that node's slice of it.
+    """
+    choices: Tuple[str, ...]
+    spans: Dict[str, Tuple[int, int]]
+    points: Dict[str, int]
+
+    def variants(self, node_id: str) -> Tuple[str, ...]:
+        start, end = self.spans[node_id]
+        return self.choices[start:end]
+
+
+@dataclass(frozen=True)
+class GradeResult:
+    node_id: str
+    match_percentage: int
+    correct: bool
+    score: float
+    feedback: str
+
+
+# Keyed by bundle etag: the answer key changes exactly when the compiled script does
+_answer_keys = InstrumentedTTLCache("answer_keys", settings.SCRIPT_BUNDLE_CACHE_SIZE, settings.SCRIPT_BUNDLE_TTL_SECONDS)
+
+
+def build_answer_key(bundle: ScriptBundle) -> AnswerKey:
+    choices: List[str] = []
+    spans, points = {}, {}
+    for node in bundle.scenario.nodes:
+        if not node.expected_response:
+            continue
+        variants = {normalize_answer(v) for v in node.expected_response.split(VARIANT_SEPARATOR)}
+        variants.discard("")
+        if not variants:
+            continue
+        spans[str(node.id)] = (len(choices), len(choices) + len(variants))
+        points[str(node.id)] = node.points_max
+        choices.extend(sorted(variants))
+    return AnswerKey(choices=tuple(choices), spans=spans, points=points)
+
+
+def clear_answer_keys() -> None:
+    _answer_keys.clear()
+
+
+async def get_answer_key(scenario_id: str) -> Optional[AnswerKey]:
+    """
+    Returns the cached answer key for a scenario, or None if the scenario does not exist.
+    """
+    bundle = await get_script_bundle(scenario_id)
+    if bundle is None:
+        return None
+
+    key = _answer_keys.get(bundle.etag)
+    if key is None:
+        key = build_answer_key(bundle)
+        _answer_keys.set(bundle.etag, key)
+    return key
+
+
+def _feedback(match_percentage: int, correct: bool) -> str:
+    if match_percentage >= 95:
+        return "Perfect!"
+    if correct:
+        return "Great job!"
+    if match_percentage >= settings.GRADING_PASS_PERCENTAGE - 20:
+        return "Almost there, try again!"
+    return "Let's try that again."
+
+
+def _result(key: AnswerKey, node_id: str, similarity: float) -> GradeResult:
+    match_percentage = int(round(similarity))
+    correct = match_percentage >= settings.GRADING_PASS_PERCENTAGE
+    return GradeResult(
+        node_id=node_id,
+        match_percentage=match_percentage,
+        correct=correct,
+        score=float(key.points[node_id]) if correct else 0.0,
+        feedback=_feedback(match_percentage, correct)
+    )
+
+
+def grade_answer(key: AnswerKey, node_id: str, answer: str) -> GradeResult:
+    """
+    Scores one answer against the best matching accepted variant of a node.
+    Raises KeyError if the node has no expected response.
+    """
+    variants = key.variants(node_id)
+    _, similarity, _ = process.extractOne(normalize_answer(answer), variants, scorer=fuzz.ratio)
+    return _result(key, node_id, similarity)
+
+
+def grade_answers(key: AnswerKey, answers: List[Tuple[str, str]]) -> List[GradeResult]:
+    """
+    Scores many (node_id, answer) pairs with one vectorized similarity matrix
+    against every variant in the scenario. Raises KeyError for an unknown node.
+    """
+    if not answers:
+        return []
+    spans = [key.spans[node_id] for node_id, _ in answers]
+    matrix = process.cdist(
+        [normalize_answer(answer) for _, answer in answers],
+        key.choices,
+        scorer=fuzz.ratio,
+        workers=settings.GRADING_CDIST_WORKERS
+    )
+    return [
+        _result(key, node_id, float(matrix[row, start:end].max()))
+        for row, ((node_id, _), (start, end)) in enumerate(zip(answers, spans))
+    ]
@@ -0,0 +1,356 @@
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import registry
+
+JobHandler = Callable[[dict], Awaitable[Optional[dict]]]
+DeadLetterHandler = Callable[[dict, str], Awaitable[None]]
+
+SCHEMA = """
+create table if not exists jobs (
+    id text primary key,
+    kind text not null,
+    idempotency_key text not null unique,
+    owner_id text,
+    payload text not null,
+    status text not null default 'queued', -- failed jobs stay as dead letters until requeued
+    attempts integer not null default 0,
+    run_at real not null,
+    lease_until real,
+    result text,
+    error text,
+    created_at real not null,
+    finished_at real
+);
+create index if not exists jobs_due_idx on jobs (status, run_at);
+"""
+
+JOB_COLUMNS = "id, kind, owner_id, payload, status, attempts, run_at, result, error, created_at, finished_at"
+
+
+@dataclass(frozen=True)
+class Job:
+    id: str
+    kind: str
+    owner_id: Optional[str]
+    payload: dict
+    status: str # queued, running, completed, failed (dead letter)
+    attempts: int
+    run_at: float
+    result: Optional[dict]
+    error: Optional[str]
+    created_at: float
+    finished_at: Optional[float]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+
+def _job(row: Optional[tuple]) -> Optional[Job]:
+    if row is None:
+        return None
+    id, kind, owner_id, payload, status, attempts, run_at, result, error, created_at, finished_at = row
+    return Job(
+        id, kind, owner_id, json.loads(payload), status, attempts, run_at,
+        json.loads(result) if result is not None else None, error, created_at, finished_at
+    )
+
+
+# Outbox statements; each runs on the queue's connection under its lock
+
+def _insert(conn: sqlite3.Connection, kind: str, key: str, owner_id: Optional[str], payload: str) -> Job:
+    now = time.time()
+    conn.execute(
+        "insert into jobs (id, kind, idempotency_key, owner_id, payload, run_at, created_at) "
+        "values (?, ?, ?, ?, ?, ?, ?) on conflict (idempotency_key) do nothing",
+        (uuid.uuid4().hex, kind, key, owner_id, payload, now, now)
+    )
+    return _job(conn.execute(f"select {JOB_COLUMNS} from jobs where idempotency_key = ?", (key,)).fetchone())
+
+
+def _claim(conn: sqlite3.Connection, now: float, lease: float) -> Optional[Job]:
+    # One statement, so two processes sharing the file never claim the same job.
+    # Running jobs whose lease ran out (worker crashed or restarted) are claimed again.
+    return _job(conn.execute(
+        "update jobs set status = 'running', attempts = attempts + 1, lease_until = ? "
+        "where id = (select id from jobs "
+        "            where (status = 'queued' and run_at <= ?) or (status = 'running' and lease_until < ?) "
+        "            order by run_at limit 1) "
+        f"returning {JOB_COLUMNS}",
+        (now + lease, now, now)
+    ).fetchone())
+
+
+def _finish(conn: sqlite3.Connection, job_id: str, status: str, result: Optional[str], error: Optional[str]) -> None:
+    conn.execute(
+        "update jobs set status = ?, result = ?, error = ?, lease_until = null, finished_at = ? where id = ?",
+        (status, result, error, time.time(), job_id)
+    )
+
+
+def _retry(conn: sqlite3.Connection, job_id: str, run_at: float, error: str) -> None:
+    conn.execute(
+        "update jobs set status = 'queued', run_at = ?, error = ?, lease_until = null where id = ?",
+        (run_at, error, job_id)
+    )
+
+
+def _requeue(conn: sqlite3.Connection, kind: Optional[str], job_id: Optional[str]) -> int:
+    return conn.execute(
+        "update jobs set status = 'queued', attempts = 0, run_at = ?, error = null, finished_at = null "
+        "where status = 'failed' and (? is null or kind = ?) and (? is null or id = ?)",
+        (time.time(), kind, kind, job_id, job_id)
+    ).rowcount
+
+
+def _get(conn: sqlite3.Connection, job_id: str) -> Optional[Job]:
+    return _job(conn.execute(f"select {JOB_COLUMNS} from jobs where id = ?", (job_id,)).fetchone())
+
+
+def _purge(conn: sqlite3.Connection, before: float) -> int:
+    # Dead letters are kept: purging one would let its key be enqueued afresh
+    return conn.execute(
+        "delete from jobs where status = 'completed' and finished_at < ?", (before,)
+    ).rowcount
+
+
+def _counts(conn: sqlite3.Connection) -> Dict[str, int]:
+    return dict(conn.execute("select status, count(*) from jobs group by status").fetchall())
+
+
+class JobQueue:
+    """
+    Durable queue for side effects that do not need to hold up a response.
+    Jobs are written to a local SQLite outbox before enqueue returns, so they
+    survive restarts. A pool of asyncio workers claims due jobs under a lease,
+    retries failures with exponential backoff and jitter, and keeps results
+    pollable for JOB_RESULT_TTL_SECONDS. Enqueueing an idempotency key that
+    already exists returns the existing job instead of adding another.
+    Jobs that run out of attempts stay failed, as dead letters, until requeue
+    is called for them.
+    """
+
+    def __init__(self, path: str, workers: int, max_attempts: int):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._handlers: Dict[str, JobHandler] = {}
+        self._dead_letter_handlers: Dict[str, DeadLetterHandler] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = False
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    def handler(self, kind: str) -> Callable[[JobHandler], JobHandler]:
+        """
+        Registers the coroutine that runs jobs of this kind. Handlers may run
+        more than once for the same job, so they must be idempotent.
+        """
+        def register(fn: JobHandler) -> JobHandler:
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    def dead_letter(self, kind: str) -> Callable[[DeadLetterHandler], DeadLetterHandler]:
+        """
+        Registers a coroutine called with the payload and error when a job of
+        this kind runs out of attempts, e.g. to record the failure on the row
+        the job was for. Failures of the callback are logged, not retried.
+        """
+        def register(fn: DeadLetterHandler) -> DeadLetterHandler:
+            self._dead_letter_handlers[kind] = fn
+            return fn
+        return register
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("pragma journal_mode = wal")
+            conn.execute("pragma synchronous = normal")
+            conn.execute("pragma busy_timeout = 5000")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _db(self, statement: Callable[..., Any], *args: Any) -> Any:
+        # SQLite writes can block on disk; keep them off the event loop
+        def run():
+            with self._lock:
+                return statement(self._connection(), *args)
+        return await asyncio.to_thread(run)
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        idempotency_key: str,
+        owner_id: Optional[str] = None
+    ) -> Job:
+        """
+        Persists a job and wakes a worker. owner_id limits who may read the result.
+        """
+        job = await self._db(_insert, kind, idempotency_key, owner_id, json.dumps(payload))
+        self._wakeup.set()
+        return job
+
+    async def requeue(self, kind: Optional[str] = None, job_id: Optional[str] = None) -> int:
+        """
+        Gives dead-lettered jobs a fresh set of attempts; all of them unless
+        narrowed to one kind or one job. Returns how many were requeued.
+        """
+        requeued = await self._db(_requeue, kind, job_id)
+        if requeued:
+            self._wakeup.set()
+        return requeued
+
+    def start(self) -> None:
+        self._stopping = False
+        for _ in range(self.workers):
+            task = asyncio.create_task(self._work())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        purger = asyncio.create_task(self._purge_finished())
+        self._tasks.add(purger)
+        purger.add_done_callback(self._tasks.discard)
+
+    async def _work(self) -> None:
+        # Also checks a flag: wait_for can swallow a cancel that races a wakeup
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                job = await self._db(_claim, time.time(), settings.JOB_LEASE_SECONDS)
+            except Exception as e:
+                logger.error(f"Job queue claim failed: {e!r}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.JOB_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(job)
+
+    async def _process(self, job: Job) -> None:
+        registry.observe_job("jobs", "queue_wait", max(time.time() - job.run_at, 0.0))
+        start = time.perf_counter()
+        try:
+            handler = self._handlers.get(job.kind)
+            if handler is None:
+                raise LookupError(f"No handler for job kind {job.kind!r}")
+            result = await handler(job.payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job.attempts >= self.max_attempts:
+                logger.error(f"Job {job.id} ({job.kind}) failed after {job.attempts} attempts: {error}")
+                await self._db(_finish, job.id, "failed", None, error)
+                self.failed += 1
+                self._notify(job.id)
+                await self._dead_lettered(job, error)
+            else:
+                delay = min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+                logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed, retrying: {error}")
+                await self._db(_retry, job.id, time.time() + delay * random.uniform(0.5, 1.0), error)
+                self.retried += 1
+        else:
+            await self._db(_finish, job.id, "completed", json.dumps(result), None)
+            self.completed += 1
+            self._notify(job.id)
+        finally:
+            registry.observe_job("jobs", "run", time.perf_counter() - start)
+
+    async def _dead_lettered(self, job: Job, error: str) -> None:
+        on_dead_letter = self._dead_letter_handlers.get(job.kind)
+        if on_dead_letter is None:
+            return
+        try:
+            await on_dead_letter(job.payload, error)
+        except Exception as e:
+            logger.error(f"Dead letter callback for job {job.id} ({job.kind}) failed: {e!r}")
+
+    def _notify(self, job_id: str) -> None:
+        event = self._finished.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _purge_finished(self) -> None:
+        while True:
+            try:
+                purged = await self._db(_purge, time.time() - settings.JOB_RESULT_TTL_SECONDS)
+                if purged:
+                    logger.info(f"Purged {purged} finished jobs")
+            except Exception as e:
+                logger.error(f"Job purge failed: {e!r}")
+            await asyncio.sleep(settings.JOB_PURGE_INTERVAL_SECONDS)
+
+    async def get(self, job_id: str, owner_id: str) -> Optional[Job]:
+        job = await self._db(_get, job_id)
+        if job is None or job.owner_id != owner_id:
+            return None
+        return job
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """
+        Long-poll: returns the job once it has finished or the timeout elapses.
+        Only jobs finishing in this process wake the waiter early.
+        """
+        if timeout <= 0 or job.finished:
+            return job
+        # Waiters on one job share its event; the last to leave unregisters it
+        event = self._finished.setdefault(job.id, asyncio.Event())
+        self._waiters[job.id] = self._waiters.get(job.id, 0) + 1
+        try:
+            # It may have finished between the caller's read and the event being registered
+            current = await self._db(_get, job.id)
+            if current is not None and current.finished:
+                return current
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters[job.id] -= 1
+            if not self._waiters[job.id]:
+                del self._waiters[job.id]
+                if self._finished.get(job.id) is event:
+                    del self._finished[job.id]
+        return await self._db(_get, job.id) or job
+
+    async def stats(self) -> dict:
+        counts = await self._db(_counts)
+        return {
+            "workers": self.workers,
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "completed": self.completed,
+            "dead_letters": counts.get("failed", 0),
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+    async def shutdown(self) -> None:
+        # Jobs cut short here keep their lease and are picked up again after it expires
+        self._stopping = True
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+job_queue = JobQueue(settings.JOB_QUEUE_PATH, settings.JOB_WORKERS, settings.JOB_MAX_ATTEMPTS)
@@ -0,0 +1,247 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from sortedcontainers import SortedList
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.supabase import supabase
+
+# Inclusive age ranges; None = no upper bound
+AGE_BRACKETS: Tuple[Tuple[int, Optional[int]], ...] = ((0, 5), (6, 8), (9, 11), (12, None))
+
+CHILD_COLUMNS = "id, display_name, avatar_url, language, age, respect_score"
+
+
+def age_bracket(age: Optional[int]) -> Optional[str]:
+    if age is None:
+        return None
+    for low, high in AGE_BRACKETS:
+        if age >= low and (high is None or age <= high):
+            return f"{low}+" if high is None else f"{low}-{high}"
+    return None
+
+
+class Leaderboard:
+    """
+    One ranking, kept sorted by (-score, child_id) as scores change.
+    Updates, rank lookups and page reads are O(log n).
+    Ties share a rank (1, 1, 3, ...).
+    """
+
+    def __init__(self, scores: Iterable[Tuple[str, int]] = ()):
+        self._scores: Dict[str, int] = dict(scores)
+        self._ranking = SortedList((-score, child_id) for child_id, score in self._scores.items())
+
+    def __len__(self) -> int:
+        return len(self._ranking)
+
+    def update(self, child_id: str, score: int) -> None:
+        old = self._scores.get(child_id)
+        if old == score:
+            return
+        if old is not None:
+            self._ranking.remove((-old, child_id))
+        self._scores[child_id] = score
+        self._ranking.add((-score, child_id))
+
+    def remove(self, child_id: str) -> None:
+        old = self._scores.pop(child_id, None)
+        if old is not None:
+            self._ranking.remove((-old, child_id))
+
+    def _rank_for_score(self, score: int) -> int:
+        # Everyone with a strictly higher score sorts before (-score,)
+        return self._ranking.bisect_left((-score,)) + 1
+
+    def rank_of(self, child_id: str) -> Optional[int]:
+        score = self._scores.get(child_id)
+        return None if score is None else self._rank_for_score(score)
+
+    def score_of(self, child_id: str) -> Optional[int]:
+        return self._scores.get(child_id)
+
+    def page(self, limit: int, offset: int = 0) -> List[Tuple[int, str, int]]:
+        """
+        Returns (rank, child_id, score) for positions offset .. offset + limit.
+        """
+        out: List[Tuple[int, str, int]] = []
+        rank, previous = 0, None
+        for position, (neg_score, child_id) in enumerate(self._ranking.islice(offset, offset + limit), start=offset):
+            if neg_score != previous:
+                rank = position + 1 if previous is not None else self._rank_for_score(-neg_score)
+                previous = neg_score
+            out.append((rank, child_id, -neg_score))
+        return out
+
+
+@dataclass(slots=True)
+class RankedChild:
+    display_name: str
+    avatar_url: Optional[str]
+    boards: Tuple[str, ...]
+    score: int
+
+
+def boards_for(row: dict) -> Tuple[str, ...]:
+    boards = ["global"]
+    if row.get("language"):
+        boards.append(f"language:{row['language'].lower()}")
+    bracket = age_bracket(row.get("age"))
+    if bracket:
+        boards.append(f"age:{bracket}")
+    return tuple(boards)
+
+
+class LeaderboardIndex:
+    """
+    Global, per-language and per-age-bracket leaderboards plus the display
+    data needed to render them without touching the database.
+    """
+
+    def __init__(self):
+        self.boards: Dict[str, Leaderboard] = {}
+        self.children: Dict[str, RankedChild] = {}
+
+    @classmethod
+    def build(cls, rows: List[dict]) -> "LeaderboardIndex":
+        index = cls()
+        members: Dict[str, List[Tuple[str, int]]] = {}
+        # Few distinct (language, age) pairs: share one boards tuple between all their children
+        board_sets: Dict[tuple, Tuple[str, ...]] = {}
+        for row in rows:
+            child_id, score = str(row["id"]), row.get("respect_score") or 0
+            key = (row.get("language"), row.get("age"))
+            boards = board_sets.get(key)
+            if boards is None:
+                boards = board_sets[key] = boards_for(row)
+            index.children[child_id] = RankedChild(row["display_name"], row.get("avatar_url"), boards, score)
+            for board in boards:
+                members.setdefault(board, []).append((child_id, score))
+        index.boards = {board: Leaderboard(scores) for board, scores in members.items()}
+        return index
+
+    def _child_from_row(self, row: dict) -> RankedChild:
+        child = RankedChild(
+            display_name=row["display_name"],
+            avatar_url=row.get("avatar_url"),
+            boards=boards_for(row),
+            score=row.get("respect_score") or 0
+        )
+        self.children[str(row["id"])] = child
+        return child
+
+    def upsert(self, row: dict) -> None:
+        child_id = str(row["id"])
+        previous = self.children.get(child_id)
+        child = self._child_from_row(row)
+        for board in set(previous.boards if previous else ()) - set(child.boards):
+            self.boards[board].remove(child_id)
+        for board in child.boards:
+            self.boards.setdefault(board, Leaderboard()).update(child_id, child.score)
+
+    def update_score(self, child_id: str, score: int) -> bool:
+        child = self.children.get(child_id)
+        if child is None:
+            return False
+        child.score = score
+        for board in child.boards:
+            self.boards[board].update(child_id, score)
+        return True
+
+    def page(self, board: str, limit: int, offset: int = 0) -> Tuple[int, List[Tuple[int, RankedChild]]]:
+        leaderboard = self.boards.get(board)
+        if leaderboard is None:
+            return 0, []
+        return len(leaderboard), [(rank, self.children[child_id]) for rank, child_id, _ in leaderboard.page(limit, offset)]
+
+    def ranks(self, child_id: str) -> List[Tuple[str, int, int, int]]:
+        """
+        Returns (board, rank, board size, score) for every board the child is on.
+        """
+        child = self.children.get(child_id)
+        if child is None:
+            return []
+        return [
+            (board, self.boards[board].rank_of(child_id), len(self.boards[board]), child.score)
+            for board in child.boards
+        ]
+
+
+_index = LeaderboardIndex()
+_rebuild_lock = asyncio.Lock()
+# While a rebuild runs, live changes are also recorded here and replayed onto the new index
+_changes_during_rebuild: Optional[Dict[str, dict]] = None
+
+
+def get_leaderboards() -> LeaderboardIndex:
+    return _index
+
+
+def record_child(row: dict) -> None:
+    """
+    Adds or refreshes a child (e.g. on profile creation).
+    """
+    _index.upsert(row)
+    if _changes_during_rebuild is not None:
+        _changes_during_rebuild[str(row["id"])] = dict(row)
+
+
+def record_score(child_id: str, score: int) -> None:
+    """
+    Applies a new respect_score as returned by the attempt commit.
+    Children not indexed yet are picked up by the next rebuild.
+    """
+    _index.update_score(child_id, score)
+    if _changes_during_rebuild is not None:
+        _changes_during_rebuild.setdefault(child_id, {"id": child_id})["respect_score"] = score
+
+
+async def _fetch_children() -> List[dict]:
+    # Keyset pagination by id keeps every chunk query cheap on a large table
+    rows: List[dict] = []
+    last_id = None
+    while True:
+        query = supabase.table("children").select(CHILD_COLUMNS).order("id").limit(settings.LEADERBOARD_REBUILD_CHUNK_SIZE)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        chunk = (await query.execute()).data or []
+        rows.extend(chunk)
+        if len(chunk) < settings.LEADERBOARD_REBUILD_CHUNK_SIZE:
+            return rows
+        last_id = chunk[-1]["id"]
+
+
+async def rebuild_leaderboards() -> LeaderboardIndex:
+    """
+    Rebuilds every board from the children table to correct drift
+    (e.g. scores changed through another worker) and swaps it in.
+    """
+    global _index, _changes_during_rebuild
+    async with _rebuild_lock:
+        _changes_during_rebuild = {}
+        try:
+            rows = await _fetch_children()
+            # Sorting a large table is CPU work; keep it off the event loop
+            index = await asyncio.to_thread(LeaderboardIndex.build, rows)
+            for child_id, change in _changes_during_rebuild.items():
+                if "display_name" in change:
+                    index.upsert(change)
+                else:
+                    index.update_score(child_id, change["respect_score"])
+            _index = index
+        finally:
+            _changes_during_rebuild = None
+    return _index
+
+
+async def run_leaderboard_refresher() -> None:
+    """
+    Background task: builds the boards at startup, then periodically rebuilds them.
+    Started from the app lifespan.
+    """
+    while True:
+        try:
+            await rebuild_leaderboards()
+        except Exception as e:
+            logger.error(f"Leaderboard rebuild failed: {e}")
+        await asyncio.sleep(settings.LEADERBOARD_REBUILD_INTERVAL_SECONDS)
@@ -0,0 +1,23 @@
+from typing import Dict, Iterable, Optional
+from app.db.catalog import ContentCatalog
+from app.db.supabase import supabase
+
+
+async def fetch_level_progress(child_id: str, level_ids: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """
+    Returns the number of distinct passed scenarios per level for a child.
+    The counters are maintained by a trigger on child_scenario_attempts.
+    """
+    query = supabase.table("child_level_progress").select("level_id, passed_scenarios").eq("child_id", child_id)
+    if level_ids is not None:
+        query = query.in_("level_id", list(level_ids))
+    res = await query.execute()
+    return {r['level_id']: r['passed_scenarios'] for r in res.data or []}
+
+
+def is_level_completed(catalog: ContentCatalog, level_id: str, passed_scenarios: int) -> bool:
+    """
+    A level is complete once the child has passed as many distinct scenarios as it contains.
+    """
+    scenario_count = len(catalog.level_scenario_ids.get(level_id, ()))
+    return scenario_count > 0 and passed_scenarios >= scenario_count
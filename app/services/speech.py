@@ -0,0 +1,267 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set
+from fastapi import UploadFile
+from app.core.cache import InstrumentedTTLCache
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import registry
+from app.db.catalog import get_catalog
+from app.services.grading import GradeResult, get_answer_key, grade_answer
+from app.services.speech_engines import init_worker, transcribe_file
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class SpeechPoolSaturated(Exception):
+    """
+    Raised when the speech pool already has its maximum of pending jobs.
+    """
+
+
+class SpeechUnavailable(Exception):
+    """
+    Raised when no speech engine is configured (SPEECH_ENGINE is unset).
+    """
+
+
+class AudioTooLarge(Exception):
+    """
+    Raised when an upload exceeds SPEECH_MAX_UPLOAD_BYTES.
+    """
+
+
+@dataclass
+class SpeechJob:
+    id: str
+    parent_id: str
+    scenario_id: str
+    node_id: str
+    audio_path: str
+    language: Optional[str]
+    status: str = "queued" # queued, running, completed, failed
+    transcription: Optional[str] = None
+    result: Optional[GradeResult] = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    finished: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+async def spool_upload(upload: UploadFile) -> str:
+    """
+    Copies an upload to a temp file in fixed-size chunks and returns its path.
+    The worker processes read the audio from disk, never from the request.
+    Writes run in a thread so a slow disk does not stall the event loop.
+    """
+    fd, path = tempfile.mkstemp(prefix="kulture-audio-", suffix=os.path.splitext(upload.filename or "")[1])
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.SPEECH_MAX_UPLOAD_BYTES:
+                    raise AudioTooLarge()
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+class SpeechPool:
+    """
+    Bounded process pool running the configured speech engine.
+    Jobs beyond max_pending are rejected immediately instead of queueing;
+    finished jobs stay pollable for SPEECH_JOB_TTL_SECONDS. A job that times
+    out is reported failed at once but keeps its slot (and its audio file)
+    until the worker process actually lets go of it.
+    """
+
+    def __init__(self, engine: Optional[str], workers: int, max_pending: int):
+        self.engine = engine
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._started: Optional[Any] = None # spawn-context Queue of job ids
+        self._active: Dict[str, SpeechJob] = {} # submitted, worker not yet done
+        self._tasks: Set[asyncio.Task] = set()
+        self.jobs = InstrumentedTTLCache("speech_jobs", maxsize=max(max_pending * 100, 1000), ttl=settings.SPEECH_JOB_TTL_SECONDS)
+        self.pending = 0 # queued + running
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use; spawn keeps workers clear of the server's threads and sockets
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            self._loop = asyncio.get_running_loop()
+            self._started = context.Queue()
+            threading.Thread(target=self._watch_started, args=(self._started,), name="speech-started", daemon=True).start()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=init_worker,
+                initargs=(self._started,)
+            )
+        return self._executor
+
+    def _watch_started(self, started: Any) -> None:
+        # Workers report each job as they pick it up; None stops the watcher
+        while (job_id := started.get()) is not None:
+            self._call_soon(self._mark_running, job_id)
+
+    def _call_soon(self, callback: Any, *args: Any) -> bool:
+        loop = self._loop
+        if loop is None:
+            return False
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError: # loop closed during shutdown
+            return False
+        return True
+
+    def _mark_running(self, job_id: str) -> None:
+        job = self._active.get(job_id)
+        if job is not None and job.status == "queued":
+            job.status = "running"
+
+    def _worker_done(self, job: SpeechJob) -> None:
+        # Called from the executor's thread; with the loop gone, clean up here
+        if not self._call_soon(self._release, job):
+            self._release(job)
+
+    def _release(self, job: SpeechJob) -> None:
+        # Runs once the worker is done with the job, not when the caller gave up on it
+        if self._active.pop(job.id, None) is None:
+            return
+        self.pending -= 1
+        try:
+            os.unlink(job.audio_path)
+        except OSError:
+            pass
+
+    @property
+    def available(self) -> bool:
+        return bool(self.engine)
+
+    def check_capacity(self) -> None:
+        """
+        Raises SpeechUnavailable without an engine, or SpeechPoolSaturated when
+        no job can be accepted right now.
+        """
+        if not self.available:
+            raise SpeechUnavailable()
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise SpeechPoolSaturated()
+
+    def submit(self, parent_id: str, scenario_id: str, node_id: str, audio_path: str, language: Optional[str]) -> SpeechJob:
+        self.check_capacity()
+        job = SpeechJob(
+            id=uuid.uuid4().hex,
+            parent_id=parent_id,
+            scenario_id=scenario_id,
+            node_id=node_id,
+            audio_path=audio_path,
+            language=language
+        )
+        self.jobs.set(job.id, job)
+        self._active[job.id] = job
+        self.pending += 1
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: SpeechJob) -> None:
+        submitted = False
+        try:
+            future: Future = self._get_executor().submit(transcribe_file, self.engine, job.audio_path, job.language, job.id)
+            submitted = True
+            future.add_done_callback(lambda _: self._worker_done(job))
+            # On timeout a queued job is cancelled; a running one keeps its worker until it returns
+            transcript, started, finished = await asyncio.wait_for(asyncio.wrap_future(future), timeout=settings.SPEECH_JOB_TIMEOUT_SECONDS)
+            registry.observe_job("speech", "queue_wait", max(started - job.submitted_at, 0.0))
+            registry.observe_job("speech", "transcribe", finished - started)
+
+            job.transcription = transcript.text
+            key = await get_answer_key(job.scenario_id)
+            if key is None or job.node_id not in key.spans:
+                raise LookupError("Node no longer expects a spoken answer")
+            job.result = grade_answer(key, job.node_id, transcript.text)
+            job.status = "completed"
+            self.completed += 1
+        except Exception as e:
+            logger.error(f"Speech job {job.id} failed: {e!r}")
+            job.status = "failed"
+            job.error = "Transcription timed out" if isinstance(e, asyncio.TimeoutError) else "Transcription failed"
+            self.failed += 1
+        finally:
+            if not submitted:
+                self._release(job)
+            registry.observe_job("speech", "total", time.time() - job.submitted_at)
+            job.finished.set()
+
+    def get(self, job_id: str, parent_id: str) -> Optional[SpeechJob]:
+        job = self.jobs.get(job_id)
+        if job is None or job.parent_id != parent_id:
+            return None
+        return job
+
+    async def wait(self, job: SpeechJob, timeout: float) -> SpeechJob:
+        """
+        Long-poll: returns once the job has finished or the timeout elapses.
+        """
+        if timeout > 0 and not job.finished.is_set():
+            try:
+                await asyncio.wait_for(job.finished.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def stats(self) -> dict:
+        return {
+            "available": int(self.available), # Also exported as a Prometheus gauge
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "queue_depth": max(self.pending - self.workers, 0),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._started is not None:
+            self._started.put(None)
+
+
+speech_pool = SpeechPool(settings.SPEECH_ENGINE, settings.SPEECH_WORKERS, settings.SPEECH_MAX_PENDING)
+
+
+async def scenario_language(scenario_id: str) -> Optional[str]:
+    """
+    Language of the module a scenario belongs to, passed to the engine as a hint.
+    """
+    catalog = await get_catalog()
+    scenario = catalog.scenarios.get(scenario_id)
+    level = catalog.levels.get(scenario['level_id']) if scenario else None
+    if level is None:
+        return None
+    for language, modules in catalog.modules_by_language.items():
+        if any(m['id'] == level['module_id'] for m in modules):
+            return language
+    return None
@@ -0,0 +1,64 @@
+import importlib
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+# Runs inside the speech worker processes: keep this module free of app imports
+# so workers start without loading settings, the database client or the web stack.
+
+
+@dataclass(frozen=True)
+class Transcript:
+    text: str
+    confidence: float
+
+
+class SpeechEngine:
+    """
+    Interface for speech-to-text backends. An engine is created once per worker
+    process and then transcribes one audio file at a time.
+    """
+
+    def transcribe(self, path: str, language: Optional[str] = None) -> Transcript:
+        raise NotImplementedError
+
+
+_engines: Dict[str, SpeechEngine] = {}
+# Set in each worker by init_worker; job ids are put here as transcription starts
+_started: Optional[Any] = None
+
+
+def init_worker(started: Any) -> None:
+    """
+    Process pool initializer: keeps the queue the parent watches for job starts.
+    """
+    global _started
+    _started = started
+
+
+def load_engine(engine_path: str) -> SpeechEngine:
+    """
+    Resolves "package.module:ClassName" to an engine instance, cached per process.
+    """
+    engine = _engines.get(engine_path)
+    if engine is None:
+        module_name, _, class_name = engine_path.partition(":")
+        engine = _engines[engine_path] = getattr(importlib.import_module(module_name), class_name)()
+    return engine
+
+
+def transcribe_file(
+    engine_path: str,
+    path: str,
+    language: Optional[str] = None,
+    job_id: Optional[str] = None
+) -> Tuple[Transcript, float, float]:
+    """
+    Process pool entry point. Also returns wall-clock start and end times so the
+    caller can split queue wait from transcription time.
+    """
+    started = time.time()
+    if _started is not None and job_id is not None:
+        _started.put(job_id)
+    transcript = load_engine(engine_path).transcribe(path, language)
+    return transcript, started, time.time()
@@ -0,0 +1,35 @@
+import asyncio
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.supabase import supabase
+
+
+async def reset_lapsed_streaks() -> int:
+    """
+    Zeroes the streak of every child who missed a full day in their own timezone.
+    Each RPC call resets one chunk in its own short transaction; returns the total reset.
+    Rows locked by other writers are skipped, so a short chunk does not mean the
+    last one: it stops only when a call resets nothing.
+    """
+    total = 0
+    while True:
+        res = await supabase.rpc("reset_lapsed_streaks", {"p_batch_size": settings.STREAK_RESET_BATCH_SIZE}).execute()
+        count = res.data or 0
+        if not count:
+            return total
+        total += count
+
+
+async def run_streak_resetter() -> None:
+    """
+    Background task for the streak reset. Runs hourly rather than nightly because
+    children's days end at different times across timezones. Started from the app lifespan.
+    """
+    while True:
+        await asyncio.sleep(settings.STREAK_RESET_INTERVAL_SECONDS)
+        try:
+            reset = await reset_lapsed_streaks()
+            if reset:
+                logger.info(f"Reset {reset} lapsed streaks")
+        except Exception as e:
+            logger.error(f"Streak reset failed: {e}")
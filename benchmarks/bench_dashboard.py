@@ -0,0 +1,68 @@
+"""
+Time to load the parent dashboard's progress counts: two queries per child
+that fetch the matching rows and count them with len(), against one children
+lookup plus one get_children_progress call. Uses the real supabase client
+against the PostgREST fake, with --latency-ms per round trip.
+
+    python -m benchmarks.bench_dashboard --latency-ms 2
+"""
+import argparse
+import asyncio
+from typing import List, Optional
+from benchmarks.micro import per_call_async, print_table, use_benchmark_env
+
+
+async def before(supabase, parent_id: str) -> dict:
+    children = (await supabase.table("children").select("*").eq("parent_id", parent_id).execute()).data or []
+    counts = {}
+    for c in children:
+        passed = await supabase.table("child_scenario_attempts").select("id").eq("child_id", c["id"]).eq("passed", True).execute()
+        artifacts = await supabase.table("child_artifacts").select("id").eq("child_id", c["id"]).execute()
+        counts[c["id"]] = (len(passed.data or []), len(artifacts.data or []))
+    return counts
+
+
+async def after(supabase, parent_id: str) -> dict:
+    children = (await supabase.table("children").select("*").eq("parent_id", parent_id).execute()).data or []
+    if not children:
+        return {}
+    res = await supabase.rpc("get_children_progress", {"p_child_ids": [c["id"] for c in children]}).execute()
+    return {p["child_id"]: (p["scenarios_passed"], p["artifacts_unlocked"]) for p in res.data or []}
+
+
+async def run(children_counts: List[int], latency: float, number: int) -> None:
+    from app.db.supabase import supabase, use_transport
+    from benchmarks.seed import build_dataset
+
+    rows = []
+    for count in children_counts:
+        dataset = build_dataset("unused", "unused", parents=1, children_per_parent=count)
+        fake = dataset.fake(latency=latency)
+        use_transport(fake)
+        parent_id = dataset.parents[0]["id"]
+        assert await before(supabase, parent_id) == await after(supabase, parent_id)
+
+        timings = []
+        for variant in (before, after):
+            fake.calls.clear()
+            await variant(supabase, parent_id)
+            queries = sum(fake.calls.values())
+            seconds = await per_call_async(lambda: variant(supabase, parent_id), number)
+            timings += [seconds * 1000, queries]
+        rows.append([count, *timings, f"{timings[0] / timings[2]:.1f}x"])
+    print_table(["children", "before ms", "before queries", "after ms", "after queries", "speedup"], rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Dashboard progress counts: per-child queries vs one batched RPC.")
+    parser.add_argument("--children", type=int, nargs="+", default=[1, 2, 5, 10, 20])
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated database round trip per call")
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args(argv)
+    use_benchmark_env()
+    asyncio.run(run(args.children, args.latency_ms / 1000, args.number))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
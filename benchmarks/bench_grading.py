@@ -0,0 +1,91 @@
+"""
+Answers graded per second: fuzz.ratio against each variant of a node's
+expected_response parsed per answer, grade_answer on a precompiled AnswerKey,
+and grade_answers scoring a batch in one cdist call.
+
+    python -m benchmarks.bench_grading --answers 20000
+"""
+import argparse
+import random
+from typing import List, Optional
+from benchmarks.micro import per_call, print_table, use_benchmark_env
+
+EXPECTED = [
+    "Ẹ kú àárọ̀ ma|E ku aaro ma",
+    "Ẹ ṣé o|E se o|Ese o",
+    "Mo dúpẹ́ lọ́wọ́ yín|Mo dupe lowo yin",
+    "Mɛda wo ase|Medaase",
+    "Ɛte sɛn?|Ete sen",
+    "Ọjọ́ ìbí ayọ̀|Ojo ibi ayo",
+    "Káàbọ̀ sílé|Kaabo sile",
+    "Ẹ jọ̀ọ́, ẹ fún mi ní omi|E jo o, e fun mi ni omi",
+]
+
+
+def _answers(count: int, seed: int) -> List[tuple]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        node = rng.randrange(len(EXPECTED))
+        text = rng.choice(EXPECTED[node].split("|"))
+        # Drop, swap or keep characters the way a transcription or a child would
+        chars = list(text)
+        for _ in range(rng.randint(0, 3)):
+            i = rng.randrange(len(chars))
+            chars[i] = rng.choice("aeiou ")
+        out.append((str(node), "".join(chars)))
+    return out
+
+
+def run(count: int, seed: int) -> None:
+    from rapidfuzz import fuzz
+    from app.services.grading import AnswerKey, VARIANT_SEPARATOR, grade_answer, grade_answers, normalize_answer
+
+    nodes = {str(i): expected for i, expected in enumerate(EXPECTED)}
+    choices, spans = [], {}
+    for node_id, expected in nodes.items():
+        variants = sorted({normalize_answer(v) for v in expected.split(VARIANT_SEPARATOR)} - {""})
+        spans[node_id] = (len(choices), len(choices) + len(variants))
+        choices += variants
+    key = AnswerKey(choices=tuple(choices), spans=spans, points={node_id: 1 for node_id in nodes})
+    answers = _answers(count, seed)
+
+    def before():
+        for node_id, answer in answers:
+            normalized = normalize_answer(answer)
+            max(fuzz.ratio(normalized, normalize_answer(v)) for v in nodes[node_id].split(VARIANT_SEPARATOR))
+
+    def single():
+        for node_id, answer in answers:
+            grade_answer(key, node_id, answer)
+
+    def batch():
+        grade_answers(key, answers)
+
+    rows = []
+    for name, fn in (("per answer, normalize key each time (before)", before), ("grade_answer, cached key", single), ("grade_answers, one cdist", batch)):
+        seconds = per_call(fn, number=1, repeat=3)
+        rows.append([name, round(count / seconds), seconds / count * 1e6])
+    print_table(["variant", "answers/s", "us/answer"], rows)
+
+    # What normalization buys: raw ratio against the first variant vs the graded match
+    print()
+    samples = [("0", "e ku aaro ma"), ("3", "mɛdaase"), ("4", "ete sɛn"), ("5", "OJO IBI AYO!")]
+    print_table(
+        ["answer", "raw ratio", "graded match %"],
+        [[answer, round(fuzz.ratio(answer, nodes[node_id].split(VARIANT_SEPARATOR)[0])), grade_answer(key, node_id, answer).match_percentage] for node_id, answer in samples]
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Answer grading throughput, before and after.")
+    parser.add_argument("--answers", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    use_benchmark_env()
+    run(args.answers, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,81 @@
+"""
+Time to rank a child and read a top-10 page as the number of children
+grows: counting and sorting every score per request, and reading the
+LeaderboardIndex.
+
+    python -m benchmarks.bench_leaderboard --children 10000 100000 1000000
+"""
+import argparse
+import heapq
+import random
+import time
+from typing import List, Optional
+from benchmarks.micro import per_call, print_table, use_benchmark_env
+
+LANGUAGES = ("yoruba", "twi", "igbo", "hausa")
+
+
+def _rows(count: int, rng: random.Random) -> List[dict]:
+    return [
+        {"id": f"child-{i}", "display_name": f"Child {i}", "avatar_url": None, "language": rng.choice(LANGUAGES),
+         "age": rng.randint(3, 14), "respect_score": rng.randint(0, 5000)}
+        for i in range(count)
+    ]
+
+
+def run(sizes: List[int], seed: int) -> None:
+    from app.services.leaderboard import LeaderboardIndex
+
+    rows = []
+    for size in sizes:
+        rng = random.Random(seed)
+        children = _rows(size, rng)
+        scores = {row["id"]: row["respect_score"] for row in children}
+        start = time.perf_counter()
+        index = LeaderboardIndex.build(children)
+        build_s = time.perf_counter() - start
+        board = index.boards["global"]
+        probes = [rng.choice(children)["id"] for _ in range(200)]
+        probe = iter(probes * 10_000)
+        number = 20 if size >= 1_000_000 else 100
+
+        def rank_before():
+            mine = scores[next(probe)]
+            return sum(1 for s in scores.values() if s > mine) + 1
+
+        def top_before():
+            return heapq.nlargest(10, scores.items(), key=lambda item: (item[1], item[0]))
+
+        def update_before():
+            scores[next(probe)] += 1
+
+        def rank_after():
+            return board.rank_of(next(probe))
+
+        def top_after():
+            return index.page("global", 10)
+
+        def update_after():
+            child_id = next(probe)
+            index.update_score(child_id, index.children[child_id].score + 1)
+
+        timings = [per_call(fn, number) * 1e6 for fn in (rank_before, rank_after, top_before, top_after, update_before, update_after)]
+        rows.append([size, build_s, *timings])
+    print_table(
+        ["children", "build s", "rank us before", "rank us after", "top10 us before", "top10 us after", "update us before", "update us after"],
+        rows
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Leaderboard rank, page and update cost, before and after.")
+    parser.add_argument("--children", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    use_benchmark_env()
+    run(args.children, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+"""
+Request logging cost per request: the old BaseHTTPMiddleware writing two
+records inline, and LoggingMiddleware handing one record to the queue
+listener thread. Both log to /dev/null around a trivial endpoint.
+
+    python -m benchmarks.bench_logging --requests 5000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional
+from benchmarks.micro import concurrent_rate, print_table, use_benchmark_env
+
+
+def _endpoint_app():
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def ping(request):
+        return JSONResponse({"ok": True})
+    return Starlette(routes=[Route("/ping", ping)])
+
+
+def _before_app(devnull):
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    # The logger as it was: stdlib StreamHandler writing from the request's own task
+    before_logger = logging.getLogger("kulture_api_before")
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    before_logger.addHandler(handler)
+    before_logger.setLevel(logging.INFO)
+    before_logger.propagate = False
+
+    class LoggingMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            start_time = time.time()
+            before_logger.info(f"Incoming Request: {request.method} {request.url}")
+            try:
+                response = await call_next(request)
+                process_time = time.time() - start_time
+                before_logger.info(f"Response: {response.status_code} | Time: {process_time:.4f}s")
+                return response
+            except Exception as e:
+                process_time = time.time() - start_time
+                before_logger.error(f"Request Failed: {e} | Time: {process_time:.4f}s")
+                raise e
+
+    return LoggingMiddleware(_endpoint_app())
+
+
+def _after_app(devnull):
+    from app.core import logging as app_logging
+    app_logging._stream_handler.setStream(devnull)
+    return app_logging.LoggingMiddleware(_endpoint_app())
+
+
+async def _rate(app, total: int, concurrency: int) -> float:
+    import httpx
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def call():
+            await client.get("/ping")
+        await concurrent_rate(call, min(total, 200), concurrency) # Warm-up
+        return await concurrent_rate(call, total, concurrency)
+
+
+async def run(total: int, concurrency: int) -> None:
+    from app.core.config import settings
+
+    with open(os.devnull, "w") as devnull:
+        plain = await _rate(_endpoint_app(), total, concurrency)
+        before = await _rate(_before_app(devnull), total, concurrency)
+        after = {}
+        for rate in (1.0, 0.1):
+            settings.LOG_SUCCESS_SAMPLE_RATE = rate
+            after[rate] = await _rate(_after_app(devnull), total, concurrency)
+
+    def overhead(rps: float) -> float:
+        return (1 / rps - 1 / plain) * 1e6
+
+    rows = [["no middleware", plain, "-"], ["BaseHTTPMiddleware + f-strings (before)", before, overhead(before)]]
+    rows += [[f"ASGI + queue, sample rate {rate} (after)", rps, overhead(rps)] for rate, rps in after.items()]
+    print_table(["variant", "req/s", "overhead us/req"], rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Request logging middleware overhead, before and after.")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args(argv)
+    os.environ["LOG_LEVEL"] = "INFO" # The harness default (WARNING) would drop the records being measured
+    use_benchmark_env()
+    asyncio.run(run(args.requests, args.concurrency))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
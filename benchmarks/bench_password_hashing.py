@@ -0,0 +1,67 @@
+"""
+Password verifications per second under concurrent logins, with Argon2 run
+on the event loop and in the PasswordHashingPool, and how late a 1 ms ticker
+on the same loop fires meanwhile.
+
+    python -m benchmarks.bench_password_hashing --concurrency 16
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Optional
+from benchmarks.micro import concurrent_rate, print_table, use_benchmark_env
+from benchmarks.harness import percentile
+
+TICK_SECONDS = 0.001
+
+
+async def _measure(verify, total: int, concurrency: int):
+    lateness: List[float] = []
+    done = False
+
+    async def ticker():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lateness.append(time.perf_counter() - start - TICK_SECONDS)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    rate = await concurrent_rate(verify, total, concurrency)
+    done = True
+    await task
+    return rate, percentile(lateness, 50) * 1000, percentile(lateness, 99) * 1000, max(lateness) * 1000
+
+
+async def run(total: int, concurrency: int, workers: int) -> None:
+    from app.core.security import PasswordHashingPool, get_password_hash, password_hash
+
+    hashed = get_password_hash("benchmark-password")
+    pool = PasswordHashingPool(workers, max_pending=concurrency)
+
+    async def before():
+        assert password_hash.verify("benchmark-password", hashed)
+
+    async def after():
+        assert await pool.run(password_hash.verify, "benchmark-password", hashed)
+
+    rows = []
+    for name, verify in (("inline (before)", before), (f"pool, {workers} workers (after)", after)):
+        rows.append([name, *await _measure(verify, total, concurrency)])
+    pool.shutdown()
+    print_table(["variant", "verifies/s", "loop lag p50 ms", "loop lag p99 ms", "loop lag max ms"], rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Argon2 verification on the event loop vs on the hashing pool.")
+    parser.add_argument("--requests", type=int, default=48)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+    use_benchmark_env()
+    asyncio.run(run(args.requests, args.concurrency, args.workers))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,100 @@
+"""
+Time to build the /content/modules and /profiles/kids bodies: Pydantic
+validation and dump, against the orjson and trusted_dump paths the endpoints
+use. Both produce the same content.
+
+    python -m benchmarks.bench_serialization --modules 10 --levels 20 --scenarios 10
+"""
+import argparse
+import uuid
+from typing import List, Optional
+from benchmarks.micro import per_call, print_table, use_benchmark_env
+
+
+def _modules_rows(modules: int, levels: int, scenarios: int) -> List[dict]:
+    rows = []
+    for m in range(modules):
+        module_id = str(uuid.uuid4())
+        level_rows = []
+        for l in range(levels):
+            level_id = str(uuid.uuid4())
+            level_rows.append({
+                "id": level_id, "module_id": module_id, "title": f"Level {l + 1}", "description": "Practise with elders. " * 4,
+                "icon_url": "icons/level.png", "order_index": l, "pass_threshold_points": 3,
+                "scenarios": [
+                    {"id": str(uuid.uuid4()), "level_id": level_id, "title": f"Scenario {s + 1}",
+                     "description": "Greet your grandmother. " * 4, "type": "standard", "order_index": s}
+                    for s in range(scenarios)
+                ],
+            })
+        rows.append({"id": module_id, "title": f"Module {m + 1}", "description": "Greetings. " * 8, "language": "yoruba", "order_index": m, "levels": level_rows})
+    return rows
+
+
+def run(modules: int, levels: int, scenarios: int, kids: int) -> None:
+    from app.api.content import _encode_modules
+    from app.core.serialization import dumps, trusted_dump
+    from app.db.catalog import build_catalog
+    from app.models.content import Module, ModulesResponse
+    from app.models.profile import Child
+
+    catalog = build_catalog(_modules_rows(modules, levels, scenarios))
+    first = catalog.module_payloads["yoruba"][0]["levels"]
+    completed = frozenset(level["id"] for level in first[:len(first) // 2])
+
+    def modules_before():
+        out = []
+        for module in catalog.modules_by_language.get("yoruba", []):
+            levels_with_status = [{**level, "status": "completed" if level["id"] in completed else "locked"} for level in module["levels"]]
+            out.append(Module(**{**module, "levels": levels_with_status}))
+        return ModulesResponse(child_avatar_url=None, child_respect_score=0, modules=out).model_dump_json().encode()
+
+    def modules_after():
+        return _encode_modules(catalog, "yoruba", completed)
+
+    cache = {}
+
+    def modules_cached():
+        key = (catalog.version, "yoruba", completed, None)
+        body = cache.get(key)
+        if body is None:
+            body = cache[key] = _encode_modules(catalog, "yoruba", completed)
+        return body
+
+    child_rows = [
+        {"id": str(uuid.uuid4()), "parent_id": str(uuid.uuid4()), "display_name": f"Child {i}", "age": 7, "language": "yoruba",
+         "gender": "girl", "current_level": 3, "respect_score": 120, "streak": 2, "longest_streak": 5,
+         "last_active_date": "2026-10-16", "timezone": "Africa/Lagos", "avatar_url": "avatars/a.png", "created_at": "2026-01-01T00:00:00+00:00"}
+        for i in range(kids)
+    ]
+
+    def kids_before():
+        return dumps([Child(**row).model_dump(mode="json") for row in child_rows])
+
+    def kids_after():
+        return dumps([trusted_dump(Child, row) for row in child_rows])
+
+    rows = [
+        ["modules: validate + model_dump_json (before)", per_call(modules_before, 20) * 1e6, len(modules_before())],
+        ["modules: catalog dicts + orjson (after, miss)", per_call(modules_after, 20) * 1e6, len(modules_after())],
+        ["modules: payload cache hit (after)", per_call(modules_cached, 1000) * 1e6, len(modules_cached())],
+        [f"kids x{kids}: Child(**row).model_dump (before)", per_call(kids_before, 1000) * 1e6, len(kids_before())],
+        [f"kids x{kids}: trusted_dump (after)", per_call(kids_after, 1000) * 1e6, len(kids_after())],
+    ]
+    print_table(["variant", "us", "bytes"], rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Hot endpoint serialization, before and after.")
+    parser.add_argument("--modules", type=int, default=10)
+    parser.add_argument("--levels", type=int, default=20)
+    parser.add_argument("--scenarios", type=int, default=10)
+    parser.add_argument("--kids", type=int, default=5)
+    args = parser.parse_args(argv)
+    use_benchmark_env()
+    run(args.modules, args.levels, args.scenarios, args.kids)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
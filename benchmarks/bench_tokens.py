@@ -0,0 +1,78 @@
+"""
+Time to authenticate one request: decoding the JWT and resolving the parent
+from parent_cache or the database on every call, against get_current_parent
+with its verified-token cache and profile claims. The database is the
+PostgREST fake at --latency-ms per round trip.
+
+    python -m benchmarks.bench_tokens --latency-ms 2
+"""
+import argparse
+import asyncio
+from typing import List, Optional
+from benchmarks.micro import per_call_async, print_table, use_benchmark_env
+
+
+async def run(latency: float, number: int) -> None:
+    from app.api import deps
+    from app.core.security import create_access_token, decode_access_token, parent_claims
+    from app.db.loader import get_loader
+    from app.db.supabase import use_transport
+    from app.models.auth import Parent
+    from benchmarks.seed import build_dataset
+
+    dataset = build_dataset("unused", "unused", parents=1, children_per_parent=1)
+    fake = dataset.fake(latency=latency)
+    use_transport(fake)
+    parent = dataset.parents[0]
+    legacy_token = create_access_token(parent["id"])
+    token = create_access_token(parent["id"], claims=parent_claims(Parent(**parent)))
+
+    async def before():
+        # get_current_parent as it was: decode every time, then the principal cache or the database
+        user_id = decode_access_token(legacy_token)["sub"]
+        cached = deps.parent_cache.get(user_id)
+        if cached is not None:
+            return cached
+        row = await get_loader().load("parents", user_id)
+        principal = Parent(**row)
+        deps.parent_cache.set(user_id, principal)
+        return principal
+
+    async def before_cold():
+        deps.parent_cache.clear()
+        return await before()
+
+    async def after():
+        return await deps.get_current_parent(token)
+
+    async def after_cold():
+        deps.parent_cache.clear()
+        return await deps.get_current_parent(token)
+
+    rows = []
+    for name, fn in (
+        ("jose decode + parent_cache hit (before)", before),
+        ("jose decode + database (before, cache cold)", before_cold),
+        ("verified token + claims (after)", after),
+        ("verified token + claims (after, parent_cache cold)", after_cold),
+    ):
+        await fn() # Warm variants count a steady-state request, not the first
+        fake.calls.clear()
+        await fn()
+        queries = sum(fake.calls.values())
+        rows.append([name, await per_call_async(fn, number) * 1e6, queries])
+    print_table(["variant", "us/request", "db calls"], rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-request token verification cost, before and after.")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated database round trip per call")
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args(argv)
+    use_benchmark_env()
+    asyncio.run(run(args.latency_ms / 1000, args.number))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import random
+import re
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+import httpx
+
+# Takes the fake plus the RPC's JSON arguments; may be a coroutine function
+Rpc = Callable[..., Any]
+# Runs after a row is inserted, like an AFTER INSERT trigger
+Trigger = Callable[["FakePostgrest", dict], None]
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+_REST_PATH = re.compile(r"/rest/v1/(.+)$")
+
+
+def _singular(name: str) -> str:
+    if name.endswith("ies"):
+        return name[:-3] + "y"
+    if name.endswith("s"):
+        return name[:-1]
+    return name
+
+
+def _split_top(expr: str) -> List[str]:
+    # Splits on commas outside parentheses: "a, b(c, d)" -> ["a", "b(c, d)"]
+    parts, depth, current = [], 0, ""
+    for ch in expr:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    parts.append(current)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _cast(value: str) -> Any:
+    # Postgres reads booleans case-insensitively; postgrest-py sends str(True)
+    return {"true": True, "false": False, "null": None}.get(value.lower(), value)
+
+
+def _equal(a: Any, b: Any) -> bool:
+    if isinstance(a, bool) or isinstance(b, bool) or a is None or b is None:
+        return a == b
+    return str(a) == str(b)
+
+
+def _match(row: dict, column: str, expr: str) -> bool:
+    op, _, value = expr.partition(".")
+    negate = op == "not"
+    if negate:
+        op, _, value = value.partition(".")
+    current = row.get(column)
+    if op == "eq":
+        result = _equal(current, _cast(value))
+    elif op == "neq":
+        result = not _equal(current, _cast(value))
+    elif op == "in":
+        result = str(current) in {item.strip('"') for item in value.strip("()").split(",") if item}
+    elif op == "is":
+        result = current is _cast(value)
+    elif op in ("gt", "gte", "lt", "lte"):
+        if current is None:
+            result = False
+        else:
+            try:
+                a, b = float(current), float(value)
+            except (TypeError, ValueError):
+                a, b = str(current), value
+            result = {"gt": a > b, "gte": a >= b, "lt": a < b, "lte": a <= b}[op]
+    else:
+        raise ValueError(f"Unsupported operator {op!r}")
+    return not result if negate else result
+
+
+def _logic(row: dict, kind: str, expr: str) -> bool:
+    expr = expr.strip()
+    if expr.startswith("("):
+        expr = expr[1:-1]
+    results = []
+    for part in _split_top(expr):
+        if part.startswith(("and(", "or(")):
+            nested_kind, inner = part.split("(", 1)
+            results.append(_logic(row, nested_kind, "(" + inner))
+        else:
+            column, rest = part.split(".", 1)
+            op, _, value = rest.partition(".")
+            results.append(_match(row, column, f"{op}.{value.strip(chr(34))}"))
+    return all(results) if kind == "and" else any(results)
+
+
+def _indexable(column: str) -> bool:
+    return column == "id" or column.endswith("_id") or column == "email"
+
+
+class FakePostgrest(httpx.AsyncBaseTransport):
+    """
+    In-memory PostgREST stand-in served as an httpx transport, so the real
+    supabase client (and everything above it) runs unchanged. Supports the
+    filters, embeds, ordering, paging, inserts/upserts, updates and deletes
+    the app uses, plus RPCs and insert triggers given as Python callables.
+
+    Every call waits `latency` seconds plus up to `jitter` more, standing in
+    for the network round trip to the database.
+    """
+
+    def __init__(
+        self,
+        tables: Optional[Dict[str, List[dict]]] = None,
+        rpcs: Optional[Dict[str, Rpc]] = None,
+        triggers: Optional[Dict[str, List[Trigger]]] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+    ):
+        self.tables: Dict[str, List[dict]] = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.rpcs = dict(rpcs or {})
+        self.triggers = {table: list(fns) for table, fns in (triggers or {}).items()}
+        self.latency = latency
+        self.jitter = jitter
+        self.calls: Counter = Counter() # (method, table or rpc/name) -> count
+        self._random = random.Random(seed)
+        # (table, column) -> str(value) -> rows, built on first equality lookup
+        self._indexes: Dict[Tuple[str, str], Dict[str, List[dict]]] = {}
+
+    # Row access shared by the HTTP handlers and by RPC implementations
+
+    def rows(self, table: str) -> List[dict]:
+        return self.tables.setdefault(table, [])
+
+    def find(self, table: str, column: str, value: Any) -> List[dict]:
+        """
+        Rows whose column equals value, through a hash index for id-like columns.
+        """
+        if not _indexable(column):
+            return [r for r in self.rows(table) if _equal(r.get(column), value)]
+        index = self._indexes.get((table, column))
+        if index is None:
+            index = self._indexes[(table, column)] = {}
+            for row in self.rows(table):
+                index.setdefault(str(row.get(column)), []).append(row)
+        return index.get(str(value), [])
+
+    def get(self, table: str, row_id: Any) -> Optional[dict]:
+        found = self.find(table, "id", row_id)
+        return found[0] if found else None
+
+    def insert(self, table: str, row: dict) -> dict:
+        row = dict(row)
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        self.rows(table).append(row)
+        for (indexed_table, column), index in self._indexes.items():
+            if indexed_table == table:
+                index.setdefault(str(row.get(column)), []).append(row)
+        for trigger in self.triggers.get(table, ()):
+            trigger(self, row)
+        return row
+
+    def _drop_indexes(self, table: str) -> None:
+        for key in [key for key in self._indexes if key[0] == table]:
+            del self._indexes[key]
+
+    # PostgREST semantics
+
+    def _project(self, table: str, row: dict, select: Optional[str]) -> dict:
+        if select in (None, "", "*"):
+            return dict(row)
+        out = {}
+        for item in _split_top(select):
+            if "(" not in item:
+                if item == "*":
+                    out.update(row)
+                else:
+                    out[item] = row.get(item)
+                continue
+            name, inner = item.split("(", 1)
+            inner = inner[:-1]
+            alias = None
+            if ":" in name:
+                alias, name = name.split(":", 1)
+            name = name.replace("!inner", "")
+            foreign_key = _singular(name) + "_id"
+            if foreign_key in row:
+                # Many-to-one: row.<name>_id -> <name>.id
+                target = self.get(name, row[foreign_key])
+                out[alias or name] = self._project(name, target, inner) if target else None
+            else:
+                # One-to-many: <name>.<table>_id -> row.id
+                children = self.find(name, _singular(table) + "_id", row.get("id"))
+                out[alias or name] = [self._project(name, child, inner) for child in children]
+        return out
+
+    def _filter(self, table: str, params: List[Tuple[str, str]]) -> List[dict]:
+        rows = None
+        remaining = []
+        for column, expr in params:
+            if column in RESERVED_PARAMS:
+                continue
+            if rows is None and _indexable(column) and expr.startswith("eq."):
+                rows = self.find(table, column, _cast(expr[3:]))
+            else:
+                remaining.append((column, expr))
+        rows = list(self.rows(table) if rows is None else rows)
+        for column, expr in remaining:
+            if column in ("or", "and"):
+                rows = [r for r in rows if _logic(r, column, expr)]
+            else:
+                rows = [r for r in rows if _match(r, column, expr)]
+        return rows
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        match = _REST_PATH.search(request.url.path)
+        if not match:
+            return httpx.Response(404, json={"message": "Not found"})
+        target = match.group(1)
+        query = request.url.query
+        params = parse_qsl(query.decode() if isinstance(query, bytes) else query, keep_blank_values=True)
+        body = await request.aread()
+        payload = json.loads(body) if body else None
+        prefer = request.headers.get("prefer", "")
+        self.calls[(request.method, target)] += 1
+
+        if target.startswith("rpc/"):
+            rpc = self.rpcs.get(target[4:])
+            if rpc is None:
+                return httpx.Response(404, json={"message": f"Function {target[4:]} not found"})
+            result = rpc(self, **(payload or dict(params)))
+            if asyncio.iscoroutine(result):
+                result = await result
+            return httpx.Response(200, json=result)
+
+        options = dict(params)
+        if request.method in ("GET", "HEAD"):
+            return self._select(target, params, options, prefer, request.method == "HEAD")
+        if request.method == "POST":
+            return self._insert(target, payload, options, prefer)
+        if request.method == "PATCH":
+            rows = self._filter(target, params)
+            for row in rows:
+                row.update(payload)
+            self._drop_indexes(target)
+            return httpx.Response(200, json=[dict(r) for r in rows])
+        if request.method == "DELETE":
+            rows = self._filter(target, params)
+            removed = {id(r) for r in rows}
+            self.tables[target] = [r for r in self.rows(target) if id(r) not in removed]
+            self._drop_indexes(target)
+            return httpx.Response(200, json=rows)
+        return httpx.Response(405)
+
+    def _select(self, table: str, params: List[Tuple[str, str]], options: dict, prefer: str, head: bool) -> httpx.Response:
+        rows = self._filter(table, params)
+        if "order" in options:
+            for spec in reversed(options["order"].split(",")):
+                column, *modifiers = spec.split(".")
+                rows = sorted(rows, key=lambda r: (r.get(column) is None, r.get(column)), reverse="desc" in modifiers)
+        total = len(rows)
+        offset = int(options.get("offset", 0))
+        rows = rows[offset:offset + int(options["limit"])] if "limit" in options else rows[offset:]
+        data = [self._project(table, r, options.get("select")) for r in rows]
+        headers = {}
+        if "count=" in prefer:
+            headers["content-range"] = f"{offset}-{offset + len(data) - 1}/{total}"
+        return httpx.Response(200, json=[] if head else data, headers=headers)
+
+    def _insert(self, table: str, payload: Any, options: dict, prefer: str) -> httpx.Response:
+        conflict_columns = options["on_conflict"].split(",") if options.get("on_conflict") else None
+        out = []
+        for item in payload if isinstance(payload, list) else [payload]:
+            existing = None
+            if conflict_columns:
+                existing = next(
+                    (r for r in self.rows(table) if all(_equal(r.get(c), item.get(c)) for c in conflict_columns)),
+                    None
+                )
+            if existing is not None:
+                if "ignore-duplicates" not in prefer:
+                    existing.update(item)
+                    self._drop_indexes(table)
+                    out.append(dict(existing))
+                continue
+            out.append(dict(self.insert(table, item)))
+        return httpx.Response(201, json=out)
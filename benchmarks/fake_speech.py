@@ -0,0 +1,22 @@
+import hashlib
+from typing import Optional
+from app.services.speech_engines import SpeechEngine, Transcript
+
+
+class FakeSpeechEngine(SpeechEngine):
+    """
+    Deterministic engine for tests and benchmarks only: a UTF-8 text upload is
+    "transcribed" to its own content; any other audio yields a stable
+    pseudo-word derived from its bytes. Never configure it in production,
+    where it would let a text upload pass any pronunciation check.
+
+        SPEECH_ENGINE=benchmarks.fake_speech:FakeSpeechEngine
+    """
+
+    def transcribe(self, path: str, language: Optional[str] = None) -> Transcript:
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            return Transcript(text=data.decode("utf-8").strip(), confidence=1.0)
+        except UnicodeDecodeError:
+            return Transcript(text=hashlib.sha256(data).hexdigest()[:8], confidence=0.0)
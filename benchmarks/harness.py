@@ -0,0 +1,347 @@
+"""
+Load and benchmark harness. Drives a weighted traffic mix through the ASGI app,
+in process, against the in-memory PostgREST fake with a configurable per-call
+latency. Reports throughput, p50/p99 latency and database calls per request
+for each operation.
+
+    python -m benchmarks.harness --mix launch --requests 3000 --concurrency 32
+    python -m benchmarks.harness --save-baseline benchmarks/baselines/default.json
+    python -m benchmarks.harness --baseline benchmarks/baselines/default.json
+
+With --baseline, exits with status 1 when throughput, a latency percentile or
+the number of database calls per request regressed beyond its tolerance.
+Latency baselines are only comparable on the same machine. Database calls per
+request depend only on the code and cache timing, so they get a tighter
+tolerance and catch N+1 regressions on any machine.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+BENCHMARK_PASSWORD = "benchmark-password"
+
+# Required settings get harmless defaults so the harness runs without a .env
+BENCHMARK_ENV = {
+    "SUPABASE_URL": "http://postgrest.benchmark",
+    "SUPABASE_KEY": "benchmark",
+    "GOOGLE_CLIENT_ID": "benchmark",
+    "GOOGLE_CLIENT_SECRET": "benchmark",
+    "SECRET_KEY": "benchmark-secret",
+    "LOG_LEVEL": "WARNING",
+    "METRICS_SLOW_REQUEST_SAMPLE_RATE": "0", # Queueing under load makes everything "slow"
+}
+
+
+@dataclass
+class VirtualUser:
+    parent: dict
+    children: List[dict]
+    token: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    last_sync: Optional[dict] = None # Replayed now and then, like a client retrying after a timeout
+
+
+@dataclass(frozen=True)
+class Operation:
+    method: str
+    route: str # Route template, as labelled by the metrics middleware
+    call: Callable[..., Awaitable]
+
+
+def _operations(scenarios_by_language: Dict[str, List[dict]]) -> Dict[str, Operation]:
+    def child(user: VirtualUser, rng: random.Random) -> dict:
+        return rng.choice(user.children)
+
+    async def login(client, user, rng):
+        return await client.post("/login", json={"email": user.parent["email"], "password": BENCHMARK_PASSWORD})
+
+    async def modules(client, user, rng):
+        return await client.get("/content/modules", params={"child_id": child(user, rng)["id"]}, headers=user.headers)
+
+    async def modules_compact(client, user, rng):
+        return await client.get("/content/modules", params={"child_id": child(user, rng)["id"], "view": "compact"}, headers=user.headers)
+
+    async def play(client, user, rng):
+        scenario = rng.choice(scenarios_by_language[child(user, rng)["language"]])
+        return await client.get(f"/content/scenarios/{scenario['id']}/play", headers=user.headers)
+
+    async def attempt(client, user, rng):
+        kid = child(user, rng)
+        scenario = rng.choice(scenarios_by_language[kid["language"]])
+        score = rng.randint(0, 3)
+        return await client.post("/game/attempt", headers=user.headers, json={
+            "child_id": kid["id"], "scenario_id": scenario["id"],
+            "score_earned": score, "max_score": 3, "stars_earned": score
+        })
+
+    async def sync(client, user, rng):
+        # An offline session uploaded at once: a few attempts and a card, occasionally a retried batch
+        kid = child(user, rng)
+        if user.last_sync is not None and rng.random() < 0.1:
+            return await client.post("/game/sync", headers=user.headers, json=user.last_sync)
+        attempts = []
+        for _ in range(rng.randint(1, 5)):
+            score = rng.randint(0, 3)
+            attempts.append({
+                "child_id": kid["id"], "scenario_id": rng.choice(scenarios_by_language[kid["language"]])["id"],
+                "score_earned": score, "max_score": 3, "stars_earned": score, "idempotency_key": str(uuid.UUID(int=rng.getrandbits(128)))
+            })
+        cards = [{"child_id": kid["id"], "card_id": str(uuid.UUID(int=rng.getrandbits(128))), "idempotency_key": str(uuid.UUID(int=rng.getrandbits(128)))}]
+        user.last_sync = {"attempts": attempts, "card_completions": cards}
+        return await client.post("/game/sync", headers=user.headers, json=user.last_sync)
+
+    async def dashboard(client, user, rng):
+        return await client.get("/profiles/parent/dashboard", headers=user.headers)
+
+    async def kids(client, user, rng):
+        return await client.get("/profiles/kids", headers=user.headers)
+
+    return {
+        "login": Operation("POST", "/login", login),
+        "modules": Operation("GET", "/content/modules", modules),
+        "modules_compact": Operation("GET", "/content/modules", modules_compact),
+        "play": Operation("GET", "/content/scenarios/{scenario_id}/play", play),
+        "attempt": Operation("POST", "/game/attempt", attempt),
+        "sync": Operation("POST", "/game/sync", sync),
+        "dashboard": Operation("GET", "/profiles/parent/dashboard", dashboard),
+        "kids": Operation("GET", "/profiles/kids", kids),
+    }
+
+
+# Relative weights per operation
+MIXES: Dict[str, Dict[str, int]] = {
+    # A typical session: open the app, pick a child, play and submit scenarios
+    "default": {"login": 5, "kids": 5, "modules": 25, "play": 25, "attempt": 25, "dashboard": 15},
+    # App launches: every user lands on the map at the same time
+    "launch": {"login": 10, "kids": 15, "modules": 50, "dashboard": 25},
+    # Gameplay only
+    "gameplay": {"play": 50, "attempt": 50},
+    # Devices coming back online with queued events
+    "offline": {"kids": 10, "modules": 30, "sync": 60},
+    "compact": {"modules_compact": 60, "play": 20, "attempt": 20},
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    # Nearest rank
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _queries_snapshot() -> Dict[Tuple[str, str], Tuple[float, int]]:
+    from app.core.metrics import registry
+    return {key: (hist.total, hist.count) for key, hist in registry.queries_per_request.items()}
+
+
+async def run_benchmark(
+    mix: str,
+    requests: int,
+    concurrency: int,
+    latency: float,
+    jitter: float,
+    warmup: int,
+    parents: int,
+    seed: int,
+) -> dict:
+    import httpx
+    from app.core.security import create_access_token, get_password_hash, parent_claims
+    from app.db.supabase import use_transport
+    from app.main import app
+    from app.models.auth import Parent
+    from benchmarks.seed import build_dataset
+
+    # One hash shared by every parent: login cost is the verify, not the seeding
+    dataset = build_dataset(get_password_hash(BENCHMARK_PASSWORD), BENCHMARK_PASSWORD, parents=parents)
+    fake = dataset.fake(latency=latency, jitter=jitter, seed=seed)
+    use_transport(fake)
+
+    users = []
+    for parent in dataset.parents:
+        token = create_access_token(parent["id"], claims=parent_claims(Parent(**parent)))
+        children = [c for c in dataset.children if c["parent_id"] == parent["id"]]
+        users.append(VirtualUser(parent, children, token, {"Authorization": f"Bearer {token}"}))
+    scenarios_by_language: Dict[str, List[dict]] = {}
+    for scenario in dataset.scenarios:
+        scenarios_by_language.setdefault(scenario["language"], []).append(scenario)
+
+    operations = _operations(scenarios_by_language)
+    weights = MIXES[mix]
+    names = list(weights)
+    rng = random.Random(seed)
+    plan = rng.choices(names, weights=[weights[n] for n in names], k=warmup + requests)
+
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    statuses: Dict[str, Dict[int, int]] = {name: {} for name in names}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            position = 0
+            measuring = False
+
+            async def worker(worker_rng: random.Random, until: int):
+                nonlocal position
+                while position < until:
+                    name = plan[position]
+                    position += 1
+                    user = worker_rng.choice(users)
+                    start = time.perf_counter()
+                    response = await operations[name].call(client, user, worker_rng)
+                    elapsed = time.perf_counter() - start
+                    if measuring:
+                        latencies[name].append(elapsed)
+                        statuses[name][response.status_code] = statuses[name].get(response.status_code, 0) + 1
+                        if response.status_code >= 400:
+                            errors[name] += 1
+
+            # Warm-up fills the catalog, bundle and principal caches; not measured
+            await asyncio.gather(*(worker(random.Random(seed + i), warmup) for i in range(concurrency)))
+
+            measuring = True
+            before = _queries_snapshot()
+            db_calls_before = sum(fake.calls.values())
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(random.Random(seed + 1000 + i), warmup + requests) for i in range(concurrency)))
+            duration = time.perf_counter() - started
+            after = _queries_snapshot()
+            db_calls_total = sum(fake.calls.values()) - db_calls_before
+
+    report_operations = {}
+    for name in names:
+        operation = operations[name]
+        total, count = after.get((operation.method, operation.route), (0.0, 0))
+        total_before, count_before = before.get((operation.method, operation.route), (0.0, 0))
+        samples = latencies[name]
+        report_operations[name] = {
+            "count": len(samples),
+            "errors": errors[name],
+            "statuses": {str(code): n for code, n in sorted(statuses[name].items())},
+            "p50_ms": round(percentile(samples, 50) * 1000, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000, 3),
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+            # Per route: operations sharing a route (modules / modules_compact) share this figure
+            "db_calls_per_request": round((total - total_before) / (count - count_before), 3) if count > count_before else 0.0,
+        }
+
+    every = [value for samples in latencies.values() for value in samples]
+    return {
+        "mix": mix,
+        "requests": requests,
+        "concurrency": concurrency,
+        "db_latency_ms": latency * 1000,
+        "db_jitter_ms": jitter * 1000,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(requests / duration, 1),
+        "p50_ms": round(percentile(every, 50) * 1000, 3),
+        "p99_ms": round(percentile(every, 99) * 1000, 3),
+        # Includes background work (job queue, refreshers) triggered by the requests
+        "db_calls_total": db_calls_total,
+        "operations": report_operations,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta_ms: float, db_tolerance: float) -> List[str]:
+    """
+    Returns a description of every metric that regressed against the baseline.
+    """
+    regressions = []
+    if report["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput {baseline['throughput_rps']} -> {report['throughput_rps']} req/s")
+
+    for name, current in report["operations"].items():
+        previous = baseline.get("operations", {}).get(name)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            limit = max(previous[metric] * (1 + tolerance), previous[metric] + min_delta_ms)
+            if current[metric] > limit:
+                regressions.append(f"{name} {metric} {previous[metric]} -> {current[metric]}")
+        if current["db_calls_per_request"] > previous["db_calls_per_request"] * (1 + db_tolerance) + 0.01:
+            regressions.append(
+                f"{name} db calls per request {previous['db_calls_per_request']} -> {current['db_calls_per_request']}"
+            )
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name} errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"mix={report['mix']} requests={report['requests']} concurrency={report['concurrency']} "
+        f"db_latency={report['db_latency_ms']}ms"
+    )
+    print(f"{'operation':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}{'db/req':>8}")
+    for name, op in report["operations"].items():
+        print(f"{name:<16}{op['count']:>7}{op['errors']:>8}{op['p50_ms']:>10.2f}{op['p99_ms']:>10.2f}{op['db_calls_per_request']:>8.2f}")
+    print(
+        f"throughput {report['throughput_rps']} req/s, p50 {report['p50_ms']:.2f}ms, "
+        f"p99 {report['p99_ms']:.2f}ms, {report['db_calls_total']} db calls in {report['duration_s']}s"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the API against an in-memory Supabase stand-in.")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated database round trip per call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--parents", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--save-baseline", help="Write the report as the new baseline")
+    parser.add_argument("--baseline", help="Compare against this baseline and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Latency changes below this are noise")
+    parser.add_argument("--db-tolerance", type=float, default=0.1, help="Allowed relative increase in database calls per request")
+    args = parser.parse_args(argv)
+
+    for key, value in BENCHMARK_ENV.items():
+        os.environ.setdefault(key, value)
+    job_dir = tempfile.TemporaryDirectory(prefix="kulture-bench-")
+    os.environ.setdefault("JOB_QUEUE_PATH", os.path.join(job_dir.name, "jobs.sqlite3"))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    report = asyncio.run(run_benchmark(
+        args.mix, args.requests, args.concurrency, args.latency_ms / 1000, args.jitter_ms / 1000,
+        args.warmup, args.parents, args.seed
+    ))
+    print_report(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("mix") != report["mix"]:
+            print(f"Baseline is for mix {baseline.get('mix')!r}, not {report['mix']!r}", file=sys.stderr)
+            return 2
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms, args.db_tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
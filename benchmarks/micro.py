@@ -0,0 +1,78 @@
+"""
+Shared helpers for the before/after microbenchmarks (benchmarks/bench_*.py).
+Each script times the implementation a change replaced next to the current
+one, on the same data, and prints a table:
+
+    python -m benchmarks.bench_dashboard
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, List, Sequence
+from benchmarks.harness import BENCHMARK_ENV
+
+_job_dir = None
+
+
+def use_benchmark_env() -> None:
+    """
+    Fills in the settings the app requires, like the harness does. Call before importing app modules.
+    """
+    global _job_dir
+    for key, value in BENCHMARK_ENV.items():
+        os.environ.setdefault(key, value)
+    if "JOB_QUEUE_PATH" not in os.environ:
+        _job_dir = tempfile.TemporaryDirectory(prefix="kulture-bench-")
+        os.environ["JOB_QUEUE_PATH"] = os.path.join(_job_dir.name, "jobs.sqlite3")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def per_call(fn: Callable[[], Any], number: int, repeat: int = 5) -> float:
+    """
+    Seconds per call, best of `repeat` runs of `number` calls.
+    """
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+async def per_call_async(fn: Callable[[], Awaitable[Any]], number: int, repeat: int = 5) -> float:
+    await fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+async def concurrent_rate(fn: Callable[[], Awaitable[Any]], total: int, concurrency: int) -> float:
+    """
+    Calls per second with `concurrency` callers sharing `total` calls.
+    """
+    remaining = total
+
+    async def caller():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await fn()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+def print_table(headers: Sequence[str], rows: List[Sequence[Any]]) -> None:
+    cells = [[str(h) for h in headers]] + [[f"{c:.3f}" if isinstance(c, float) else str(c) for c in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for row in cells:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
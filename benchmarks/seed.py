@@ -0,0 +1,259 @@
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from benchmarks.fake_postgrest import FakePostgrest
+
+# RPC and trigger stand-ins mirror supabase/migrations. They may update rows in
+# place but must not change id-like columns, which the fake indexes.
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def track_level_progress(fake: FakePostgrest, attempt: dict) -> None:
+    """
+    child_scenario_attempts trigger: keeps child_level_progress.passed_scenarios current.
+    """
+    if not attempt.get("passed"):
+        return
+    scenario = fake.get("scenarios", attempt["scenario_id"])
+    if scenario is None:
+        return
+    level_scenarios = {s["id"] for s in fake.find("scenarios", "level_id", scenario["level_id"])}
+    passed = {
+        a["scenario_id"] for a in fake.find("child_scenario_attempts", "child_id", attempt["child_id"])
+        if a.get("passed") and a["scenario_id"] in level_scenarios
+    }
+    progress = next((p for p in fake.find("child_level_progress", "child_id", attempt["child_id"]) if p["level_id"] == scenario["level_id"]), None)
+    if progress is None:
+        fake.insert("child_level_progress", {
+            "child_id": attempt["child_id"], "level_id": scenario["level_id"], "passed_scenarios": len(passed)
+        })
+    else:
+        progress["passed_scenarios"] = len(passed)
+
+
+def get_children_progress(fake: FakePostgrest, p_child_ids: List[str]) -> List[dict]:
+    return [
+        {
+            "child_id": child_id,
+            "scenarios_passed": sum(1 for a in fake.find("child_scenario_attempts", "child_id", child_id) if a.get("passed")),
+            "artifacts_unlocked": len(fake.find("child_artifacts", "child_id", child_id)),
+        }
+        for child_id in p_child_ids
+    ]
+
+
+def apply_scenario_attempt(fake: FakePostgrest, p_attempt_id: str) -> Optional[dict]:
+    attempt = fake.get("child_scenario_attempts", p_attempt_id)
+    if attempt is None:
+        return None
+    if attempt.get("applied_at") is not None:
+        return {**(attempt.get("side_effects") or {"attempt_id": attempt["id"], "passed": attempt["passed"]}), "duplicate": True}
+
+    child = fake.get("children", attempt["child_id"])
+    unlocked, newly_unlocked, respect_score, current_level = None, False, None, None
+    if attempt["passed"] and child is not None:
+        child["respect_score"] = (child.get("respect_score") or 0) + attempt["score_earned"]
+        respect_score, current_level = child["respect_score"], child.get("current_level")
+        level_id = fake.get("scenarios", attempt["scenario_id"])["level_id"]
+        scenario_count = len(fake.find("scenarios", "level_id", level_id))
+        progress = next((p for p in fake.find("child_level_progress", "child_id", child["id"]) if p["level_id"] == level_id), None)
+        if scenario_count and progress and progress["passed_scenarios"] >= scenario_count:
+            artifact = next(iter(fake.find("artifacts", "level_id", level_id)), None)
+            if artifact is not None:
+                unlocked = {k: artifact.get(k) for k in ("id", "name", "description", "image_url")}
+                owned = any(ca["artifact_id"] == artifact["id"] for ca in fake.find("child_artifacts", "child_id", child["id"]))
+                if not owned:
+                    fake.insert("child_artifacts", {"child_id": child["id"], "artifact_id": artifact["id"]})
+                    newly_unlocked = True
+                    child["current_level"] = (child.get("current_level") or 1) + 1
+                    current_level = child["current_level"]
+
+    attempt["side_effects"] = {
+        "attempt_id": attempt["id"],
+        "passed": attempt["passed"],
+        "unlocked_artifact": unlocked,
+        "newly_unlocked": newly_unlocked,
+        "respect_score": respect_score,
+        "current_level": current_level,
+    }
+    attempt["applied_at"] = _now()
+    return {**attempt["side_effects"], "duplicate": False}
+
+
+def commit_scenario_attempt(
+    fake: FakePostgrest,
+    p_child_id: str,
+    p_scenario_id: str,
+    p_score_earned: int,
+    p_max_score: int,
+    p_stars_earned: int,
+    p_passed: bool,
+    p_idempotency_key: Optional[str] = None,
+    p_occurred_at: Optional[str] = None,
+) -> dict:
+    if p_idempotency_key is not None:
+        existing = next((a for a in fake.find("child_scenario_attempts", "child_id", p_child_id) if a.get("idempotency_key") == p_idempotency_key), None)
+        if existing is not None:
+            return {"attempt_id": existing["id"], "passed": existing["passed"], "duplicate": True, "unlocked_artifact": None, "newly_unlocked": False}
+    attempt = fake.insert("child_scenario_attempts", {
+        "child_id": p_child_id, "scenario_id": p_scenario_id, "score_earned": p_score_earned,
+        "max_score": p_max_score, "stars_earned": p_stars_earned, "passed": p_passed,
+        "idempotency_key": p_idempotency_key, "applied_at": None,
+        **({"created_at": p_occurred_at} if p_occurred_at else {}),
+    })
+    return apply_scenario_attempt(fake, attempt["id"])
+
+
+def sync_child_events(fake: FakePostgrest, p_child_id: str, p_attempts: Optional[List[dict]], p_cards: Optional[List[dict]]) -> dict:
+    """
+    Per event, like migrations 0700 and 0900: a failing event is reported
+    rejected and the rest are kept. Events run in the order given; only the
+    streak trigger, which the fake lacks, depends on occurred_at order.
+    """
+    attempts = []
+    for event in p_attempts or []:
+        if fake.get("scenarios", event.get("scenario_id")) is None:
+            # Foreign key violation on child_scenario_attempts.scenario_id
+            attempts.append({"idempotency_key": event.get("idempotency_key"), "rejected": True, "error": "23503"})
+            continue
+        attempts.append({"idempotency_key": event["idempotency_key"], **commit_scenario_attempt(
+            fake, p_child_id, event["scenario_id"], event["score_earned"], event["max_score"],
+            event["stars_earned"], event["passed"], event["idempotency_key"], event.get("occurred_at")
+        )})
+
+    cards = []
+    seen = set()
+    for event in p_cards or []:
+        key = event["idempotency_key"]
+        if key in seen:
+            continue
+        seen.add(key)
+        existing = next((c for c in fake.find("child_action_card_completions", "child_id", p_child_id) if c.get("idempotency_key") == key), None)
+        saved = existing or fake.insert("child_action_card_completions", {
+            "child_id": p_child_id, "card_id": event["card_id"], "idempotency_key": key,
+            **({"created_at": event["occurred_at"]} if event.get("occurred_at") else {}),
+        })
+        cards.append({"idempotency_key": key, "card_id": event["card_id"], "saved_id": saved["id"], "duplicate": existing is not None})
+    return {"attempts": attempts, "cards": cards}
+
+
+def reset_lapsed_streaks(fake: FakePostgrest, p_batch_size: int = 5000) -> int:
+    return 0
+
+
+RPCS = {
+    "get_children_progress": get_children_progress,
+    "apply_scenario_attempt": apply_scenario_attempt,
+    "commit_scenario_attempt": commit_scenario_attempt,
+    "sync_child_events": sync_child_events,
+    "reset_lapsed_streaks": reset_lapsed_streaks,
+}
+
+TRIGGERS = {"child_scenario_attempts": [track_level_progress]}
+
+
+@dataclass
+class Dataset:
+    tables: Dict[str, List[dict]]
+    password: str
+    parents: List[dict] = field(default_factory=list)
+    children: List[dict] = field(default_factory=list)
+    scenarios: List[dict] = field(default_factory=list)
+
+    def fake(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0) -> FakePostgrest:
+        return FakePostgrest(self.tables, RPCS, TRIGGERS, latency=latency, jitter=jitter, seed=seed)
+
+
+def build_dataset(
+    password_hash: str,
+    password: str,
+    languages: tuple = ("yoruba", "twi"),
+    modules_per_language: int = 3,
+    levels_per_module: int = 6,
+    scenarios_per_level: int = 4,
+    nodes_per_scenario: int = 6,
+    parents: int = 200,
+    children_per_parent: int = 2,
+) -> Dataset:
+    """
+    A curriculum and a user base shaped like production: several modules per
+    language, children spread over the curriculum with past attempts, and
+    one artifact per level. Every parent logs in with `password`.
+    """
+    tables: Dict[str, List[dict]] = {name: [] for name in (
+        "parents", "children", "modules", "levels", "scenarios", "personas", "scenario_nodes",
+        "artifacts", "avatars", "child_scenario_attempts", "child_artifacts", "child_level_progress",
+        "child_action_card_completions",
+    )}
+    dataset = Dataset(tables=tables, password=password)
+    text = "Ẹ kú àárọ̀, ṣé dáadáa ni? "
+
+    for language in languages:
+        for gender in ("boy", "girl"):
+            tables["avatars"] += [
+                {"language": language.title(), "gender": gender.title(), "image_url": f"avatars/{language}-{gender}-{i}.png"}
+                for i in range(4)
+            ]
+        persona = {"id": str(uuid.uuid4()), "name": f"Mama {language.title()}", "avatar_url": "personas/mama.png", "language": language}
+        tables["personas"].append(persona)
+
+        for m in range(modules_per_language):
+            module = {"id": str(uuid.uuid4()), "title": f"{language.title()} module {m + 1}", "description": "Greetings and respect. " * 12, "language": language, "order_index": m}
+            tables["modules"].append(module)
+            for l in range(levels_per_module):
+                level = {"id": str(uuid.uuid4()), "module_id": module["id"], "title": f"Level {l + 1}", "description": "Practise with elders. " * 8, "icon_url": "icons/level.png", "order_index": l, "pass_threshold_points": scenarios_per_level}
+                tables["levels"].append(level)
+                tables["artifacts"].append({"id": str(uuid.uuid4()), "level_id": level["id"], "name": f"Artifact {m}.{l}", "description": "A keepsake. " * 6, "image_url": "artifacts/a.png", "created_at": _now()})
+                for s in range(scenarios_per_level):
+                    scenario = {"id": str(uuid.uuid4()), "level_id": level["id"], "title": f"Scenario {s + 1}", "description": "Greet your grandmother. " * 6, "type": "boss" if s == scenarios_per_level - 1 else "standard", "order_index": s}
+                    tables["scenarios"].append(scenario)
+                    dataset.scenarios.append({**scenario, "language": language})
+                    for n in range(nodes_per_scenario):
+                        user_turn = n % 2 == 1
+                        tables["scenario_nodes"].append({
+                            "id": str(uuid.uuid4()), "scenario_id": scenario["id"], "text": text * 2,
+                            "speaker_type": "user" if user_turn else "persona",
+                            "persona_id": None if user_turn else persona["id"],
+                            "expected_response": "Ẹ kú àárọ̀ ma|E ku aaro ma" if user_turn else None,
+                            "options": None, "points_max": 1, "order_index": n, "audio_url": None,
+                        })
+
+    levels_by_language = {
+        language: [lvl for mod in tables["modules"] if mod["language"] == language for lvl in tables["levels"] if lvl["module_id"] == mod["id"]]
+        for language in languages
+    }
+    scenarios_by_level: Dict[str, List[dict]] = {}
+    for scenario in tables["scenarios"]:
+        scenarios_by_level.setdefault(scenario["level_id"], []).append(scenario)
+
+    for p in range(parents):
+        parent = {"id": str(uuid.uuid4()), "email": f"parent{p}@example.com", "full_name": f"Parent {p}", "google_id": None, "password_hash": password_hash}
+        tables["parents"].append(parent)
+        dataset.parents.append(parent)
+        for c in range(children_per_parent):
+            language = languages[(p + c) % len(languages)]
+            levels = levels_by_language[language]
+            completed = (p * children_per_parent + c) % (len(levels) + 1)
+            child = {
+                "id": str(uuid.uuid4()), "parent_id": parent["id"], "display_name": f"Child {p}.{c}", "age": 4 + (p + c) % 10,
+                "language": language, "gender": "girl" if c % 2 else "boy", "current_level": completed + 1,
+                "respect_score": completed * scenarios_per_level, "streak": 0, "longest_streak": 0,
+                "last_active_date": None, "timezone": "UTC", "avatar_url": f"avatars/{language}-boy-0.png",
+            }
+            tables["children"].append(child)
+            dataset.children.append(child)
+            for level in levels[:completed]:
+                for scenario in scenarios_by_level[level["id"]]:
+                    tables["child_scenario_attempts"].append({
+                        "id": str(uuid.uuid4()), "child_id": child["id"], "scenario_id": scenario["id"],
+                        "score_earned": 1, "max_score": 1, "stars_earned": 3, "passed": True,
+                        "created_at": _now(), "applied_at": _now(),
+                    })
+                tables["child_level_progress"].append({"child_id": child["id"], "level_id": level["id"], "passed_scenarios": scenarios_per_level})
+                artifact = next(a for a in tables["artifacts"] if a["level_id"] == level["id"])
+                tables["child_artifacts"].append({"id": str(uuid.uuid4()), "child_id": child["id"], "artifact_id": artifact["id"], "created_at": _now()})
+    return dataset
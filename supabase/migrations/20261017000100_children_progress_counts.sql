@@ -0,0 +1,23 @@
+-- Per-child progress counters for the parent dashboard, computed server-side
+-- for a whole family in a single round trip.
+
+create index if not exists child_scenario_attempts_child_passed_idx
+    on public.child_scenario_attempts (child_id)
+    where passed;
+
+create index if not exists child_artifacts_child_idx
+    on public.child_artifacts (child_id);
+
+create or replace function public.get_children_progress(p_child_ids uuid[])
+returns table (child_id uuid, scenarios_passed bigint, artifacts_unlocked bigint)
+language sql
+stable
+as $$
+    select
+        c.id as child_id,
+        (select count(*) from public.child_scenario_attempts a
+            where a.child_id = c.id and a.passed) as scenarios_passed,
+        (select count(*) from public.child_artifacts ca
+            where ca.child_id = c.id) as artifacts_unlocked
+    from unnest(p_child_ids) as c(id);
+$$;
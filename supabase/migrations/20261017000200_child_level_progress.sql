@@ -0,0 +1,75 @@
+-- Incrementally maintained level progress: one row per (child, level) holding
+-- the number of distinct scenarios the child has passed in that level.
+-- Level completion becomes a comparison of two counts instead of a scan of
+-- the child's whole attempt history.
+
+create table if not exists public.child_scenario_passes (
+    child_id uuid not null references public.children (id) on delete cascade,
+    scenario_id uuid not null references public.scenarios (id) on delete cascade,
+    level_id uuid not null references public.levels (id) on delete cascade,
+    first_passed_at timestamptz not null default now(),
+    primary key (child_id, scenario_id)
+);
+
+create table if not exists public.child_level_progress (
+    child_id uuid not null references public.children (id) on delete cascade,
+    level_id uuid not null references public.levels (id) on delete cascade,
+    passed_scenarios integer not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (child_id, level_id)
+);
+
+create or replace function public.track_level_progress()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_level_id uuid;
+begin
+    if not new.passed then
+        return new;
+    end if;
+
+    select level_id into v_level_id from public.scenarios where id = new.scenario_id;
+    if v_level_id is null then
+        return new;
+    end if;
+
+    -- Only the first pass of a scenario moves the level counter
+    insert into public.child_scenario_passes (child_id, scenario_id, level_id)
+    values (new.child_id, new.scenario_id, v_level_id)
+    on conflict do nothing;
+
+    if found then
+        insert into public.child_level_progress (child_id, level_id, passed_scenarios)
+        values (new.child_id, v_level_id, 1)
+        on conflict (child_id, level_id) do update
+            set passed_scenarios = public.child_level_progress.passed_scenarios + 1,
+                updated_at = now();
+    end if;
+
+    return new;
+end;
+$$;
+
+drop trigger if exists child_scenario_attempts_level_progress on public.child_scenario_attempts;
+create trigger child_scenario_attempts_level_progress
+    after insert on public.child_scenario_attempts
+    for each row execute function public.track_level_progress();
+
+-- Backfill from the existing attempt history
+insert into public.child_scenario_passes (child_id, scenario_id, level_id, first_passed_at)
+select a.child_id, a.scenario_id, s.level_id, min(a.created_at)
+from public.child_scenario_attempts a
+join public.scenarios s on s.id = a.scenario_id
+where a.passed
+group by a.child_id, a.scenario_id, s.level_id
+on conflict do nothing;
+
+insert into public.child_level_progress (child_id, level_id, passed_scenarios)
+select child_id, level_id, count(*)
+from public.child_scenario_passes
+group by child_id, level_id
+on conflict (child_id, level_id) do update
+    set passed_scenarios = excluded.passed_scenarios,
+        updated_at = now();
@@ -0,0 +1,96 @@
+-- Single round-trip, atomic commit of a scenario attempt.
+-- Inserts the attempt, increments respect_score in place, and unlocks the
+-- level artifact idempotently so concurrent submissions from several devices
+-- can neither lose score updates nor double-insert an artifact.
+
+delete from public.child_artifacts a
+using public.child_artifacts b
+where a.child_id = b.child_id
+  and a.artifact_id = b.artifact_id
+  and a.ctid > b.ctid;
+
+alter table public.child_artifacts
+    drop constraint if exists child_artifacts_child_artifact_key;
+alter table public.child_artifacts
+    add constraint child_artifacts_child_artifact_key unique (child_id, artifact_id);
+
+create or replace function public.commit_scenario_attempt(
+    p_child_id uuid,
+    p_scenario_id uuid,
+    p_score_earned integer,
+    p_max_score integer,
+    p_stars_earned integer,
+    p_passed boolean
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_attempt_id uuid;
+    v_level_id uuid;
+    v_scenario_count integer;
+    v_passed_count integer;
+    v_respect_score integer;
+    v_current_level integer;
+    v_artifact record;
+    v_unlocked jsonb := null;
+    v_newly_unlocked boolean := false;
+begin
+    -- The level progress trigger runs as part of this insert
+    insert into public.child_scenario_attempts (child_id, scenario_id, score_earned, max_score, stars_earned, passed)
+    values (p_child_id, p_scenario_id, p_score_earned, p_max_score, p_stars_earned, p_passed)
+    returning id into v_attempt_id;
+
+    if p_passed then
+        -- Row lock serializes concurrent commits for the same child
+        update public.children
+        set respect_score = coalesce(respect_score, 0) + p_score_earned
+        where id = p_child_id
+        returning respect_score, current_level into v_respect_score, v_current_level;
+
+        select level_id into v_level_id from public.scenarios where id = p_scenario_id;
+        select count(*) into v_scenario_count from public.scenarios where level_id = v_level_id;
+        select passed_scenarios into v_passed_count
+        from public.child_level_progress
+        where child_id = p_child_id and level_id = v_level_id;
+
+        if v_scenario_count > 0 and coalesce(v_passed_count, 0) >= v_scenario_count then
+            select id, name, description, image_url into v_artifact
+            from public.artifacts
+            where level_id = v_level_id
+            limit 1;
+
+            if found then
+                v_unlocked := jsonb_build_object(
+                    'id', v_artifact.id,
+                    'name', v_artifact.name,
+                    'description', v_artifact.description,
+                    'image_url', v_artifact.image_url
+                );
+
+                insert into public.child_artifacts (child_id, artifact_id)
+                values (p_child_id, v_artifact.id)
+                on conflict (child_id, artifact_id) do nothing;
+
+                -- First completion of the level: bump the child's current level
+                if found then
+                    v_newly_unlocked := true;
+                    update public.children
+                    set current_level = coalesce(current_level, 1) + 1
+                    where id = p_child_id
+                    returning current_level into v_current_level;
+                end if;
+            end if;
+        end if;
+    end if;
+
+    return jsonb_build_object(
+        'attempt_id', v_attempt_id,
+        'passed', p_passed,
+        'unlocked_artifact', v_unlocked,
+        'newly_unlocked', v_newly_unlocked,
+        'respect_score', v_respect_score,
+        'current_level', v_current_level
+    );
+end;
+$$;
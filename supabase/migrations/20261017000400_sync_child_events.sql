@@ -0,0 +1,170 @@
+-- Offline gameplay sync: client-generated idempotency keys on gameplay events
+-- and a batch entry point that commits a child's queued events in one call.
+
+alter table public.child_scenario_attempts
+    add column if not exists idempotency_key uuid;
+create unique index if not exists child_scenario_attempts_idempotency_idx
+    on public.child_scenario_attempts (child_id, idempotency_key);
+
+alter table public.child_action_card_completions
+    add column if not exists idempotency_key uuid;
+create unique index if not exists child_action_card_completions_idempotency_idx
+    on public.child_action_card_completions (child_id, idempotency_key);
+
+-- Same commit as before, but a replayed idempotency key is a no-op
+drop function if exists public.commit_scenario_attempt(uuid, uuid, integer, integer, integer, boolean);
+
+create or replace function public.commit_scenario_attempt(
+    p_child_id uuid,
+    p_scenario_id uuid,
+    p_score_earned integer,
+    p_max_score integer,
+    p_stars_earned integer,
+    p_passed boolean,
+    p_idempotency_key uuid default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_attempt_id uuid;
+    v_level_id uuid;
+    v_scenario_count integer;
+    v_passed_count integer;
+    v_respect_score integer;
+    v_current_level integer;
+    v_artifact record;
+    v_unlocked jsonb := null;
+    v_newly_unlocked boolean := false;
+begin
+    -- The level progress trigger runs as part of this insert
+    insert into public.child_scenario_attempts (child_id, scenario_id, score_earned, max_score, stars_earned, passed, idempotency_key)
+    values (p_child_id, p_scenario_id, p_score_earned, p_max_score, p_stars_earned, p_passed, p_idempotency_key)
+    on conflict (child_id, idempotency_key) do nothing
+    returning id into v_attempt_id;
+
+    if v_attempt_id is null then
+        select id, passed into v_attempt_id, p_passed
+        from public.child_scenario_attempts
+        where child_id = p_child_id and idempotency_key = p_idempotency_key;
+
+        return jsonb_build_object(
+            'attempt_id', v_attempt_id,
+            'passed', p_passed,
+            'duplicate', true,
+            'unlocked_artifact', null,
+            'newly_unlocked', false
+        );
+    end if;
+
+    if p_passed then
+        -- Row lock serializes concurrent commits for the same child
+        update public.children
+        set respect_score = coalesce(respect_score, 0) + p_score_earned
+        where id = p_child_id
+        returning respect_score, current_level into v_respect_score, v_current_level;
+
+        select level_id into v_level_id from public.scenarios where id = p_scenario_id;
+        select count(*) into v_scenario_count from public.scenarios where level_id = v_level_id;
+        select passed_scenarios into v_passed_count
+        from public.child_level_progress
+        where child_id = p_child_id and level_id = v_level_id;
+
+        if v_scenario_count > 0 and coalesce(v_passed_count, 0) >= v_scenario_count then
+            select id, name, description, image_url into v_artifact
+            from public.artifacts
+            where level_id = v_level_id
+            limit 1;
+
+            if found then
+                v_unlocked := jsonb_build_object(
+                    'id', v_artifact.id,
+                    'name', v_artifact.name,
+                    'description', v_artifact.description,
+                    'image_url', v_artifact.image_url
+                );
+
+                insert into public.child_artifacts (child_id, artifact_id)
+                values (p_child_id, v_artifact.id)
+                on conflict (child_id, artifact_id) do nothing;
+
+                -- First completion of the level: bump the child's current level
+                if found then
+                    v_newly_unlocked := true;
+                    update public.children
+                    set current_level = coalesce(current_level, 1) + 1
+                    where id = p_child_id
+                    returning current_level into v_current_level;
+                end if;
+            end if;
+        end if;
+    end if;
+
+    return jsonb_build_object(
+        'attempt_id', v_attempt_id,
+        'passed', p_passed,
+        'duplicate', false,
+        'unlocked_artifact', v_unlocked,
+        'newly_unlocked', v_newly_unlocked,
+        'respect_score', v_respect_score,
+        'current_level', v_current_level
+    );
+end;
+$$;
+
+-- Commits one child's queued attempts (in order) and card completions in a
+-- single transaction. Returns a result per event, keyed by idempotency key.
+create or replace function public.sync_child_events(
+    p_child_id uuid,
+    p_attempts jsonb,
+    p_cards jsonb
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_attempt jsonb;
+    v_attempt_results jsonb := '[]'::jsonb;
+    v_card_results jsonb;
+begin
+    for v_attempt in select value from jsonb_array_elements(coalesce(p_attempts, '[]'::jsonb))
+    loop
+        v_attempt_results := v_attempt_results || jsonb_build_array(
+            jsonb_build_object('idempotency_key', v_attempt->>'idempotency_key')
+            || public.commit_scenario_attempt(
+                p_child_id,
+                (v_attempt->>'scenario_id')::uuid,
+                (v_attempt->>'score_earned')::integer,
+                (v_attempt->>'max_score')::integer,
+                (v_attempt->>'stars_earned')::integer,
+                (v_attempt->>'passed')::boolean,
+                (v_attempt->>'idempotency_key')::uuid
+            )
+        );
+    end loop;
+
+    with incoming as (
+        select distinct on (idempotency_key) idempotency_key, card_id
+        from jsonb_to_recordset(coalesce(p_cards, '[]'::jsonb)) as c(idempotency_key uuid, card_id uuid)
+    ),
+    inserted as (
+        insert into public.child_action_card_completions (child_id, card_id, idempotency_key)
+        select p_child_id, i.card_id, i.idempotency_key from incoming i
+        on conflict (child_id, idempotency_key) do nothing
+        returning id, idempotency_key
+    )
+    select coalesce(jsonb_agg(jsonb_build_object(
+        'idempotency_key', i.idempotency_key,
+        'card_id', i.card_id,
+        'saved_id', coalesce(ins.id, existing.id),
+        'duplicate', ins.id is null
+    )), '[]'::jsonb)
+    into v_card_results
+    from incoming i
+    left join inserted ins on ins.idempotency_key = i.idempotency_key
+    left join public.child_action_card_completions existing
+        on ins.id is null and existing.child_id = p_child_id and existing.idempotency_key = i.idempotency_key;
+
+    return jsonb_build_object('attempts', v_attempt_results, 'cards', v_card_results);
+end;
+$$;
@@ -0,0 +1,118 @@
+-- Daily activity streaks, maintained incrementally.
+-- Every attempt or card completion bumps the child's streak at most once per
+-- local calendar day (per children.timezone); a periodic job zeroes streaks
+-- that lapsed, in chunks, instead of recomputing from the event history.
+
+alter table public.children
+    add column if not exists streak integer not null default 0,
+    add column if not exists longest_streak integer not null default 0,
+    add column if not exists last_active_date date,
+    add column if not exists timezone text not null default 'UTC';
+
+-- Only children with a running streak can lapse
+create index if not exists children_active_streak_idx
+    on public.children (id)
+    where streak > 0;
+
+create or replace function public.track_child_streak()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_today date;
+begin
+    select (now() at time zone timezone)::date into v_today
+    from public.children
+    where id = new.child_id;
+
+    -- Later events on the same day (or replays of an earlier day) write nothing
+    update public.children
+    set streak = case when last_active_date = v_today - 1 then streak + 1 else 1 end,
+        longest_streak = greatest(
+            longest_streak,
+            case when last_active_date = v_today - 1 then streak + 1 else 1 end
+        ),
+        last_active_date = v_today
+    where id = new.child_id
+      and (last_active_date is null or last_active_date < v_today);
+
+    return new;
+end;
+$$;
+
+drop trigger if exists child_scenario_attempts_streak on public.child_scenario_attempts;
+create trigger child_scenario_attempts_streak
+    after insert on public.child_scenario_attempts
+    for each row execute function public.track_child_streak();
+
+drop trigger if exists child_action_card_completions_streak on public.child_action_card_completions;
+create trigger child_action_card_completions_streak
+    after insert on public.child_action_card_completions
+    for each row execute function public.track_child_streak();
+
+-- Zeroes the streaks of up to p_batch_size children who missed a whole local
+-- day. Returns the number of rows reset; callers repeat until it is below the
+-- batch size. Reset rows drop out of the filter, so no cursor is needed.
+create or replace function public.reset_lapsed_streaks(p_batch_size integer default 5000)
+returns integer
+language plpgsql
+as $$
+declare
+    v_count integer;
+begin
+    with lapsed as (
+        select id
+        from public.children
+        where streak > 0
+          and (last_active_date is null
+               or last_active_date < (now() at time zone timezone)::date - 1)
+        limit p_batch_size
+        for update skip locked
+    )
+    update public.children c
+    set streak = 0
+    from lapsed
+    where c.id = lapsed.id;
+
+    get diagnostics v_count = row_count;
+    return v_count;
+end;
+$$;
+
+-- Backfill from the existing event history: islands of consecutive local days
+with events as (
+    select child_id, created_at from public.child_scenario_attempts
+    union all
+    select child_id, created_at from public.child_action_card_completions
+),
+days as (
+    select distinct e.child_id, (e.created_at at time zone c.timezone)::date as day
+    from events e
+    join public.children c on c.id = e.child_id
+),
+runs as (
+    select child_id, count(*) as length, max(day) as last_day
+    from (
+        select child_id, day, day - (row_number() over (partition by child_id order by day))::integer as island
+        from days
+    ) d
+    group by child_id, island
+),
+summary as (
+    select distinct on (r.child_id)
+        r.child_id,
+        r.last_day,
+        r.length as last_length,
+        max(r.length) over (partition by r.child_id) as longest
+    from runs r
+    order by r.child_id, r.last_day desc
+)
+update public.children c
+set last_active_date = s.last_day,
+    longest_streak = s.longest,
+    streak = case
+        when s.last_day >= (now() at time zone c.timezone)::date - 1 then s.last_length
+        else 0
+    end
+from summary s
+where c.id = s.child_id;
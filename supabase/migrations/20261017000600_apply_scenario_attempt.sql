@@ -0,0 +1,153 @@
+-- Splits an attempt commit into the insert and its side effects (score,
+-- artifact unlock, level bump), so the API can store the attempt and apply
+-- the rest from its job queue. applied_at guards against applying twice;
+-- side_effects keeps the outcome for clients that fetch it later.
+
+-- Existing rows were applied inline when they were inserted
+alter table public.child_scenario_attempts
+    add column if not exists applied_at timestamptz default now(),
+    add column if not exists side_effects jsonb;
+
+-- Lets the reconciler find attempts whose side effects were never applied
+create index if not exists child_scenario_attempts_unapplied_idx
+    on public.child_scenario_attempts (created_at)
+    where applied_at is null;
+
+-- Applies an inserted attempt's side effects exactly once. Safe to retry:
+-- an already applied attempt returns its stored outcome with 'duplicate'.
+-- Returns null for an unknown attempt.
+create or replace function public.apply_scenario_attempt(p_attempt_id uuid)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_attempt record;
+    v_level_id uuid;
+    v_scenario_count integer;
+    v_passed_count integer;
+    v_respect_score integer;
+    v_current_level integer;
+    v_artifact record;
+    v_unlocked jsonb := null;
+    v_newly_unlocked boolean := false;
+    v_result jsonb;
+begin
+    -- Row lock: concurrent retries of the same job wait here, then see applied_at
+    select id, child_id, scenario_id, score_earned, passed, applied_at, side_effects into v_attempt
+    from public.child_scenario_attempts
+    where id = p_attempt_id
+    for update;
+
+    if not found then
+        return null;
+    end if;
+
+    if v_attempt.applied_at is not null then
+        return coalesce(v_attempt.side_effects, jsonb_build_object(
+            'attempt_id', v_attempt.id,
+            'passed', v_attempt.passed,
+            'unlocked_artifact', null,
+            'newly_unlocked', false
+        )) || jsonb_build_object('duplicate', true);
+    end if;
+
+    if v_attempt.passed then
+        -- Row lock serializes concurrent commits for the same child
+        update public.children
+        set respect_score = coalesce(respect_score, 0) + v_attempt.score_earned
+        where id = v_attempt.child_id
+        returning respect_score, current_level into v_respect_score, v_current_level;
+
+        select level_id into v_level_id from public.scenarios where id = v_attempt.scenario_id;
+        select count(*) into v_scenario_count from public.scenarios where level_id = v_level_id;
+        select passed_scenarios into v_passed_count
+        from public.child_level_progress
+        where child_id = v_attempt.child_id and level_id = v_level_id;
+
+        if v_scenario_count > 0 and coalesce(v_passed_count, 0) >= v_scenario_count then
+            select id, name, description, image_url into v_artifact
+            from public.artifacts
+            where level_id = v_level_id
+            limit 1;
+
+            if found then
+                v_unlocked := jsonb_build_object(
+                    'id', v_artifact.id,
+                    'name', v_artifact.name,
+                    'description', v_artifact.description,
+                    'image_url', v_artifact.image_url
+                );
+
+                insert into public.child_artifacts (child_id, artifact_id)
+                values (v_attempt.child_id, v_artifact.id)
+                on conflict (child_id, artifact_id) do nothing;
+
+                -- First completion of the level: bump the child's current level
+                if found then
+                    v_newly_unlocked := true;
+                    update public.children
+                    set current_level = coalesce(current_level, 1) + 1
+                    where id = v_attempt.child_id
+                    returning current_level into v_current_level;
+                end if;
+            end if;
+        end if;
+    end if;
+
+    v_result := jsonb_build_object(
+        'attempt_id', v_attempt.id,
+        'passed', v_attempt.passed,
+        'unlocked_artifact', v_unlocked,
+        'newly_unlocked', v_newly_unlocked,
+        'respect_score', v_respect_score,
+        'current_level', v_current_level
+    );
+
+    update public.child_scenario_attempts
+    set applied_at = now(),
+        side_effects = v_result
+    where id = v_attempt.id;
+
+    return v_result || jsonb_build_object('duplicate', false);
+end;
+$$;
+
+-- The single-call commit (used by offline sync) is now insert + apply
+create or replace function public.commit_scenario_attempt(
+    p_child_id uuid,
+    p_scenario_id uuid,
+    p_score_earned integer,
+    p_max_score integer,
+    p_stars_earned integer,
+    p_passed boolean,
+    p_idempotency_key uuid default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_attempt_id uuid;
+begin
+    -- The level progress and streak triggers run as part of this insert
+    insert into public.child_scenario_attempts (child_id, scenario_id, score_earned, max_score, stars_earned, passed, idempotency_key, applied_at)
+    values (p_child_id, p_scenario_id, p_score_earned, p_max_score, p_stars_earned, p_passed, p_idempotency_key, null)
+    on conflict (child_id, idempotency_key) do nothing
+    returning id into v_attempt_id;
+
+    if v_attempt_id is null then
+        select id, passed into v_attempt_id, p_passed
+        from public.child_scenario_attempts
+        where child_id = p_child_id and idempotency_key = p_idempotency_key;
+
+        return jsonb_build_object(
+            'attempt_id', v_attempt_id,
+            'passed', p_passed,
+            'duplicate', true,
+            'unlocked_artifact', null,
+            'newly_unlocked', false
+        );
+    end if;
+
+    return public.apply_scenario_attempt(v_attempt_id);
+end;
+$$;
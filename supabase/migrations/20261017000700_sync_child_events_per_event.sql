@@ -0,0 +1,85 @@
+-- A single bad event (unknown scenario or card, check violation, ...) used to
+-- abort the whole sync batch. Each event now commits in its own subtransaction;
+-- a failing one is rolled back on its own and reported as rejected, with its
+-- SQLSTATE, while the rest of the batch is kept.
+create or replace function public.sync_child_events(
+    p_child_id uuid,
+    p_attempts jsonb,
+    p_cards jsonb
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_attempt jsonb;
+    v_card jsonb;
+    v_card_id uuid;
+    v_saved_id uuid;
+    v_duplicate boolean;
+    v_attempt_results jsonb := '[]'::jsonb;
+    v_card_results jsonb := '[]'::jsonb;
+begin
+    for v_attempt in select value from jsonb_array_elements(coalesce(p_attempts, '[]'::jsonb))
+    loop
+        begin
+            v_attempt_results := v_attempt_results || jsonb_build_array(
+                jsonb_build_object('idempotency_key', v_attempt->>'idempotency_key')
+                || public.commit_scenario_attempt(
+                    p_child_id,
+                    (v_attempt->>'scenario_id')::uuid,
+                    (v_attempt->>'score_earned')::integer,
+                    (v_attempt->>'max_score')::integer,
+                    (v_attempt->>'stars_earned')::integer,
+                    (v_attempt->>'passed')::boolean,
+                    (v_attempt->>'idempotency_key')::uuid
+                )
+            );
+        exception when others then
+            v_attempt_results := v_attempt_results || jsonb_build_array(jsonb_build_object(
+                'idempotency_key', v_attempt->>'idempotency_key',
+                'rejected', true,
+                'error', sqlstate
+            ));
+        end;
+    end loop;
+
+    for v_card in
+        select value from (
+            select distinct on (value->>'idempotency_key') value
+            from jsonb_array_elements(coalesce(p_cards, '[]'::jsonb))
+        ) c
+    loop
+        begin
+            v_card_id := (v_card->>'card_id')::uuid;
+            v_saved_id := null;
+
+            insert into public.child_action_card_completions (child_id, card_id, idempotency_key)
+            values (p_child_id, v_card_id, (v_card->>'idempotency_key')::uuid)
+            on conflict (child_id, idempotency_key) do nothing
+            returning id into v_saved_id;
+
+            v_duplicate := v_saved_id is null;
+            if v_duplicate then
+                select id into v_saved_id
+                from public.child_action_card_completions
+                where child_id = p_child_id and idempotency_key = (v_card->>'idempotency_key')::uuid;
+            end if;
+
+            v_card_results := v_card_results || jsonb_build_array(jsonb_build_object(
+                'idempotency_key', v_card->>'idempotency_key',
+                'card_id', v_card_id,
+                'saved_id', v_saved_id,
+                'duplicate', v_duplicate
+            ));
+        exception when others then
+            v_card_results := v_card_results || jsonb_build_array(jsonb_build_object(
+                'idempotency_key', v_card->>'idempotency_key',
+                'rejected', true,
+                'error', sqlstate
+            ));
+        end;
+    end loop;
+
+    return jsonb_build_object('attempts', v_attempt_results, 'cards', v_card_results);
+end;
+$$;
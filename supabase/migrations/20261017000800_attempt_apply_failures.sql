@@ -0,0 +1,12 @@
+-- Marks attempts whose apply job ran out of retries (a dead letter in the
+-- API's job queue). The reconciler skips them, so a backlog of failures
+-- cannot fill its batch and keep newer unapplied attempts from being found.
+
+alter table public.child_scenario_attempts
+    add column if not exists apply_failed_at timestamptz;
+
+-- Same scan as before, minus the attempts that are dead-lettered
+drop index if exists public.child_scenario_attempts_unapplied_idx;
+create index if not exists child_scenario_attempts_unapplied_idx
+    on public.child_scenario_attempts (created_at)
+    where applied_at is null and apply_failed_at is null;
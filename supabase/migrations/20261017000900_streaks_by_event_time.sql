@@ -0,0 +1,170 @@
+-- Offline events count toward the streak on the day they happened. The
+-- streak trigger read now(), so a batch synced days later all landed on the
+-- sync day. Events now carry an optional occurred_at from the device, stored
+-- as created_at (never later than now()), and the trigger reads created_at.
+-- A sync batch is applied oldest event first, attempts and cards together,
+-- since the trigger ignores events dated before the child's last active day.
+--
+-- reset_lapsed_streaks skips rows locked by concurrent writers, so a short
+-- batch does not mean none are left: callers repeat until it returns 0.
+
+create or replace function public.track_child_streak()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_today date;
+begin
+    select (coalesce(new.created_at, now()) at time zone timezone)::date into v_today
+    from public.children
+    where id = new.child_id;
+
+    -- Later events on the same day (or replays of an earlier day) write nothing
+    update public.children
+    set streak = case when last_active_date = v_today - 1 then streak + 1 else 1 end,
+        longest_streak = greatest(
+            longest_streak,
+            case when last_active_date = v_today - 1 then streak + 1 else 1 end
+        ),
+        last_active_date = v_today
+    where id = new.child_id
+      and (last_active_date is null or last_active_date < v_today);
+
+    return new;
+end;
+$$;
+
+drop function if exists public.commit_scenario_attempt(uuid, uuid, integer, integer, integer, boolean, uuid);
+
+create or replace function public.commit_scenario_attempt(
+    p_child_id uuid,
+    p_scenario_id uuid,
+    p_score_earned integer,
+    p_max_score integer,
+    p_stars_earned integer,
+    p_passed boolean,
+    p_idempotency_key uuid default null,
+    p_occurred_at timestamptz default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_attempt_id uuid;
+begin
+    -- The level progress and streak triggers run as part of this insert
+    insert into public.child_scenario_attempts (child_id, scenario_id, score_earned, max_score, stars_earned, passed, idempotency_key, applied_at, created_at)
+    values (p_child_id, p_scenario_id, p_score_earned, p_max_score, p_stars_earned, p_passed, p_idempotency_key, null, least(coalesce(p_occurred_at, now()), now()))
+    on conflict (child_id, idempotency_key) do nothing
+    returning id into v_attempt_id;
+
+    if v_attempt_id is null then
+        select id, passed into v_attempt_id, p_passed
+        from public.child_scenario_attempts
+        where child_id = p_child_id and idempotency_key = p_idempotency_key;
+
+        return jsonb_build_object(
+            'attempt_id', v_attempt_id,
+            'passed', p_passed,
+            'duplicate', true,
+            'unlocked_artifact', null,
+            'newly_unlocked', false
+        );
+    end if;
+
+    return public.apply_scenario_attempt(v_attempt_id);
+end;
+$$;
+
+create or replace function public.sync_child_events(
+    p_child_id uuid,
+    p_attempts jsonb,
+    p_cards jsonb
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_event record;
+    v_card_id uuid;
+    v_saved_id uuid;
+    v_duplicate boolean;
+    v_attempt_results jsonb := '[]'::jsonb;
+    v_card_results jsonb := '[]'::jsonb;
+begin
+    for v_event in
+        select kind, value
+        from (
+            select 'attempt' as kind, value, ordinality
+            from jsonb_array_elements(coalesce(p_attempts, '[]'::jsonb)) with ordinality
+            union all
+            select 'card', value, ordinality
+            from (
+                select distinct on (value->>'idempotency_key') value, ordinality
+                from jsonb_array_elements(coalesce(p_cards, '[]'::jsonb)) with ordinality
+                order by value->>'idempotency_key', ordinality
+            ) c
+        ) e
+        order by (value->>'occurred_at')::timestamptz nulls last, kind, ordinality
+    loop
+        if v_event.kind = 'attempt' then
+            begin
+                v_attempt_results := v_attempt_results || jsonb_build_array(
+                    jsonb_build_object('idempotency_key', v_event.value->>'idempotency_key')
+                    || public.commit_scenario_attempt(
+                        p_child_id,
+                        (v_event.value->>'scenario_id')::uuid,
+                        (v_event.value->>'score_earned')::integer,
+                        (v_event.value->>'max_score')::integer,
+                        (v_event.value->>'stars_earned')::integer,
+                        (v_event.value->>'passed')::boolean,
+                        (v_event.value->>'idempotency_key')::uuid,
+                        (v_event.value->>'occurred_at')::timestamptz
+                    )
+                );
+            exception when others then
+                v_attempt_results := v_attempt_results || jsonb_build_array(jsonb_build_object(
+                    'idempotency_key', v_event.value->>'idempotency_key',
+                    'rejected', true,
+                    'error', sqlstate
+                ));
+            end;
+        else
+            begin
+                v_card_id := (v_event.value->>'card_id')::uuid;
+                v_saved_id := null;
+
+                insert into public.child_action_card_completions (child_id, card_id, idempotency_key, created_at)
+                values (
+                    p_child_id, v_card_id, (v_event.value->>'idempotency_key')::uuid,
+                    least(coalesce((v_event.value->>'occurred_at')::timestamptz, now()), now())
+                )
+                on conflict (child_id, idempotency_key) do nothing
+                returning id into v_saved_id;
+
+                v_duplicate := v_saved_id is null;
+                if v_duplicate then
+                    select id into v_saved_id
+                    from public.child_action_card_completions
+                    where child_id = p_child_id and idempotency_key = (v_event.value->>'idempotency_key')::uuid;
+                end if;
+
+                v_card_results := v_card_results || jsonb_build_array(jsonb_build_object(
+                    'idempotency_key', v_event.value->>'idempotency_key',
+                    'card_id', v_card_id,
+                    'saved_id', v_saved_id,
+                    'duplicate', v_duplicate
+                ));
+            exception when others then
+                v_card_results := v_card_results || jsonb_build_array(jsonb_build_object(
+                    'idempotency_key', v_event.value->>'idempotency_key',
+                    'rejected', true,
+                    'error', sqlstate
+                ));
+            end;
+        end if;
+    end loop;
+
+    return jsonb_build_object('attempts', v_attempt_results, 'cards', v_card_results);
+end;
+$$;
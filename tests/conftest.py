@@ -0,0 +1,19 @@
+"""
+Shared test setup: the settings the app needs to import, with the job queue
+in a throwaway SQLite file. Test modules import the app inside their tests
+and fixtures, after this has run.
+"""
+import os
+import pytest
+from benchmarks.harness import BENCHMARK_ENV
+
+
+@pytest.fixture(scope="session", autouse=True)
+def app_env(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as env:
+        for key, value in BENCHMARK_ENV.items():
+            if key not in os.environ:
+                env.setenv(key, value)
+        if "JOB_QUEUE_PATH" not in os.environ:
+            env.setenv("JOB_QUEUE_PATH", str(tmp_path_factory.mktemp("jobs") / "jobs.sqlite3"))
+        yield
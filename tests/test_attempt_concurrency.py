@@ -0,0 +1,102 @@
+"""
+The API's side of a scenario attempt committed twice at once, run against the
+in-memory PostgREST stand-in from benchmarks/. The stand-in applies each RPC
+serially in Python, so this does not exercise the SQL's locking; it checks the
+contract the API relies on: replayed idempotency keys come back as duplicates
+and the level artifact is unlocked once. The SQL itself is raced against
+Postgres in test_attempt_concurrency_postgres.py.
+
+    python -m pytest tests
+"""
+import asyncio
+import uuid
+import httpx
+
+LATENCY = 0.005 # Long enough for both requests to be in flight at once
+
+
+def _setup():
+    from app.db.supabase import use_transport
+    from benchmarks.seed import build_dataset
+
+    # One child with nothing completed yet; three of the first level's four scenarios passed
+    dataset = build_dataset("unused", "unused", parents=1, children_per_parent=1)
+    fake = dataset.fake(latency=LATENCY)
+    use_transport(fake)
+    child = dataset.children[0]
+    first_level = fake.get("scenarios", dataset.scenarios[0]["id"])["level_id"]
+    scenarios = sorted(fake.find("scenarios", "level_id", first_level), key=lambda s: s["order_index"])
+    for scenario in scenarios[:-1]:
+        fake.rpcs["commit_scenario_attempt"](fake, child["id"], scenario["id"], 1, 1, 3, True)
+    artifact = fake.find("artifacts", "level_id", first_level)[0]
+    return dataset, fake, fake.get("children", child["id"]), scenarios[-1], artifact
+
+
+def _commit(child: dict, scenario: dict, key: str):
+    from app.db.supabase import supabase
+
+    return supabase.rpc("commit_scenario_attempt", {
+        "p_child_id": child["id"],
+        "p_scenario_id": scenario["id"],
+        "p_score_earned": 1,
+        "p_max_score": 1,
+        "p_stars_earned": 3,
+        "p_passed": True,
+        "p_idempotency_key": key,
+    }).execute()
+
+
+def _unlocks(fake, child: dict, artifact: dict) -> int:
+    return sum(1 for ca in fake.find("child_artifacts", "child_id", child["id"]) if ca["artifact_id"] == artifact["id"])
+
+
+def test_concurrent_replays_commit_once():
+    _, fake, child, scenario, artifact = _setup()
+    score, level = child["respect_score"], child["current_level"] # Live row, read before the race
+    key = str(uuid.uuid4())
+
+    async def race():
+        return await asyncio.gather(_commit(child, scenario, key), _commit(child, scenario, key))
+    results = [res.data for res in asyncio.run(race())]
+
+    assert sorted(r["duplicate"] for r in results) == [False, True]
+    assert [r["newly_unlocked"] for r in results].count(True) == 1
+    assert len([a for a in fake.find("child_scenario_attempts", "child_id", child["id"]) if a.get("idempotency_key") == key]) == 1
+    assert fake.get("children", child["id"])["respect_score"] == score + 1
+    assert fake.get("children", child["id"])["current_level"] == level + 1
+    assert _unlocks(fake, child, artifact) == 1
+
+
+def test_concurrent_attempts_unlock_once(monkeypatch):
+    # Two separate submissions finishing the level, through the API and its job queue
+    from app.core.security import create_access_token, parent_claims
+    from app.main import app
+    from app.models.auth import Parent
+
+    async def keep_open():
+        pass
+    monkeypatch.setattr("app.main.close_supabase", keep_open) # Later tests share the Supabase client
+
+    dataset, fake, child, scenario, artifact = _setup()
+    parent = dataset.parents[0]
+    token = create_access_token(parent["id"], claims=parent_claims(Parent(**parent)))
+    headers = {"Authorization": f"Bearer {token}"}
+    score, level = child["respect_score"], child["current_level"] # Live row, read before the race
+    body = {"child_id": child["id"], "scenario_id": scenario["id"], "score_earned": 1, "max_score": 1, "stars_earned": 3}
+
+    async def race():
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                submitted = await asyncio.gather(*(client.post("/game/attempt", json=body, headers=headers) for _ in range(2)))
+                assert all(r.status_code == 200 for r in submitted)
+                jobs = await asyncio.gather(*(
+                    client.get(f"/game/jobs/{r.json()['job_id']}", params={"wait": 10}, headers=headers) for r in submitted
+                ))
+                return [job.json() for job in jobs]
+    jobs = asyncio.run(race())
+
+    assert all(job["status"] == "completed" for job in jobs)
+    assert [job["result"]["newly_unlocked"] for job in jobs].count(True) == 1
+    assert fake.get("children", child["id"])["respect_score"] == score + 2 # Two distinct attempts, both passed
+    assert fake.get("children", child["id"])["current_level"] == level + 1
+    assert _unlocks(fake, child, artifact) == 1
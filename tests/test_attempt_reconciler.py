@@ -0,0 +1,68 @@
+"""
+The attempt reconciler against the in-memory PostgREST stand-in: attempts
+whose apply job was dead-lettered are marked and skipped, so they cannot
+keep newer unapplied attempts out of its batch.
+
+    python -m pytest tests
+"""
+import asyncio
+import dataclasses
+import uuid
+
+
+def _setup():
+    from app.db.supabase import use_transport
+    from benchmarks.seed import build_dataset
+
+    dataset = build_dataset("unused", "unused", parents=1, children_per_parent=1)
+    fake = dataset.fake()
+    use_transport(fake)
+    return fake, dataset.children[0], dataset.scenarios[0]
+
+
+def _attempt(fake, child: dict, scenario: dict, created_at: str, **fields) -> dict:
+    return fake.insert("child_scenario_attempts", {
+        "id": str(uuid.uuid4()), "child_id": child["id"], "scenario_id": scenario["id"],
+        "score_earned": 1, "max_score": 1, "stars_earned": 3, "passed": True,
+        "created_at": created_at, "applied_at": None, **fields,
+    })
+
+
+def test_dead_letter_marks_attempt():
+    import app.api.game # Registers the apply job's handlers
+    from app.services.attempts import enqueue_apply
+    from app.services.jobs import _get, job_queue
+
+    fake, child, scenario = _setup()
+    attempt = _attempt(fake, child, scenario, "2026-01-01T00:00:00+00:00")
+
+    def unavailable(fake, p_attempt_id):
+        raise ConnectionError("database unavailable")
+    fake.rpcs["apply_scenario_attempt"] = unavailable
+
+    async def exhaust():
+        job = await enqueue_apply(attempt["id"], child["id"])
+        await job_queue._process(dataclasses.replace(job, attempts=job_queue.max_attempts))
+        return await job_queue._db(_get, job.id)
+    job = asyncio.run(exhaust())
+
+    assert job.status == "failed"
+    assert fake.get("child_scenario_attempts", attempt["id"])["apply_failed_at"] is not None
+
+
+def test_dead_letters_do_not_block_reconciler(monkeypatch):
+    from app.services import attempts
+
+    fake, child, scenario = _setup()
+    for _ in range(attempts.RECONCILE_BATCH_SIZE + 1):
+        _attempt(fake, child, scenario, "2026-01-01T00:00:00+00:00", apply_failed_at="2026-01-01T01:00:00+00:00")
+    live = _attempt(fake, child, scenario, "2026-01-02T00:00:00+00:00")
+
+    enqueued = []
+
+    async def enqueue_apply(attempt_id, child_id, owner_id=None):
+        enqueued.append(attempt_id)
+    monkeypatch.setattr(attempts, "enqueue_apply", enqueue_apply)
+
+    assert asyncio.run(attempts.requeue_unapplied_attempts()) == 1
+    assert enqueued == [live["id"]]